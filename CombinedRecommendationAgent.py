@@ -0,0 +1,177 @@
+import json
+from llm_clients import MODEL_ID, async_client, client, fit_messages, tokenizer, usage_tracker
+
+NO_COURSES_MESSAGE = 'No courses were retrieved from the RAG system.'
+NO_RECOMMENDATIONS_MESSAGE = "It seems there are no course recommendations available at the moment."
+ERROR_MESSAGE = "Sorry, I couldn't generate the recommendations at this time."
+
+# Fields of each recommended course, in the format the frontend expects
+COURSE_FIELDS = [
+    "course_code", "name", "department", "division", "description", "prerequisites",
+    "exclusions", "campus", "section_code", "sessions"
+]
+
+# JSON schema of the structured output: the chosen courses, each with the reasons it suits the user
+RECOMMENDATIONS_SCHEMA = {
+    "name": "course_recommendations",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "courses": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        **{field: {"type": "string"} for field in COURSE_FIELDS},
+                        "meeting_sections": {"type": "array", "items": {"type": "string"}},
+                        "reasons": {"type": "array", "items": {"type": "string"}}
+                    },
+                    "required": COURSE_FIELDS + ["meeting_sections", "reasons"],
+                    "additionalProperties": False
+                }
+            }
+        },
+        "required": ["courses"],
+        "additionalProperties": False
+    }
+}
+
+# Session codes are the year followed by the starting month
+SESSION_TERMS = {"9": "Fall", "1": "Winter", "5": "Summer"}
+
+
+def describe_sessions(sessions):
+    """Turn session codes such as "20249, 20251" into "Fall 2024 and Winter 2025"."""
+    terms = []
+    for code in sessions.split(","):
+        code = code.strip()
+        if len(code) == 5 and code[4] in SESSION_TERMS:
+            terms.append(f"{SESSION_TERMS[code[4]]} {code[:4]}")
+        elif code:
+            terms.append(code)
+    return " and ".join(terms) or "an upcoming session"
+
+
+class CombinedRecommendationAgent:
+    """
+    Pick the courses and explain each choice in a single structured completion,
+    instead of a JSON pass followed by a text pass over that JSON.
+    """
+
+    def __init__(self, max_tokens=4096):
+        self.model_id = MODEL_ID
+        self.max_tokens = max_tokens
+        self.max_context_length = 16383  # Context length limit for the model
+
+        self.tokenizer = tokenizer
+
+        # System prompt for the combined agent
+        self.sys_prompt = """
+            You are a specialized assistant at the University of Toronto, helping new students select courses based on their refined queries.
+            The user has provided a clear set of interests, requirements, and constraints. You also have a list of relevant courses retrieved
+            by a RAG system. These courses contain essential details such as course codes, names, descriptions, prerequisites, session
+            offerings, and meeting sections. Each session code indicates when a course runs: "20249" for Fall 2024, "20251" for Winter 2025,
+            and "20249, 20251" for a year-long offering.
+
+            Your task is to choose only from the given retrieved courses and recommend those that best match the user’s expressed goals.
+            Pay close attention to prerequisites and ensure that the user can meet them. If the user wants introductory or foundational
+            classes, highlight basic-level courses. If the user has specified a session preference, recommend only courses running in
+            those sessions. If the user prefers online or in-person courses, respect that choice as well. If multiple courses are suitable,
+            pick a diverse range that covers different topics or skill sets. Avoid duplicates and exclude any that fail to meet prerequisites
+            or run outside the chosen sessions.
+
+            **Output Rules**:
+
+            - Copy the course fields exactly from the retrieved courses. Do not hallucinate or create new courses.
+            - For each course, give two or three short, friendly reasons why it suits the user, written to the user.
+            - Aim to provide at least 5-6 recommended courses that best match the user's needs.
+            - If none of the retrieved courses fit, return an empty list of courses.
+            """
+        self.system_tokens = self.calculate_token_count(self.sys_prompt)
+
+    def calculate_token_count(self, content):
+        """Calculate the token count for a given string."""
+        return len(self.tokenizer.encode(content))
+
+    def render_text(self, courses):
+        """Write the recommendations in the point form used by TextRecommendationAgent."""
+        if not courses:
+            return NO_RECOMMENDATIONS_MESSAGE
+        sections = []
+        for course in courses:
+            lines = [f"**{course['course_code']}: {course['name']}**"]
+            lines += [f"    - {reason}" for reason in course["reasons"]]
+            lines.append(
+                f"    - Offered in **{describe_sessions(course['sessions'])}** at the **{course['campus']}** campus."
+            )
+            sections.append("\n".join(lines))
+        return "\n\n".join(sections)
+
+    def user_message(self, user_query, retrieved_courses):
+        return f"""
+            User Query: {user_query}
+            Retrieved Courses: {retrieved_courses}
+            Now starts your recommendations.
+            """
+
+    def build_messages(self, user_query, retrieved_courses):
+        """
+        Build the prompt for one request, truncating the user query if it would not fit.
+        """
+        return fit_messages(
+            self.sys_prompt, self.system_tokens, lambda query: self.user_message(query, retrieved_courses),
+            user_query, self.max_tokens, self.max_context_length
+        )
+
+    def request_options(self, messages):
+        return {
+            "model": self.model_id,
+            "messages": messages,
+            "max_tokens": self.max_tokens,
+            "response_format": {"type": "json_schema", "json_schema": RECOMMENDATIONS_SCHEMA}
+        }
+
+    def format_outputs(self, courses):
+        """Return (course_json, text_recommendations) for the structured courses."""
+        course_json = json.dumps(
+            [{key: value for key, value in course.items() if key != "reasons"} for course in courses],
+            ensure_ascii=False
+        )
+        return course_json, self.render_text(courses)
+
+    def generate_recommendations(self, user_query, retrieved_courses):
+        """
+        Returns:
+            tuple: (course_json, text_recommendations), in the same formats as
+                JSONGeneratorAgent and TextRecommendationAgent.
+        """
+        if retrieved_courses == []:
+            return "[]", NO_COURSES_MESSAGE
+
+        try:
+            messages = self.build_messages(user_query, retrieved_courses)
+            response = client.chat.completions.create(**self.request_options(messages))
+            usage_tracker.record("combined_output", response.usage)
+            courses = json.loads(response.choices[0].message.content)["courses"]
+        except Exception as e:
+            print("Error during combined recommendation generation:", str(e))
+            return "[]", ERROR_MESSAGE
+
+        return self.format_outputs(courses)
+
+    async def agenerate_recommendations(self, user_query, retrieved_courses):
+        """Same as generate_recommendations, using the async client."""
+        if retrieved_courses == []:
+            return "[]", NO_COURSES_MESSAGE
+
+        try:
+            messages = self.build_messages(user_query, retrieved_courses)
+            response = await async_client.chat.completions.create(**self.request_options(messages))
+            usage_tracker.record("combined_output", response.usage)
+            courses = json.loads(response.choices[0].message.content)["courses"]
+        except Exception as e:
+            print("Error during combined recommendation generation:", str(e))
+            return "[]", ERROR_MESSAGE
+
+        return self.format_outputs(courses)
@@ -1,24 +1,16 @@
-import os
-from dotenv import load_dotenv
-from openai import OpenAI
-import tiktoken
+from llm_clients import MODEL_ID, async_client, client, fit_messages, tokenizer, usage_tracker
 
-load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    print("Error: OPENAI_API_KEY is not set in the environment variables.")
-    exit(1)
-
-client = OpenAI(api_key=OPENAI_API_KEY)
+NO_COURSES_MESSAGE = 'No courses were retrieved from the RAG system.'
+ERROR_MESSAGE = "Sorry, I couldn't generate the JSON recommendations at this time."
 
 class JSONGeneratorAgent:
     def __init__(self, max_tokens=4096):
-        self.model_id = "gpt-4o"
+        self.model_id = MODEL_ID
         self.max_tokens = max_tokens
         self.max_context_length = 16383  # Context length limit for the model
 
-        # Initialize the tokenizer for the model
-        self.tokenizer = tiktoken.encoding_for_model(self.model_id)
+        # The tokenizer is shared by every agent in the process
+        self.tokenizer = tokenizer
 
         # System prompt for the JSON generator agent
         self.sys_prompt = """ 
@@ -89,61 +81,65 @@ class JSONGeneratorAgent:
             - Make sure all recommended courses come only from the provided retrieved courses. Do not hallucinate or create new courses. 
             - Aim to provide at least 5-6 recommended courses that best match the user's needs.
             """
-        self.messages = [{"role": "system", "content": self.sys_prompt}]
+        # Tokenize the system prompt once; it is the same for every request
+        self.system_tokens = self.calculate_token_count(self.sys_prompt)
 
     def calculate_token_count(self, content):
         """Calculate the token count for a given string."""
         return len(self.tokenizer.encode(content))
 
-    def truncate_user_query(self, user_query, remaining_token_budget):
-        """
-        Truncate the user query to fit within the remaining token budget.
-        """
-        user_query_tokens = self.tokenizer.encode(user_query)
-        if len(user_query_tokens) > remaining_token_budget:
-            # Keep only the tokens that fit within the budget
-            truncated_tokens = user_query_tokens[:remaining_token_budget]
-            return self.tokenizer.decode(truncated_tokens)
-        return user_query
-
-    def generate_json_recommendations(self, user_query, retrieved_courses):
-        # Calculate token usage for system and retrieved courses
-        system_tokens = self.calculate_token_count(self.sys_prompt)
-        retrieved_courses_tokens = self.calculate_token_count(str(retrieved_courses))
+    def user_message(self, user_query, retrieved_courses):
+        return f"""
+            User Query: {user_query} 
+            Retrieved Courses: {retrieved_courses} 
+            Now starts your recommendations. 
+            """
 
-        # Reserve tokens for the assistant's output
-        reserved_for_output = self.max_tokens
+    def build_messages(self, user_query, retrieved_courses):
+        """
+        Build the prompt for one request from the system prompt and the current inputs only,
+        truncating the user query if the prompt would not fit (see llm_clients.fit_messages).
 
-        # Calculate the remaining token budget for the user query
-        remaining_token_budget = (
-            self.max_context_length - system_tokens - retrieved_courses_tokens - reserved_for_output
+        Returns:
+            list: The system and user messages to send.
+        """
+        return fit_messages(
+            self.sys_prompt, self.system_tokens, lambda query: self.user_message(query, retrieved_courses),
+            user_query, self.max_tokens, self.max_context_length
         )
 
-        if remaining_token_budget <= 0:
-            raise ValueError("Not enough token budget for system prompt and retrieved courses.")
-
-        # Truncate user query if necessary
-        truncated_user_query = self.truncate_user_query(user_query, remaining_token_budget)
-
+    def generate_json_recommendations(self, user_query, retrieved_courses):
         if retrieved_courses == []:
-            return 'No courses were retrieved from the RAG system.'
-
-        self.messages.append({
-            "role": "user",
-            "content": f"""
-            User Query: {truncated_user_query} 
-            Retrieved Courses: {retrieved_courses} 
-            Now starts your recommendations. 
-            """
-        })
+            return NO_COURSES_MESSAGE
 
         try:
+            # Raises ValueError if the inputs alone overflow the context
+            messages = self.build_messages(user_query, retrieved_courses)
             output_json = client.chat.completions.create(
                 model=self.model_id,
-                messages=self.messages
+                messages=messages
             )
+            usage_tracker.record("json_output", output_json.usage)
             return output_json.choices[0].message.content.strip()
         
         except Exception as e:
             print("Error during JSON generation:", str(e))
-            return "Sorry, I couldn't generate the JSON recommendations at this time."
+            return ERROR_MESSAGE
+
+    async def agenerate_json_recommendations(self, user_query, retrieved_courses):
+        """Same as generate_json_recommendations, using the async client."""
+        if retrieved_courses == []:
+            return NO_COURSES_MESSAGE
+
+        try:
+            messages = self.build_messages(user_query, retrieved_courses)
+            output_json = await async_client.chat.completions.create(
+                model=self.model_id,
+                messages=messages
+            )
+            usage_tracker.record("json_output", output_json.usage)
+            return output_json.choices[0].message.content.strip()
+
+        except Exception as e:
+            print("Error during JSON generation:", str(e))
+            return ERROR_MESSAGE
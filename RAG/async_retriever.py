@@ -0,0 +1,104 @@
+import os
+import sys
+import asyncio
+from pymongo import AsyncMongoClient
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from mongodb.course_views import COURSE_VIEWS_COLLECTION, build_course_payload, build_lecture_section_index
+from RAG.data_retriever_pinecone import (
+    COURSE_PROJECTION, EMBEDDING_MODEL, MONGO_URI, RETRIEVAL_MODE, embedding_backend,
+    exact_code_ids, query_cache, search_course_ids
+)
+from RAG.lexical_index import get_lexical_index
+
+# Async counterparts of the collections in data_retriever_pinecone, for the ASGI app.
+# The client connects lazily, on the event loop that first uses it.
+async_mongo_client = AsyncMongoClient(MONGO_URI)
+async_db = async_mongo_client['uoft_courses']
+async_courses_collection = async_db['courses']
+async_meeting_sections_collection = async_db['meeting_sections']
+async_course_views_collection = async_db[COURSE_VIEWS_COLLECTION]
+
+
+async def aembed_query(query):
+    """Embed a query without blocking the event loop, going through the query embedding cache."""
+    async def compute(text):
+        return (await embedding_backend.aembed([text]))[0]
+    return await query_cache.aget_or_compute(query, EMBEDDING_MODEL, compute)
+
+
+async def ahydrate_courses(course_ids, num_results=10):
+    """Async version of data_retriever_pinecone.hydrate_courses."""
+    unique_ids = list(dict.fromkeys(course_ids))
+    if not unique_ids:
+        return []
+
+    courses_by_id = {
+        course["course_id"]: course
+        async for course in async_courses_collection.find({"course_id": {"$in": unique_ids}}, COURSE_PROJECTION)
+    }
+    meeting_sections = await async_meeting_sections_collection.find(
+        {"course_id": {"$in": list(courses_by_id)}, "type": "Lecture"}, {"_id": 0}
+    ).to_list()
+    lecture_sections_by_id = build_lecture_section_index(meeting_sections)
+
+    retrieved_courses = []
+    for course_id in unique_ids:
+        course = courses_by_id.get(course_id)
+        if not course:
+            continue
+        retrieved_courses.append(build_course_payload(course, lecture_sections_by_id.get(course_id, [])))
+        if len(retrieved_courses) >= num_results:
+            break
+    return retrieved_courses
+
+
+async def afetch_courses(course_ids, num_results=10):
+    """Async version of data_retriever_pinecone.fetch_courses."""
+    unique_ids = list(dict.fromkeys(course_ids))
+    views = {
+        view['course_id']: view['payload']
+        async for view in async_course_views_collection.find(
+            {"course_id": {"$in": unique_ids}}, {"_id": 0, "course_id": 1, "payload": 1}
+        )
+    }
+
+    # Views are rebuilt after each ingest; until then fall back to the raw collections
+    if any(course_id not in views for course_id in unique_ids):
+        print("Some courses have no precomputed view, hydrating from MongoDB.")
+        return await ahydrate_courses(unique_ids, num_results)
+
+    return [views[course_id] for course_id in unique_ids[:num_results]]
+
+
+async def aretrieve_courses_from_db(query, filter, num_results=10):
+    """
+    Async version of data_retriever_pinecone.retrieve_courses_from_db.
+
+    The query embedding and MongoDB reads are awaited; the vector and BM25
+    searches (a blocking Pinecone call or in-process FAISS) run on a worker thread.
+    """
+    try:
+        # Loading or reloading the index reads from disk and MongoDB, so keep it off the event loop
+        lexical_index = await asyncio.to_thread(get_lexical_index) if RETRIEVAL_MODE == "hybrid" else None
+
+        retrieved_ids = exact_code_ids(query, filter, lexical_index)
+        if not retrieved_ids:
+            try:
+                query_embedding = await aembed_query(query)
+            except Exception as e:
+                print(f"Error encoding query: {e}")
+                return []
+
+            retrieved_ids = await asyncio.to_thread(
+                search_course_ids, query, query_embedding, filter, num_results, lexical_index
+            )
+
+        return await afetch_courses(retrieved_ids, num_results)
+
+    except Exception as e:
+        print(f"Unexpected error: {e}")
+        return []
@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+import argparse
+from openai import OpenAI, RateLimitError
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from RAG.embedding_pipeline import EmbeddingPipeline, retry_after_seconds
+from RAG.fake_openai_server import start_server
+
+EMBEDDING_MODEL = "text-embedding-ada-002"
+
+
+def run_benchmark(num_texts=2000, latency=0.2, rate_limit_every=7, upsert_latency=0.05, concurrency=8,
+                  batch_size=100, max_request_tokens=0, port=8089):
+    server, state = start_server(port=port, latency=latency, rate_limit_every=rate_limit_every, retry_after=0.5,
+                                 max_request_tokens=max_request_tokens)
+    client = OpenAI(api_key="fake", base_url=f"http://127.0.0.1:{port}/v1", max_retries=0)
+    texts = [f"Course {i}: a synthetic course description used for benchmarking." for i in range(num_texts)]
+
+    def embed_texts(batch):
+        response = client.embeddings.create(input=batch, model=EMBEDDING_MODEL)
+        return [data_point.embedding for data_point in response.data]
+
+    def upsert(batch, embeddings):
+        # Stands in for the vector store write of one batch
+        time.sleep(upsert_latency)
+
+    # Serial baseline doing the same work: embed a batch, upsert it, then the next one.
+    # Rate-limited batches are retried after the retry-after; other failures drop the batch.
+    start_time = time.time()
+    upserted = 0
+    for i in range(0, num_texts, batch_size):
+        batch = texts[i:i + batch_size]
+        while True:
+            try:
+                embeddings = embed_texts(batch)
+                upsert(batch, embeddings)
+                upserted += len(batch)
+            except RateLimitError as e:
+                time.sleep(retry_after_seconds(e) or 1)
+                continue
+            except Exception:
+                pass
+            break
+    serial_time = time.time() - start_time
+    print(f"Serial:   {upserted}/{num_texts} embedded and upserted in {serial_time:.2f}s")
+
+    # Concurrent pipeline: embedding requests in flight while earlier batches are upserted
+    state.requests = 0
+    pipeline = EmbeddingPipeline(embed_texts, upsert, concurrency=concurrency, initial_batch_size=batch_size)
+    start_time = time.time()
+    report = pipeline.run([{"text": text} for text in texts])
+    pipeline_time = time.time() - start_time
+    print(f"Pipeline: {report['upserted']}/{num_texts} embedded and upserted in {pipeline_time:.2f}s "
+          f"({report['batches']} batches, {report['retries']} retries, {report['splits']} splits, "
+          f"{report['failed']} failed)")
+    print(f"Speedup: {serial_time / pipeline_time:.1f}x, rate-limited responses: {state.rate_limited}")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare serial embedding with the concurrent embedding pipeline.")
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per embeddings response")
+    parser.add_argument("--rate-limit-every", type=int, default=7, help="Answer every Nth request with a 429 (0: never)")
+    parser.add_argument("--upsert-latency", type=float, default=0.05, help="Seconds per upserted batch")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--max-request-tokens", type=int, default=0,
+                        help="Reject embeddings requests over this many tokens, to exercise batch splitting")
+    parser.add_argument("--port", type=int, default=8089)
+    args = parser.parse_args()
+    run_benchmark(args.texts, args.latency, args.rate_limit_every, args.upsert_latency, args.concurrency,
+                  args.batch_size, args.max_request_tokens, args.port)
@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from mongodb.course_views import build_lecture_section_index
+from RAG.data_retriever_pinecone import courses_collection, meeting_sections_collection, prepare_course_document
+from RAG.embedding_cache import EmbeddingCache, text_key
+from RAG.embeddings import OPENAI_EMBEDDING_MODEL, OpenAIEmbeddingBackend, SentenceTransformerBackend
+
+
+def load_course_texts():
+    lecture_sections_by_id = build_lecture_section_index(
+        meeting_sections_collection.find({"type": "Lecture"}, {"_id": 0})
+    )
+    texts = []
+    for doc in courses_collection.find({}, {"_id": 0}):
+        _, combined_text, _ = prepare_course_document(doc, lecture_sections_by_id)
+        texts.append(combined_text)
+    return texts
+
+
+def normalize(matrix):
+    matrix = np.asarray(matrix, dtype='float32')
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def neighbours(matrix, query_rows, k):
+    """Top-k cosine neighbours of each query row, excluding the row itself."""
+    scores = matrix[query_rows] @ matrix.T
+    scores[np.arange(len(query_rows)), query_rows] = -np.inf
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def run_benchmark(num_queries=200, k=10, openai_sample=0):
+    texts = load_course_texts()
+
+    # Stored ada vectors come from the embedding cache filled by index builds
+    cache = EmbeddingCache()
+    cached = cache.get_embeddings(text_key(text, OPENAI_EMBEDDING_MODEL) for text in texts)
+    texts = [text for text in texts if text_key(text, OPENAI_EMBEDDING_MODEL) in cached]
+    if not texts:
+        print("No stored ada embeddings found; run upsert_embeddings_to_pinecone first.")
+        return
+    ada_vectors = normalize([cached[text_key(text, OPENAI_EMBEDDING_MODEL)] for text in texts])
+    print(f"Loaded {len(texts)} courses with stored ada embeddings.")
+
+    local_backend = SentenceTransformerBackend()
+    local_backend.embed(texts[:1])  # load the model before timing
+    start_time = time.time()
+    local_vectors = normalize(local_backend.embed(texts))
+    local_time = time.time() - start_time
+    print(f"Local ({local_backend.model}, {local_backend.num_threads} threads): "
+          f"{len(texts) / local_time:.1f} texts/s")
+
+    if openai_sample:
+        sample = texts[:openai_sample]
+        start_time = time.time()
+        OpenAIEmbeddingBackend().embed(sample)
+        openai_time = time.time() - start_time
+        print(f"OpenAI ({OPENAI_EMBEDDING_MODEL}): {len(sample) / openai_time:.1f} texts/s")
+
+    # Recall@k of the local neighbours against the ada neighbours
+    rng = np.random.default_rng(0)
+    query_rows = rng.choice(len(texts), size=min(num_queries, len(texts)), replace=False)
+    ada_neighbours = neighbours(ada_vectors, query_rows, k)
+    local_neighbours = neighbours(local_vectors, query_rows, k)
+    recall = np.mean([
+        len(set(ada_row) & set(local_row)) / k
+        for ada_row, local_row in zip(ada_neighbours, local_neighbours)
+    ])
+    print(f"Recall@{k} of local vs ada neighbours over {len(query_rows)} queries: {recall:.3f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare the local embedding backend against stored ada vectors.")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--openai-sample", type=int, default=0,
+                        help="Also time the OpenAI API on this many texts (makes paid API calls)")
+    args = parser.parse_args()
+    run_benchmark(args.queries, args.k, args.openai_sample)
@@ -0,0 +1,79 @@
+import os
+import sys
+import time
+from pymongo import MongoClient, monitoring
+from dotenv import load_dotenv
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from mongodb.course_views import build_course_payload
+from RAG.data_retriever_pinecone import COURSE_PROJECTION, hydrate_courses
+
+load_dotenv()
+MONGO_URI = os.getenv('MONGO_URI')
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Count the commands (round trips) sent to MongoDB."""
+
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def hydrate_courses_one_by_one(course_ids, num_results, courses, meeting_sections):
+    """The previous hydration path: one find_one and one find per course."""
+    retrieved_courses = []
+    course_ids_seen = set()
+    for course_id in course_ids:
+        if course_id in course_ids_seen:
+            continue
+        course = courses.find_one({"course_id": course_id}, COURSE_PROJECTION)
+        if not course:
+            continue
+        sections = [ms for ms in meeting_sections.find({'course_id': course_id}, {"_id": 0}) if ms.get('type') == "Lecture"]
+        retrieved_courses.append(build_course_payload(course, sections))
+        course_ids_seen.add(course_id)
+        if len(retrieved_courses) >= num_results:
+            break
+    return retrieved_courses
+
+
+def run_benchmark(sweep=(5, 10, 20, 50, 100), repeats=5):
+    counter = CommandCounter()
+    client = MongoClient(MONGO_URI, event_listeners=[counter])
+    db = client['uoft_courses']
+    courses = db['courses']
+    meeting_sections = db['meeting_sections']
+
+    # Use real course IDs so both paths do the same amount of work
+    all_ids = [doc["course_id"] for doc in courses.find({}, {"_id": 0, "course_id": 1}).limit(max(sweep))]
+
+    print(f"{'num_results':>11} | {'path':<11} | {'round trips':>11} | {'latency (ms)':>12}")
+    for num_results in sweep:
+        course_ids = all_ids[:num_results]
+        for name, hydrate in (("one-by-one", hydrate_courses_one_by_one), ("bulk", hydrate_courses)):
+            # Warm up the connection pool before timing
+            hydrate(course_ids, num_results, courses, meeting_sections)
+
+            counter.count = 0
+            start_time = time.time()
+            for _ in range(repeats):
+                results = hydrate(course_ids, num_results, courses, meeting_sections)
+            elapsed_ms = (time.time() - start_time) * 1000 / repeats
+            round_trips = counter.count / repeats
+            print(f"{num_results:>11} | {name:<11} | {round_trips:>11.0f} | {elapsed_ms:>12.1f}  ({len(results)} courses)")
+
+
+if __name__ == '__main__':
+    run_benchmark()
@@ -4,8 +4,6 @@ import time
 import numpy as np
 from pymongo import MongoClient
 from dotenv import load_dotenv
-from openai import OpenAI
-from pinecone import Pinecone, ServerlessSpec
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
@@ -14,28 +12,50 @@ sys.path.append(parent_dir)
 print(sys.path)
 
 from mongodb.db_store import extract_lecture_meeting_sections
+from mongodb.course_views import COURSE_VIEWS_COLLECTION, build_course_payload, build_lecture_section_index, fetch_course_views, lecture_delivery_modes
+from RAG.vector_store import get_vector_store
+from RAG.embedding_cache import EmbeddingCache, content_hash, text_key
+from RAG.embedding_pipeline import EmbeddingPipeline
+from RAG.query_cache import QueryEmbeddingCache
+from RAG.embeddings import get_embedding_backend
+from RAG.lexical_index import get_lexical_index, is_exact_code_query, reciprocal_rank_fusion
 
 
 # Load environment variables from .env file
 load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-openai = OpenAI(api_key=OPENAI_API_KEY)
 
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
+# Backend used for both document and query embeddings (EMBEDDING_BACKEND=openai|local)
+embedding_backend = get_embedding_backend()
+EMBEDDING_MODEL = embedding_backend.model
+
+# In-process LRU (and optional shared SQLite tier) for query embeddings
+query_cache = QueryEmbeddingCache(
+    max_size=int(os.getenv("QUERY_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("QUERY_CACHE_TTL", "86400")),
+    path=os.getenv("QUERY_CACHE_PATH"),
+    disk_max_rows=int(os.getenv("QUERY_CACHE_DISK_SIZE", "100000"))
+)
+
+# Retrieval mode: "vector" (dense only) or "hybrid" (BM25 fused with the vector search)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "vector").lower()
+HYBRID_CANDIDATE_FACTOR = 3
+HYBRID_VECTOR_WEIGHT = float(os.getenv("HYBRID_VECTOR_WEIGHT", "1.0"))
+HYBRID_LEXICAL_WEIGHT = float(os.getenv("HYBRID_LEXICAL_WEIGHT", "1.0"))
+
+# Concurrency and rate limits of the embedding requests made during index builds
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+EMBEDDING_REQUESTS_PER_MINUTE = int(os.getenv("EMBEDDING_REQUESTS_PER_MINUTE", "3000"))
+EMBEDDING_TOKENS_PER_MINUTE = int(os.getenv("EMBEDDING_TOKENS_PER_MINUTE", "1000000"))
+
 # PINECONE_ENVIRONMENT = os.getenv("PINECONE_ENVIRONMENT")
 MONGO_URI = os.getenv('MONGO_URI')
 
-# Initialize Pinecone
-pc = Pinecone(api_key=PINECONE_API_KEY)
-
-# Name of the Pinecone index
-INDEX_NAME = "course-embeddings"
-
 # Connect to MongoDB
 mongo_client = MongoClient(MONGO_URI)
 db = mongo_client['uoft_courses']
 courses_collection = db['courses']
 meeting_sections_collection = db['meeting_sections']
+course_views_collection = db[COURSE_VIEWS_COLLECTION]
 
 def sanitize_metadata_field(value, default_value):
     if not value or value in [None, [], '', 'null']:
@@ -43,11 +63,108 @@ def sanitize_metadata_field(value, default_value):
     return value
 
 
-def upsert_embeddings_to_pinecone():
+def prepare_course_document(doc, lecture_sections_by_id):
+    """
+    Build the text to embed and the vector metadata for one course document.
+
+    Returns:
+        tuple: (course_id, combined_text, metadata)
+    """
+    # Extract fields, substituting defaults as needed
+    course_id = str(doc.get('course_id', 'N/A'))
+    course_code = doc.get('course_code', 'N/A')
+    name = doc.get('name', 'N/A')
+    section_code = doc.get('section_code', 'N/A')
+    department = doc.get('department', 'N/A')
+    campus = doc.get('campus', 'N/A')
+    division = doc.get('division', 'N/A')
+    description = doc.get('description', 'N/A')
+    prerequisites = doc.get('prerequisites', 'No prerequisites')
+    if not prerequisites or prerequisites in [None, [], 'null']:
+        prerequisites = 'No prerequisites'
+    if not prerequisites:
+        prerequisites = 'No prerequisites'
+    exclusions = doc.get('exclusions', 'No exclusions')
+    if not exclusions or exclusions in [None, [], 'null']:
+        exclusions = 'No exclusions'
+    sessions = ', '.join(doc.get('sessions', [])) or 'N/A'
+
+    # Build a string representation of the meeting_sections
+    meeting_info = '\n'.join(extract_lecture_meeting_sections(doc['course_id'], lecture_sections_by_id))
+    delivery_modes = lecture_delivery_modes(lecture_sections_by_id.get(doc['course_id'], []))
+
+    # Create the combined text
+    combined_text = """This course {code} - '{name}' is offered by the {department} department in the {division}.
+                Course Description: {description}
+                Understanding the course code: {code}: The first three letters represent the department ({department_code}),
+                and the section code {section_code} indicates when it's offered - 'F' means Fall semester (September-December),
+                'S' means Winter semester (January-April), and 'Y' means full year course.
+                Prerequisites required: {prerequisites}
+                Exclusions: {exclusions}
+                This course is offered at the {campus} campus during these sessions: {sessions}.
+                Meeting Sections: {meeting_info}
+                """.format(
+        code=doc.get('course_code', 'N/A'),
+        name=doc.get('name', 'N/A'),
+        department=doc.get('department', 'N/A'),
+        division=doc.get('division', 'N/A'),
+        description=doc.get('description', 'N/A'),
+        department_code=doc.get('course_code', 'N/A')[:3],
+        section_code=doc.get('section_code', 'N/A'),
+        prerequisites=doc.get('prerequisites', 'No prerequisites'),
+        exclusions=doc.get('exclusions', 'No exclusions'),
+        campus=doc.get('campus', 'N/A'),
+        sessions=', '.join(doc.get('sessions', [])) or 'N/A',
+        meeting_info=meeting_info or 'N/A'
+    )
+
+    # Prepare metadata
+    metadata = {
+        "course_id": course_id,
+        "course_code": sanitize_metadata_field(course_code, "No Course Code"),
+        "name": sanitize_metadata_field(name, "No Course Name"),
+        "department": sanitize_metadata_field(department, "No Department Information"),
+        "division": sanitize_metadata_field(division, "No Division Information"),
+        "campus": sanitize_metadata_field(campus, "No Campus Information"),
+        "section_code": sanitize_metadata_field(section_code, "No Section Code"),
+        "prerequisites": sanitize_metadata_field(prerequisites, "No Prerequisites"),
+        "exclusions": sanitize_metadata_field(exclusions, "No Exclusions"),
+        "sessions": sanitize_metadata_field(sessions, "No Session Information"),
+        "meeting_info": sanitize_metadata_field(meeting_info, "No Meeting Information"),
+        "delivery_modes": sanitize_metadata_field(delivery_modes, ["Unknown"]),
+        "description": sanitize_metadata_field(description, "No Description Available")
+    }
+    return course_id, combined_text, metadata
+
+
+def upsert_embeddings_to_pinecone(force=False):
+    """
+    Embed the courses and upsert them into the vector store incrementally.
+
+    Only courses whose text or metadata changed since the last run are
+    upserted, and only texts missing from the embedding cache are sent to the
+    embeddings API, through a concurrent, rate-limited pipeline. Embeddings and
+    upserted courses are checkpointed batch by batch, so an interrupted build
+    resumes where it stopped. Vectors of courses that vanished from the catalog
+    are deleted.
+
+    Args:
+        force (bool): Upsert every course even if it is unchanged.
+
+    Returns:
+        dict: Run report with hit, miss, upsert, unchanged, delete and failure counts.
+    """
     print("Upserting embeddings to Pinecone...")
-    index = pc.Index(INDEX_NAME)
+    index = get_vector_store()
+    cache = EmbeddingCache()
 
     batch_size = 100
+
+    # Index the lecture sections by course once, instead of querying per course
+    lecture_sections_by_id = build_lecture_section_index(
+        meeting_sections_collection.find({"type": "Lecture"}, {"_id": 0})
+    )
+
     docs = list(courses_collection.find({}, {
         "_id": 0,
         "course_id": 1,
@@ -62,217 +179,262 @@ def upsert_embeddings_to_pinecone():
         "sessions": 1,
     }))
 
-    # Prepare and upsert embeddings in batches
-    for i in range(0, len(docs), batch_size):
-        batch = docs[i:i + batch_size]
-        texts = []
-        ids = []
-        metadata_list = []
-        for doc in batch:
-            try:
-                # Extract fields, substituting defaults as needed
-                course_id = str(doc.get('course_id', 'N/A'))
-                course_code = doc.get('course_code', 'N/A')
-                name = doc.get('name', 'N/A')
-                section_code = doc.get('section_code', 'N/A')
-                department = doc.get('department', 'N/A')
-                campus = doc.get('campus', 'N/A')
-                division = doc.get('division', 'N/A')
-                description = doc.get('description', 'N/A')
-                prerequisites = doc.get('prerequisites', 'No prerequisites')
-                if not prerequisites or prerequisites in [None, [], 'null']:
-                    prerequisites = 'No prerequisites'
-                if not prerequisites:
-                    prerequisites = 'No prerequisites'
-                exclusions = doc.get('exclusions', 'No exclusions')
-                if not exclusions or exclusions in [None, [], 'null']:
-                    exclusions = 'No exclusions'
-                sessions = ', '.join(doc.get('sessions', [])) or 'N/A'
-
-                # Retrieve the meeting_sections for this course
-                meeting_sections = list(meeting_sections_collection.find({'course_id': doc['course_id']}))
-
-                # Build a string representation of the meeting_sections
-                meeting_info = '\n'.join(extract_lecture_meeting_sections(doc['course_id'], meeting_sections))
-
-                # Create the combined text
-                combined_text = """This course {code} - '{name}' is offered by the {department} department in the {division}.
-                Course Description: {description}
-                Understanding the course code: {code}: The first three letters represent the department ({department_code}),
-                and the section code {section_code} indicates when it's offered - 'F' means Fall semester (September-December),
-                'S' means Winter semester (January-April), and 'Y' means full year course.
-                Prerequisites required: {prerequisites}
-                Exclusions: {exclusions}
-                This course is offered at the {campus} campus during these sessions: {sessions}.
-                Meeting Sections: {meeting_info}
-                """.format(
-                    code=doc.get('course_code', 'N/A'),
-                    name=doc.get('name', 'N/A'),
-                    department=doc.get('department', 'N/A'),
-                    division=doc.get('division', 'N/A'),
-                    description=doc.get('description', 'N/A'),
-                    department_code=doc.get('course_code', 'N/A')[:3],
-                    section_code=doc.get('section_code', 'N/A'),
-                    prerequisites=doc.get('prerequisites', 'No prerequisites'),
-                    exclusions=doc.get('exclusions', 'No exclusions'),
-                    campus=doc.get('campus', 'N/A'),
-                    sessions=', '.join(doc.get('sessions', [])) or 'N/A',
-                    meeting_info=meeting_info or 'N/A'
-                )
-                texts.append(combined_text)
-                ids.append(course_id)
-
-                # Prepare metadata
-                metadata = {
-                    "course_id": course_id,
-                    "course_code": sanitize_metadata_field(course_code, "No Course Code"),
-                    "name": sanitize_metadata_field(name, "No Course Name"),
-                    "department": sanitize_metadata_field(department, "No Department Information"),
-                    "division": sanitize_metadata_field(division, "No Division Information"),
-                    "campus": sanitize_metadata_field(campus, "No Campus Information"),
-                    "section_code": sanitize_metadata_field(section_code, "No Section Code"),
-                    "prerequisites": sanitize_metadata_field(prerequisites, "No Prerequisites"),
-                    "exclusions": sanitize_metadata_field(exclusions, "No Exclusions"),
-                    "sessions": sanitize_metadata_field(sessions, "No Session Information"),
-                    "meeting_info": sanitize_metadata_field(meeting_info, "No Meeting Information"),
-                    "description": sanitize_metadata_field(description, "No Description Available")
-                }
-                metadata_list.append(metadata)
+    # Work out which courses changed since the last run into this index
+    indexed_hashes = cache.indexed_hashes(index.backend, index.index_name)
+    if indexed_hashes and index.vector_count() == 0:
+        # The index was deleted or recreated since, so every course has to be upserted again
+        print(f"Vector index {index.index_name} ({index.backend}) is missing or empty; upserting every course.")
+        cache.clear_indexed(index.backend, index.index_name)
+        indexed_hashes = {}
+    current_ids = set()
+    changed = []
+    unchanged = 0
+    for doc in docs:
+        try:
+            course_id, combined_text, metadata = prepare_course_document(doc, lecture_sections_by_id)
+        except Exception as e:
+            print(f"Error processing document {doc.get('course_id', 'unknown')}: {e}")
+            # Still in the catalog, so keep whatever vector it already has
+            if doc.get('course_id') is not None:
+                current_ids.add(str(doc['course_id']))
+            continue
+        current_ids.add(course_id)
+        course_hash = content_hash(combined_text, metadata, EMBEDDING_MODEL)
+        if not force and indexed_hashes.get(course_id) == course_hash:
+            unchanged += 1
+            continue
+        changed.append((course_id, combined_text, metadata, course_hash))
+
+    report = {"hits": 0, "misses": 0, "upserted": 0, "unchanged": unchanged, "deleted": 0, "failed": 0}
+
+    # Courses upserted into a store that only persists on flush are recorded after the flush
+    pending_indexed = []
+
+    def upsert_batch(items, embeddings):
+        # Prepare vectors for upsert, including metadata if needed
+        vectors = [
+            {"id": item["course_id"], "values": embedding, "metadata": item["metadata"]}
+            for item, embedding in zip(items, embeddings)
+        ]
+
+        # Upsert vectors into Pinecone
+        index.upsert(vectors=vectors)
+        indexed = [(item["course_id"], item["content_hash"]) for item in items]
+        if index.writes_through:
+            cache.mark_indexed(index.backend, index.index_name, indexed)
+        else:
+            pending_indexed.extend(indexed)
+
+    # Split the changed courses into cache hits and texts that need embedding
+    items = [
+        {"course_id": course_id, "text": combined_text, "metadata": metadata,
+         "content_hash": course_hash, "key": text_key(combined_text, EMBEDDING_MODEL)}
+        for course_id, combined_text, metadata, course_hash in changed
+    ]
+    embeddings_by_key = cache.get_embeddings(item["key"] for item in items)
+    cached_items = [item for item in items if item["key"] in embeddings_by_key]
+    missing_items = [item for item in items if item["key"] not in embeddings_by_key]
+    report["hits"] = len(cached_items)
+
+    for i in range(0, len(cached_items), batch_size):
+        batch = cached_items[i:i + batch_size]
+        try:
+            upsert_batch(batch, [embeddings_by_key[item["key"]] for item in batch])
+            report["upserted"] += len(batch)
+        except Exception as e:
+            print(f"Error upserting embeddings: {e}")
+            report["failed"] += len(batch)
+
+    def embed_texts(texts):
+        # Retries are handled by the pipeline, so disable the client's own retries
+        return embedding_backend.embed(texts, max_retries=0)
+
+    def cache_and_upsert(batch, embeddings):
+        # Checkpoint the embeddings first, so a failed upsert or an interrupted
+        # build never pays for the same embeddings twice
+        cache.put_embeddings([(item["key"], embedding) for item, embedding in zip(batch, embeddings)], EMBEDDING_MODEL)
+        upsert_batch(batch, embeddings)
+
+    if missing_items:
+        pipeline = EmbeddingPipeline(
+            embed_texts,
+            cache_and_upsert,
+            concurrency=embedding_backend.max_concurrency or EMBEDDING_CONCURRENCY,
+            initial_batch_size=batch_size,
+            requests_per_minute=EMBEDDING_REQUESTS_PER_MINUTE,
+            tokens_per_minute=EMBEDDING_TOKENS_PER_MINUTE
+        )
+        pipeline_report = pipeline.run(missing_items)
+        report["misses"] = pipeline_report["embedded"]
+        report["upserted"] += pipeline_report["upserted"]
+        report["failed"] += pipeline_report["failed"]
+
+    # Delete vectors of courses that are no longer in the catalog
+    removed_ids = [course_id for course_id in indexed_hashes if course_id not in current_ids]
+    if removed_ids:
+        index.delete(removed_ids)
+        cache.unmark_indexed(index.backend, index.index_name, removed_ids)
+        report["deleted"] = len(removed_ids)
+
+    # Persist the local index (no-op for Pinecone, which writes through)
+    index.flush()
+    cache.mark_indexed(index.backend, index.index_name, pending_indexed)
+    print("Upsert to Pinecone completed.")
+    print(f"Embedding cache hits: {report['hits']}, misses: {report['misses']}, "
+          f"upserted: {report['upserted']}, unchanged: {report['unchanged']}, deleted: {report['deleted']}, "
+          f"failed: {report['failed']}")
+    return report
+
+
+# Fields of a course document needed to build the course payload
+COURSE_PROJECTION = {
+    "_id": 0,
+    "course_id": 1,
+    "course_code": 1,
+    "name": 1,
+    "description": 1,
+    "prerequisites": 1,
+    "department": 1,
+    "division": 1,
+    "exclusions": 1,
+    "campus": 1,
+    "section_code": 1,
+    "sessions": 1
+}
+
+
+def hydrate_courses(course_ids, num_results=10, courses=None, meeting_sections=None):
+    """
+    Fetch the details of the retrieved courses with one `$in` query for the
+    courses and one for their lecture sections, joined in memory.
 
-            except Exception as e:
-                print(f"Error processing document {doc.get('course_id', 'unknown')}: {e}")
-                continue
+    Args:
+        course_ids (list): Course IDs in vector search rank order (may contain duplicates).
+        num_results (int): Maximum number of courses to return.
+        courses, meeting_sections: Collections to read from (default: the module's collections).
 
-        # Generate embeddings for the batch
-        if texts:
-            try:
-                # Generate embeddings using OpenAI API
-                embeddings_response = openai.embeddings.create(
-                    input=texts,
-                    model="text-embedding-ada-002"
-                )
-                embeddings = [data_point.embedding for data_point in embeddings_response.data]
-
-                # Prepare vectors for upsert, including metadata if needed
-                vectors = []
-                for idx, embedding in enumerate(embeddings):
-                    vector = {
-                        "id": ids[idx],
-                        "values": embedding,
-                        "metadata": metadata_list[idx]
-                    }
-                    vectors.append(vector)
-
-                # Upsert vectors into Pinecone
-                index.upsert(vectors=vectors)
-            except Exception as e:
-                print(f"Error generating embeddings: {e}")
-                continue
-    print("Upsert to Pinecone completed.")
+    Returns:
+        list: Course payloads in rank order, deduplicated by course ID.
+    """
+    courses = courses if courses is not None else courses_collection
+    meeting_sections = meeting_sections if meeting_sections is not None else meeting_sections_collection
+
+    # Deduplicate while keeping the vector search rank order
+    unique_ids = list(dict.fromkeys(course_ids))
+    if not unique_ids:
+        return []
 
+    courses_by_id = {
+        course["course_id"]: course
+        for course in courses.find({"course_id": {"$in": unique_ids}}, COURSE_PROJECTION)
+    }
 
-def retrieve_courses_from_db(query, filter, num_results=10):
-    try:
-        print("Encoding the user query...")
+    lecture_sections_by_id = build_lecture_section_index(
+        meeting_sections.find({"course_id": {"$in": list(courses_by_id)}, "type": "Lecture"}, {"_id": 0})
+    )
+
+    retrieved_courses = []
+    for course_id in unique_ids:
+        course = courses_by_id.get(course_id)
+        if not course:
+            continue
         try:
-            query_response = openai.embeddings.create(
-                input=query,
-                model="text-embedding-ada-002"
-            )
-            query_embedding = query_response.data[0].embedding
-            print("Query encoded successfully.")
+            print(f"{course['course_code']: <10} - {course['name']}")
+            retrieved_courses.append(build_course_payload(course, lecture_sections_by_id.get(course_id, [])))
+            if len(retrieved_courses) >= num_results:
+                break
         except Exception as e:
-            print(f"Error encoding query: {e}")
-            return []
-
-        # Initialize Pinecone index
-        index = pc.Index(INDEX_NAME)
-
-        # Perform similarity search in Pinecone
-        print("Querying Pinecone for similar courses...")
-        search_response = index.query(
-            vector=query_embedding,
-            top_k=num_results,
-            include_metadata=True,
-            filter=filter
+            print(f"Error processing course {course_id}: {e}")
+            continue
+    return retrieved_courses
+
+
+def fetch_courses(course_ids, num_results=10):
+    """
+    Fetch the payloads of the retrieved courses from the precomputed
+    `course_views` in a single keyed fetch, falling back to hydrating them
+    from the raw collections when a view is missing.
+    """
+    unique_ids = list(dict.fromkeys(course_ids))
+    views = fetch_course_views(unique_ids, course_views_collection)
+
+    # Views are rebuilt after each ingest; until then fall back to the raw collections
+    if any(course_id not in views for course_id in unique_ids):
+        print("Some courses have no precomputed view, hydrating from MongoDB.")
+        return hydrate_courses(unique_ids, num_results)
+
+    return [views[course_id] for course_id in unique_ids[:num_results]]
+
+
+def embed_query(query):
+    """Embed a query with the configured backend, going through the query embedding cache."""
+    return query_cache.get_or_compute(query, EMBEDDING_MODEL, lambda text: embedding_backend.embed([text])[0])
+
+
+def exact_code_ids(query, filter, lexical_index):
+    """IDs of the courses named in a query that only names course codes (hybrid mode)."""
+    if lexical_index is None or not is_exact_code_query(query):
+        return []
+    retrieved_ids = lexical_index.exact_code_matches(query, filter)
+    print(f"Exact course code query, matched {len(retrieved_ids)} courses without an embedding call.")
+    return retrieved_ids
+
+
+def search_course_ids(query, query_embedding, filter, num_results, lexical_index):
+    """Rank course IDs by vector similarity, fused with BM25 when a lexical index is given."""
+    # Get the configured vector store (Pinecone or local FAISS)
+    index = get_vector_store()
+
+    # Retrieve a deeper candidate list when it is going to be fused
+    top_k = num_results * HYBRID_CANDIDATE_FACTOR if lexical_index is not None else num_results
+
+    # Perform similarity search in the vector store
+    print("Querying Pinecone for similar courses...")
+    search_response = index.query(
+        vector=query_embedding,
+        top_k=top_k,
+        include_metadata=True,
+        filter=filter
+    )
+
+    # Retrieve course IDs from the search results
+    retrieved_ids = [match['id'] for match in search_response['matches']]
+
+    print(f"Retrieved {len(retrieved_ids)} course IDs from Pinecone.")
+
+    if lexical_index is not None:
+        lexical_ids = [course_id for course_id, _ in lexical_index.search(query, top_k, filter)]
+        # Courses named by code in the query go first, then the fused ranking
+        exact_ids = lexical_index.exact_code_matches(query, filter)
+        retrieved_ids = exact_ids + reciprocal_rank_fusion(
+            [retrieved_ids, lexical_ids], [HYBRID_VECTOR_WEIGHT, HYBRID_LEXICAL_WEIGHT]
         )
+        print(f"Fused {len(lexical_ids)} BM25 matches with the vector matches.")
+    return retrieved_ids
 
-        # Retrieve course IDs from the search results
-        retrieved_ids = [match['id'] for match in search_response['matches']]
 
-        print(f"Retrieved {len(retrieved_ids)} course IDs from Pinecone.")
+def retrieve_courses_from_db(query, filter, num_results=10):
+    try:
+        # Hybrid mode fuses BM25 over the course text with the vector search
+        lexical_index = get_lexical_index() if RETRIEVAL_MODE == "hybrid" else None
 
-        # Fetch course details from MongoDB
-        retrieved_courses = []
-        course_ids_seen = set()
+        # The query only names course codes, so look them up without embedding it
+        retrieved_ids = exact_code_ids(query, filter, lexical_index)
 
-        for course_id in retrieved_ids:
-            if course_id in course_ids_seen:
-                continue
+        if not retrieved_ids:
+            print("Encoding the user query...")
             try:
-                course = courses_collection.find_one({"course_id": course_id}, {
-                    "_id": 0,
-                    "course_id": 1,
-                    "course_code": 1,
-                    "name": 1,
-                    "description": 1,
-                    "prerequisites": 1,
-                    "department": 1,
-                    "division": 1,
-                    "exclusions": 1,
-                    "campus": 1,
-                    "section_code": 1,
-                    "sessions": 1
-                })
-
-                if not course:
-                    continue
-                
-                print(f"{course['course_code']: <10} - {course['name']}")
-                # Retrieve the meeting_sections for this course
-                meeting_sections = list(meeting_sections_collection.find({'course_id': course_id}, {"_id":0}))
-
-                # Convert meeting_sections into desired string format
-                def format_meeting_section(ms):
-                    instructors = ', '.join(ms.get('instructors', []))
-                    # Format times
-                    times_str = []
-                    for t in ms.get('times', []):
-                        day = t.get('day', 'N/A')
-                        start = t.get('start', 'N/A')
-                        end = t.get('end', 'N/A')
-                        location = t.get('location', 'N/A')
-                        times_str.append(f"Day {day}, {start}-{end} at {location}")
-                    times_str = ', '.join(times_str)
-
-                    return f"Section: {ms.get('section_code','N/A')}, Type: {ms.get('type','N/A')}, Instructors: {instructors}, Times: {times_str}, Class Size: {ms.get('size','N/A')}"
-
-                meeting_sections_str = [format_meeting_section(ms) for ms in meeting_sections if ms.get('type') == "Lecture"]
-
-                # Create the final course object in the desired format
-                final_course = {
-                    "course_code": course.get("course_code", "N/A"),
-                    "name": course.get("name", "N/A"),
-                    "department": course.get("department", "N/A"),
-                    "division": course.get("division", "N/A"),
-                    "description": course.get("description", "N/A"),
-                    "prerequisites": course.get("prerequisites", "No prerequisites") or "No prerequisites",
-                    "exclusions": course.get("exclusions", "No exclusions") or "No exclusions",
-                    "campus": course.get("campus", "N/A"),
-                    "section_code": course.get("section_code", "N/A"),
-                    "sessions": ', '.join(course.get("sessions", [])) if course.get("sessions") else "N/A",
-                    "meeting_sections": meeting_sections_str
-                }
-
-                retrieved_courses.append(final_course)
-                course_ids_seen.add(course_id)
-
-                if len(retrieved_courses) >= num_results:
-                    break
+                query_embedding = embed_query(query)
+                print(f"Query encoded successfully. Query cache: {query_cache.stats()}")
             except Exception as e:
-                print(f"Error processing course {course_id}: {e}")
-                continue
-        
+                print(f"Error encoding query: {e}")
+                return []
+
+            retrieved_ids = search_course_ids(query, query_embedding, filter, num_results, lexical_index)
+
+        # Fetch course details from the precomputed course views
+        retrieved_courses = fetch_courses(retrieved_ids, num_results)
+
         # Print the retrieved courses
         for idx, course in enumerate(retrieved_courses):
             print(f"Course {idx + 1}: {course}")
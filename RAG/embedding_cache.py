@@ -0,0 +1,100 @@
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(current_dir, "embedding_cache.sqlite"))
+
+
+def text_key(text, model):
+    """Cache key of an embedding: a hash of the model name and the embedded text."""
+    return hashlib.sha256(f"{model}\0{text}".encode('utf-8')).hexdigest()
+
+
+def content_hash(text, metadata, model):
+    """Hash of everything written to the vector store for one course."""
+    payload = json.dumps([model, text, metadata], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent SQLite cache of document embeddings.
+
+    It stores two things:
+    - `embeddings`: vectors keyed by text_key(text, model), so unchanged text is never re-embedded.
+    - `indexed`: the content hash of every course currently in each vector index, keyed by
+      (backend, index_name, course_id), so unchanged courses are not upserted again and
+      removed courses can be deleted. Switching backend or index starts from an empty record.
+    """
+
+    def __init__(self, path=EMBEDDING_CACHE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, model TEXT, vector BLOB)")
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(indexed)")]
+            if columns and "backend" not in columns:
+                # Earlier versions did not record which index a course was upserted to;
+                # forgetting them costs one full upsert, the embeddings stay cached
+                print("Dropping the index records of an earlier version; the next upsert rewrites every course.")
+                self.conn.execute("DROP TABLE indexed")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS indexed (backend TEXT, index_name TEXT, course_id TEXT, content_hash TEXT, "
+                "PRIMARY KEY (backend, index_name, course_id))"
+            )
+
+    def get_embeddings(self, keys):
+        """Return a dict of key -> embedding (list of floats) for the cached keys."""
+        keys = list(keys)
+        found = {}
+        with self.lock:
+            # SQLite limits the number of bound parameters per statement
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                rows = self.conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype='float32').tolist()
+        return found
+
+    def put_embeddings(self, items, model):
+        """Store (key, embedding) pairs."""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector) VALUES (?, ?, ?)",
+                [(key, model, np.asarray(embedding, dtype='float32').tobytes()) for key, embedding in items]
+            )
+
+    def indexed_hashes(self, backend, index_name):
+        """Return a dict of course_id -> content hash for the courses in one vector index."""
+        with self.lock:
+            return dict(self.conn.execute(
+                "SELECT course_id, content_hash FROM indexed WHERE backend = ? AND index_name = ?", (backend, index_name)
+            ).fetchall())
+
+    def mark_indexed(self, backend, index_name, items):
+        """Record (course_id, content_hash) pairs that were upserted to a vector index."""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO indexed (backend, index_name, course_id, content_hash) VALUES (?, ?, ?, ?)",
+                [(backend, index_name, course_id, course_hash) for course_id, course_hash in items]
+            )
+
+    def unmark_indexed(self, backend, index_name, course_ids):
+        """Forget courses that were deleted from a vector index."""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "DELETE FROM indexed WHERE backend = ? AND index_name = ? AND course_id = ?",
+                [(backend, index_name, course_id) for course_id in course_ids]
+            )
+
+    def clear_indexed(self, backend, index_name):
+        """Forget every course of a vector index, e.g. after it was deleted or recreated."""
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM indexed WHERE backend = ? AND index_name = ?", (backend, index_name))
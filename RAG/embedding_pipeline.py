@@ -0,0 +1,243 @@
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled at `rate` tokens per second.
+
+    `pause` blocks every caller until a given time, which is how a server's
+    retry-after header is honoured across all workers.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.not_before = 0.0
+        self.lock = threading.Lock()
+
+    def pause(self, seconds):
+        with self.lock:
+            self.not_before = max(self.not_before, time.monotonic() + seconds)
+
+    def acquire(self, tokens=1):
+        # A single request larger than the bucket must still be allowed through
+        tokens = min(tokens, self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.not_before and self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait_time = max(self.not_before - now, (tokens - self.tokens) / self.rate)
+            time.sleep(wait_time)
+
+
+class AdaptiveBatchSize:
+    """Batch size that halves on failed requests and grows back after a run of successes."""
+
+    def __init__(self, initial=100, minimum=8, maximum=500, grow_after=3):
+        self.size = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.grow_after = grow_after
+        self.successes = 0
+        self.lock = threading.Lock()
+
+    def success(self):
+        with self.lock:
+            self.successes += 1
+            if self.successes >= self.grow_after:
+                self.size = min(self.maximum, int(self.size * 1.5))
+                self.successes = 0
+
+    def failure(self):
+        with self.lock:
+            self.size = max(self.minimum, self.size // 2)
+            self.successes = 0
+
+
+def retry_after_seconds(error):
+    """Read the retry-after header from an OpenAI API error, if there is one."""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    for header in ('retry-after-ms', 'retry-after'):
+        value = headers.get(header)
+        if value is None:
+            continue
+        try:
+            seconds = float(value)
+        except ValueError:
+            continue
+        return seconds / 1000 if header == 'retry-after-ms' else seconds
+    return None
+
+
+# Statuses no retry or smaller batch can fix: bad request, bad API key, no permission, unknown model
+NON_RETRYABLE_STATUSES = {400, 401, 403, 404, 422}
+
+
+def error_status(error):
+    """HTTP status of an OpenAI API error (or a requests/httpx error), if it has one."""
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status
+
+
+def is_request_too_large(error):
+    # The API rejects a request over its token limit with a 400 that names the limit
+    return error_status(error) == 400 and "token" in str(error).lower()
+
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English text
+    return max(1, len(text) // 4)
+
+
+class EmbeddingPipeline:
+    """
+    Embed items with bounded concurrency while upserting finished batches.
+
+    Embedding requests run on `concurrency` worker threads, gated by request
+    and token rate limits. Each embedded batch is handed to a single upsert
+    thread, so vector upserts overlap with the embedding calls still in flight.
+    Rate-limited requests are retried after the server's retry-after. A batch
+    that fails for another reason is split in half and the halves are embedded
+    separately, in case it was too large; single items are retried with
+    exponential backoff. The size of new batches adapts to failures. Errors
+    no retry can fix (a bad API key, a bad request other than one over the
+    token limit) stop the run at once.
+
+    Args:
+        embed_fn: Callable taking a list of texts and returning their embeddings.
+        upsert_fn: Callable taking (items, embeddings) for one embedded batch.
+            It is responsible for checkpointing (caching embeddings, recording
+            what was upserted) so an interrupted build resumes where it stopped.
+    """
+
+    def __init__(self, embed_fn, upsert_fn, concurrency=4, initial_batch_size=100, min_batch_size=8,
+                 max_batch_size=500, requests_per_minute=3000, tokens_per_minute=1000000, max_retries=5):
+        self.embed_fn = embed_fn
+        self.upsert_fn = upsert_fn
+        self.concurrency = concurrency
+        self.batch_size = AdaptiveBatchSize(initial_batch_size, min_batch_size, max_batch_size)
+        self.request_bucket = TokenBucket(requests_per_minute / 60, capacity=max(1, concurrency))
+        self.token_bucket = TokenBucket(tokens_per_minute / 60, capacity=tokens_per_minute / 60)
+        self.max_retries = max_retries
+        self.stats_lock = threading.Lock()
+        self.report = {"embedded": 0, "upserted": 0, "failed": 0, "retries": 0, "splits": 0, "batches": 0}
+
+    def _count(self, key, amount=1):
+        with self.stats_lock:
+            self.report[key] += amount
+
+    def _embed_with_retries(self, batch):
+        """
+        Embed one batch, retrying failures.
+
+        Returns:
+            tuple: (batch, embeddings, error, halves). `halves` is set instead of
+                retrying when a batch of several items fails for a reason other
+                than a rate limit.
+        """
+        texts = [item["text"] for item in batch]
+        tokens = sum(estimate_tokens(text) for text in texts)
+        for attempt in range(self.max_retries + 1):
+            self.request_bucket.acquire()
+            self.token_bucket.acquire(tokens)
+            try:
+                embeddings = self.embed_fn(texts)
+                self.batch_size.success()
+                return batch, embeddings, None, None
+            except Exception as e:
+                too_large = is_request_too_large(e)
+                if error_status(e) in NON_RETRYABLE_STATUSES and not too_large:
+                    raise
+                if too_large and len(batch) == 1:
+                    # One text over the limit fails the same way every time
+                    return batch, None, e, None
+                delay = retry_after_seconds(e)
+                if delay is None:
+                    # Rate limits are not caused by the batch size, other failures may be
+                    self.batch_size.failure()
+                    if len(batch) > 1:
+                        # Retrying at the same size would fail again if the batch is too large
+                        self._count("splits")
+                        print(f"Embedding batch of {len(batch)} failed ({e}), retrying it as two halves...")
+                        middle = len(batch) // 2
+                        return batch, None, None, [batch[:middle], batch[middle:]]
+                if attempt == self.max_retries:
+                    return batch, None, e, None
+                self._count("retries")
+                if delay is not None:
+                    # Stop every worker until the server says it is ready again
+                    self.request_bucket.pause(delay)
+                else:
+                    delay = min(30, 2 ** attempt) + random.uniform(0, 0.5)
+                    time.sleep(delay)
+                print(f"Embedding batch of {len(batch)} failed ({e}), retrying in {delay:.1f}s...")
+
+    def _upsert(self, batch, embeddings):
+        self.upsert_fn(batch, embeddings)
+        self._count("upserted", len(batch))
+
+    def run(self, items):
+        """
+        Embed and upsert all items (dicts with at least a "text" key).
+
+        Returns:
+            dict: Counts of embedded, upserted and failed items, retries, splits and batches.
+
+        Raises:
+            Exception: The first error that no retry can fix, once the requests
+                already in flight have finished.
+        """
+        queue = deque(items)
+        # Halves of failed batches, embedded before new batches are formed
+        split_batches = deque()
+        upsert_futures = []
+        with ThreadPoolExecutor(max_workers=self.concurrency) as embed_pool, \
+                ThreadPoolExecutor(max_workers=1) as upsert_pool:
+            in_flight = set()
+            while queue or split_batches or in_flight:
+                # Keep `concurrency` embedding requests in flight
+                while (queue or split_batches) and len(in_flight) < self.concurrency:
+                    if split_batches:
+                        batch = split_batches.popleft()
+                    else:
+                        batch = [queue.popleft() for _ in range(min(self.batch_size.size, len(queue)))]
+                    in_flight.add(embed_pool.submit(self._embed_with_retries, batch))
+                    self._count("batches")
+
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        batch, embeddings, error, halves = future.result()
+                    except Exception as e:
+                        print(f"Embedding failed with an error that retrying cannot fix, stopping: {e}")
+                        raise
+                    if halves is not None:
+                        split_batches.extend(halves)
+                        continue
+                    if error is not None:
+                        print(f"Giving up on a batch of {len(batch)} items: {error}")
+                        self._count("failed", len(batch))
+                        continue
+                    self._count("embedded", len(batch))
+                    upsert_futures.append((batch, upsert_pool.submit(self._upsert, batch, embeddings)))
+
+            for batch, future in upsert_futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"Error upserting a batch of {len(batch)} items: {e}")
+                    self._count("failed", len(batch))
+        return self.report
@@ -0,0 +1,137 @@
+import os
+import re
+import asyncio
+import threading
+from dotenv import load_dotenv
+from openai import AsyncOpenAI, OpenAI
+
+load_dotenv()
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+# Which embedding backend to use: "openai" (remote) or "local" (sentence-transformers on CPU)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai").lower()
+OPENAI_EMBEDDING_MODEL = "text-embedding-ada-002"
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+LOCAL_EMBEDDING_THREADS = int(os.getenv("LOCAL_EMBEDDING_THREADS", str(os.cpu_count() or 1)))
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "64"))
+
+# Name of the existing index of ada vectors; other backends and models get their own
+BASE_INDEX_NAME = "course-embeddings"
+# Pinecone index names are at most 45 lowercase letters, digits and hyphens
+MAX_INDEX_NAME_LENGTH = 45
+
+
+def default_index_name(backend=None):
+    """
+    Vector index name for an embedding backend and its model, used when
+    VECTOR_INDEX_NAME is not set.
+
+    Models produce vectors of different dimensions, so each gets its own index:
+    "course-embeddings" for ada, e.g. "course-embeddings-local-all-minilm-l6-v2"
+    for the default local model.
+    """
+    backend = (backend or EMBEDDING_BACKEND).lower()
+    model = LOCAL_EMBEDDING_MODEL if backend == "local" else OPENAI_EMBEDDING_MODEL
+    if backend == "openai" and model == OPENAI_EMBEDDING_MODEL:
+        return BASE_INDEX_NAME
+    model_slug = re.sub(r"[^a-z0-9]+", "-", model.split("/")[-1].lower()).strip("-")
+    return f"{BASE_INDEX_NAME}-{backend}-{model_slug}"[:MAX_INDEX_NAME_LENGTH].rstrip("-")
+
+
+class OpenAIEmbeddingBackend:
+    """Embeddings from the OpenAI API."""
+    name = "openai"
+    # Remote calls benefit from several requests in flight during index builds
+    max_concurrency = None
+
+    def __init__(self, model=OPENAI_EMBEDDING_MODEL, client=None):
+        self.model = model
+        self.client = client or OpenAI(api_key=OPENAI_API_KEY)
+        self.async_client = None
+
+    def embed(self, texts, max_retries=None):
+        """
+        Embed a list of texts.
+
+        Args:
+            max_retries (int): Override the client's retry count (the index build
+                pipeline handles retries itself and passes 0).
+        """
+        client = self.client if max_retries is None else self.client.with_options(max_retries=max_retries)
+        response = client.embeddings.create(input=texts, model=self.model)
+        return [data_point.embedding for data_point in response.data]
+
+    async def aembed(self, texts):
+        """Embed a list of texts without blocking the event loop."""
+        if self.async_client is None:
+            self.async_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+        response = await self.async_client.embeddings.create(input=texts, model=self.model)
+        return [data_point.embedding for data_point in response.data]
+
+
+class SentenceTransformerBackend:
+    """
+    Embeddings computed locally with sentence-transformers on the CPU.
+
+    The model is loaded lazily, once per process, on first use. Texts are
+    encoded in batches of `batch_size` using `num_threads` torch threads.
+    """
+    name = "local"
+    # The model already batches and uses every torch thread, so run one batch at a time
+    max_concurrency = 1
+
+    _models = {}
+    _load_lock = threading.Lock()
+
+    def __init__(self, model=LOCAL_EMBEDDING_MODEL, num_threads=LOCAL_EMBEDDING_THREADS,
+                 batch_size=LOCAL_EMBEDDING_BATCH_SIZE):
+        self.model = model
+        self.num_threads = num_threads
+        self.batch_size = batch_size
+        self.encode_lock = threading.Lock()
+
+    def _load(self):
+        with self._load_lock:
+            if self.model not in self._models:
+                import torch
+                from sentence_transformers import SentenceTransformer
+
+                torch.set_num_threads(self.num_threads)
+                print(f"Loading local embedding model {self.model} ({self.num_threads} threads)...")
+                self._models[self.model] = SentenceTransformer(self.model, device="cpu")
+            return self._models[self.model]
+
+    def embed(self, texts, max_retries=None):
+        model = self._load()
+        # Concurrent callers would only compete for the same CPU threads
+        with self.encode_lock:
+            embeddings = model.encode(
+                texts,
+                batch_size=self.batch_size,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            )
+        return embeddings.tolist()
+
+    async def aembed(self, texts):
+        # Encoding is CPU-bound, so run it off the event loop
+        return await asyncio.to_thread(self.embed, texts)
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_embedding_backend(backend=None):
+    """Return the process-wide embedding backend ("openai" or "local")."""
+    backend = (backend or EMBEDDING_BACKEND).lower()
+    with _backends_lock:
+        if backend not in _backends:
+            if backend == "openai":
+                _backends[backend] = OpenAIEmbeddingBackend()
+            elif backend == "local":
+                _backends[backend] = SentenceTransformerBackend()
+            else:
+                raise ValueError(f"Unknown embedding backend: {backend}")
+        return _backends[backend]
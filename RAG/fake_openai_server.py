@@ -0,0 +1,305 @@
+"""
+Local stand-in for the OpenAI embeddings and chat completions APIs, used to
+test and benchmark the index build and the /query pipeline without network
+access or cost. Point the client at it with
+
+    export OPENAI_BASE_URL=http://127.0.0.1:8089/v1
+
+Embeddings are deterministic (seeded by the input text), so the same text
+always gets the same vector. Chat completions return a canned reply after
+`chat_latency` seconds: structured recommendations when a JSON schema is
+requested, a search filter or a JSON course list when the system prompt asks
+for one, plain text otherwise. Streamed completions send the
+first chunk after a fifth of that time.
+
+Prompt caching is simulated the way the provider does it: a prompt whose
+first 1024+ tokens (in steps of 128) match an earlier prompt reports those as
+`cached_tokens`, and with `prefill_latency` set, only the uncached tokens add
+to the time before the response starts.
+"""
+import re
+import json
+import time
+import base64
+import hashlib
+import argparse
+import threading
+import numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeOpenAIState:
+    def __init__(self, latency=0.05, dimension=1536, rate_limit_every=0, retry_after=1.0, chat_latency=0.5,
+                 prefill_latency=0.0, prompt_cache=True, max_request_tokens=0):
+        self.latency = latency
+        self.chat_latency = chat_latency
+        # Seconds added per 1000 prompt tokens that miss the prompt cache
+        self.prefill_latency = prefill_latency
+        # Hashes of every cacheable prefix seen so far
+        self.prompt_cache = prompt_cache
+        self.prompt_prefixes = set()
+        self.dimension = dimension
+        # Answer every Nth request with a 429 (0 disables rate limiting)
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        # Reject embeddings requests over this many tokens with a 400, like the API's per-request limit (0 disables)
+        self.max_request_tokens = max_request_tokens
+        self.requests = 0
+        self.rate_limited = 0
+        self.lock = threading.Lock()
+
+
+FAKE_COURSES = [
+    {
+        "course_code": "CSC108H1",
+        "name": "Introduction to Computer Programming",
+        "department": "Department of Computer Science",
+        "division": "Faculty of Arts and Science",
+        "description": "Programming in a language such as Python.",
+        "prerequisites": "None",
+        "exclusions": "CSC120H1, CSC148H1",
+        "campus": "St. George",
+        "section_code": "F",
+        "sessions": "20249",
+        "meeting_sections": ["Section: LEC0101, Type: Lecture"]
+    }
+]
+
+
+# The provider caches prompts from this many tokens on, in steps of PROMPT_CACHE_STEP
+PROMPT_CACHE_MIN_TOKENS = 1024
+PROMPT_CACHE_STEP = 128
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def serialize_prompt(messages):
+    return "".join(f"<|{m.get('role')}|>{m.get('content') or ''}<|end|>" for m in messages)
+
+
+def fake_embedding(text, dimension):
+    seed = int(hashlib.sha256(text.encode('utf-8')).hexdigest()[:16], 16)
+    vector = np.random.default_rng(seed).standard_normal(dimension).astype('float32')
+    return vector / np.linalg.norm(vector)
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _rate_limited(self):
+        state = self.state
+        with state.lock:
+            state.requests += 1
+            limited = state.rate_limit_every and state.requests % state.rate_limit_every == 0
+            if limited:
+                state.rate_limited += 1
+        if limited:
+            self._send_json(
+                429,
+                {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                {"retry-after": str(state.retry_after)}
+            )
+        return limited
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        if self.path.rstrip("/").endswith("/embeddings"):
+            if self._rate_limited():
+                return
+            self.handle_embeddings(request)
+        elif self.path.rstrip("/").endswith("/chat/completions"):
+            if self._rate_limited():
+                return
+            self.handle_chat_completion(request)
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def handle_embeddings(self, request):
+        texts = request.get("input", [])
+        if isinstance(texts, str):
+            texts = [texts]
+
+        time.sleep(self.state.latency)
+
+        tokens = sum(max(1, len(text) // 4) for text in texts)
+        if self.state.max_request_tokens and tokens > self.state.max_request_tokens:
+            self._send_json(400, {"error": {
+                "message": f"Requested {tokens} tokens, max {self.state.max_request_tokens} tokens per request",
+                "type": "invalid_request_error", "code": "max_tokens_per_request"
+            }})
+            return
+
+        data = []
+        for i, text in enumerate(texts):
+            vector = fake_embedding(text, self.state.dimension)
+            if request.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.tobytes()).decode('ascii')
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+
+        self._send_json(200, {
+            "object": "list",
+            "data": data,
+            "model": request.get("model", "text-embedding-ada-002"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+        })
+
+
+    def cached_prompt_tokens(self, prompt):
+        """Return how many leading tokens of the prompt were cached, and cache its prefixes."""
+        state = self.state
+        if not state.prompt_cache:
+            return 0
+        cached_tokens = 0
+        digest = hashlib.sha256()
+        position = 0
+        hashes = []
+        for tokens in range(PROMPT_CACHE_MIN_TOKENS, len(prompt) // 4 + 1, PROMPT_CACHE_STEP):
+            digest.update(prompt[position:tokens * 4].encode('utf-8'))
+            position = tokens * 4
+            hashes.append((tokens, digest.copy().hexdigest()))
+        with state.lock:
+            for tokens, prefix_hash in hashes:
+                if prefix_hash not in state.prompt_prefixes:
+                    break
+                cached_tokens = tokens
+            state.prompt_prefixes.update(prefix_hash for _, prefix_hash in hashes)
+        return cached_tokens
+
+    def prompt_usage(self, messages, content):
+        prompt_tokens = sum(estimate_tokens(m.get("content") or "") for m in messages)
+        cached_tokens = min(self.cached_prompt_tokens(serialize_prompt(messages)), prompt_tokens)
+        completion_tokens = estimate_tokens(content)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens}
+        }
+        prefill_seconds = self.state.prefill_latency * (prompt_tokens - cached_tokens) / 1000
+        return usage, prefill_seconds
+
+    def handle_chat_completion(self, request):
+        messages = request.get("messages", [])
+        system_prompt = " ".join(m.get("content") or "" for m in messages if m.get("role") == "system")
+        if (request.get("response_format") or {}).get("type") == "json_schema":
+            courses = [dict(course, reasons=["A fake reason from the local stand-in."]) for course in FAKE_COURSES]
+            content = json.dumps({"courses": courses})
+        elif "filter" in system_prompt:
+            content = json.dumps({"campus": {"$in": ["St. George"]}})
+        elif "JSON array" in system_prompt:
+            content = json.dumps(FAKE_COURSES)
+        else:
+            content = "This is a fake completion from the local OpenAI stand-in."
+
+        usage, prefill_seconds = self.prompt_usage(messages, content)
+        if request.get("stream"):
+            self.stream_chat_completion(request, content, usage, prefill_seconds)
+            return
+
+        time.sleep(self.state.chat_latency + prefill_seconds)
+
+        self._send_json(200, {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "gpt-4o"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": usage
+        })
+
+
+    def stream_chat_completion(self, request, content, usage, prefill_seconds):
+        # The first chunk arrives after a fifth of the latency, the rest are spread over the remainder
+        pieces = re.findall(r"\S+\s*", content) or [content]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        time.sleep(self.state.chat_latency * 0.2 + prefill_seconds)
+        for i, piece in enumerate(pieces):
+            if i:
+                time.sleep(self.state.chat_latency * 0.8 / len(pieces))
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "gpt-4o"),
+                "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+        if (request.get("stream_options") or {}).get("include_usage"):
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "gpt-4o"),
+                "choices": [],
+                "usage": usage
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    # Load tests open hundreds of connections at once
+    request_queue_size = 1024
+
+
+def start_server(host="127.0.0.1", port=8089, **state_options):
+    """Start the fake server on a background thread and return (server, state)."""
+    state = FakeOpenAIState(**state_options)
+    handler = type("Handler", (FakeOpenAIHandler,), {"state": state})
+    server = FakeOpenAIServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run a local fake OpenAI API server.")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every embeddings response")
+    parser.add_argument("--chat-latency", type=float, default=0.5, help="Seconds added to every chat completion")
+    parser.add_argument("--prefill-latency", type=float, default=0.0,
+                        help="Seconds added per 1000 prompt tokens not served from the prompt cache")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="Answer every Nth request with a 429")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    args = parser.parse_args()
+
+    server, state = start_server(
+        port=args.port,
+        latency=args.latency,
+        chat_latency=args.chat_latency,
+        prefill_latency=args.prefill_latency,
+        rate_limit_every=args.rate_limit_every,
+        retry_after=args.retry_after
+    )
+    print(f"Fake OpenAI server listening on http://127.0.0.1:{args.port}/v1")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
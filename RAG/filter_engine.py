@@ -0,0 +1,289 @@
+import os
+import re
+import sys
+import threading
+from pymongo import MongoClient
+from dotenv import load_dotenv
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+load_dotenv()
+MONGO_URI = os.getenv('MONGO_URI')
+
+# Campus names as they appear in the catalog, with the ways students refer to them
+CAMPUS_ALIASES = {
+    "St. George": ["st. george", "st george", "saint george", "utsg", "downtown", "downtown toronto"],
+    "Scarborough": ["scarborough", "utsc"],
+    "University of Toronto at Mississauga": ["mississauga", "utm"],
+}
+DEFAULT_CAMPUS = "St. George"
+
+# Section codes matching each session preference ('F' fall, 'S' winter, 'Y' full year)
+SESSION_ALIASES = {
+    "F": ["fall", "autumn", "september"],
+    "S": ["winter", "spring", "january"],
+    "Y": ["full year", "full-year", "year-long", "year long", "whole year"],
+}
+SESSION_SECTION_CODES = {"F": ["F", "Y"], "S": ["S", "Y"], "Y": ["Y"]}
+# Season words that only name a term next to one of these words ("fall term", "in the fall", not "fall behind")
+SEASON_WORDS = {"fall", "autumn", "winter", "spring"}
+SEASON_WORDS_BEFORE = {"in", "for", "during", "this", "next", "the", "over", "upcoming", "coming", "and", "or", "only"}
+SEASON_WORDS_AFTER = {"term", "terms", "semester", "semesters", "session", "sessions", "course", "courses", "class",
+                      "classes", "offering", "offerings", "only", "and", "or"}
+
+# Delivery mode codes used by the timetable, grouped by what students ask for
+DELIVERY_MODE_ALIASES = {
+    "online": ["online", "remote", "virtual", "asynchronous", "synchronous online"],
+    "in_person": ["in-person", "in person", "on campus", "on-campus", "face to face", "face-to-face"],
+}
+DELIVERY_MODES = {
+    "online": ["SYNC", "ASYNC", "SYNIF", "ASYIF", "ONLSYNC", "ONLASYNC"],
+    "in_person": ["INPER", "HYBR"],
+}
+
+# Extra phrases for departments whose name contains the key, covering short forms
+# and subjects hidden behind abbreviated names
+DEPARTMENT_SYNONYMS = {
+    "computer science": ["cs", "comp sci", "compsci", "programming", "software"],
+    "computer and mathematical sci": ["computer science", "cs", "programming", "software", "mathematics", "math", "statistics"],
+    "mathematical and computational sciences": ["computer science", "cs", "programming", "software", "mathematics", "math"],
+    "physical and environmental sci": ["environmental science", "physics", "chemistry"],
+    "economics": ["econ"],
+    "psychology": ["psych"],
+    "mathematics": ["math", "maths"],
+    "statistical sciences": ["statistics", "stats"],
+    "political science": ["politics", "poli sci"],
+    "electrical and computer engin": ["electrical engineering", "computer engineering"],
+    "management": ["business", "commerce"],
+    "study of religion": ["religion", "religious studies"],
+}
+
+# Words too generic to identify a department on their own
+GENERIC_WORDS = {"computer", "studies", "sciences", "science", "program", "programs", "language", "culture", "cultures",
+                 "college", "centre", "institute", "office", "school", "faculty", "division", "applied", "engineering",
+                 "technology", "practice", "learning", "teaching", "society", "planning", "environment", "innovation",
+                 "literatures", "communication", "european"}
+
+# A constraint mentioned after one of these cues, in the same clause, is treated as excluded
+NEGATION_PATTERN = re.compile(
+    r"(\b(not|no|nothing|none|never|neither|nor|without|avoid\w*|exclud\w*|except|other than|rather not|dislike\w*|hate\w*|skip\w*)\b|n't\b)"
+)
+# Clause boundaries, ending the scope of a negation. Periods after abbreviations
+# ("st. george", "dept. of") do not end a sentence.
+CLAUSE_BOUNDARY_PATTERN = re.compile(
+    r"(?<!\bst)(?<!\bdept)(?<!\binst)(?<!\bdr)(?<!\bprof)(?<!\be\.g)(?<!\bi\.e)[.!?;,](?:\s+|$)"
+    r"|\s(?:but|however|although|though|whereas|instead|while)\s"
+    r"|\s(?:and|or)\s(?=(?:i\s|i'd\s|i'm\s|would\s|am\s)?(?:prefer|want|like|need|interested|looking)\b)"
+)
+
+
+def normalize_text(text):
+    text = (text or "").lower().replace("&", " and ")
+    # Sentence and clause punctuation is kept, to find the scope of negations
+    text = re.sub(r"[^a-z0-9.,;!?\-' ]+", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def clause_spans(text):
+    """(start, end) offsets of the clauses of a normalized text."""
+    spans, start = [], 0
+    for match in CLAUSE_BOUNDARY_PATTERN.finditer(text):
+        spans.append((start, match.start()))
+        start = match.end()
+    spans.append((start, len(text)))
+    return spans
+
+
+def is_negated(text, clause_start, position):
+    """Whether a negation cue comes before `position` in the clause starting at `clause_start`."""
+    return NEGATION_PATTERN.search(text, clause_start, position) is not None
+
+
+def is_season_mention(text, match):
+    """Whether a season word is used as a term ("winter courses", "in the fall") rather than otherwise."""
+    if match.group(1) not in SEASON_WORDS:
+        return True
+    before = text[:match.start()].split()
+    after = text[match.end():].split()
+    word_before = before[-1].strip(".,;!?") if before else ""
+    word_after = after[0].strip(".,;!?") if after else ""
+    return (word_before in SEASON_WORDS_BEFORE or word_after in SEASON_WORDS_AFTER
+            or re.fullmatch(r"20\d\d", word_after) is not None)
+
+
+def department_phrases(department):
+    """Key phrases identifying a department, e.g. "Dept. of Computer & Mathematical Sci (UTSC)"."""
+    name = re.sub(r"\(.*?\)", " ", department)
+    name = normalize_text(name)
+    name = re.sub(r"^(department|dept\.?|faculty|division|institute|inst\.?|centre|center|school) (of|for) (the )?", "", name)
+    name = name.strip(" .")
+    phrases = {name}
+    # Also match the parts of compound names ("ecology and evolutionary biology")
+    for part in re.split(r" and |, | - ", name):
+        part = part.strip(" .")
+        words = part.split()
+        if any(char.isdigit() for char in part):
+            continue
+        # Single words need to be distinctive nouns ("anthropology", not "physical")
+        if len(words) >= 2 or (len(part) >= 7 and not part.endswith("al") and part not in GENERIC_WORDS):
+            phrases.add(part)
+    for key, synonyms in DEPARTMENT_SYNONYMS.items():
+        if key in name:
+            phrases.update(synonyms)
+    return {phrase for phrase in phrases if phrase and phrase not in GENERIC_WORDS}
+
+
+def compile_alternation(phrases):
+    # Longest phrases first, so "computer science" wins over "science"
+    ordered = sorted(phrases, key=len, reverse=True)
+    return re.compile(r"(?<![a-z0-9])(" + "|".join(re.escape(phrase) for phrase in ordered) + r")(?![a-z0-9])")
+
+
+class FilterEngine:
+    """
+    Resolve a refined query into a vector search filter without an LLM call.
+
+    The lookup tables (campus -> departments, department -> division) are
+    built from the ingested courses. Campus, department, session and delivery
+    mode mentions are found with precompiled regular expressions.
+    """
+
+    def __init__(self, rows):
+        """
+        Args:
+            rows (iterable): Dicts with "campus", "department" and "division" keys, one per course
+                (or per distinct combination).
+        """
+        self.campus_departments = {}
+        self.department_divisions = {}
+        for row in rows:
+            campus, department = row.get("campus"), row.get("department")
+            if not campus or not department:
+                continue
+            self.campus_departments.setdefault(campus, set()).add(department)
+            if row.get("division"):
+                self.department_divisions.setdefault(department, set()).add(row["division"])
+
+        self.phrase_departments = {}
+        for departments in self.campus_departments.values():
+            for department in departments:
+                for phrase in department_phrases(department):
+                    self.phrase_departments.setdefault(phrase, set()).add(department)
+
+        self.department_pattern = compile_alternation(self.phrase_departments) if self.phrase_departments else None
+        self.campus_pattern, self.campus_by_alias = self._alias_pattern(CAMPUS_ALIASES)
+        self.session_pattern, self.session_by_alias = self._alias_pattern(SESSION_ALIASES)
+        self.delivery_pattern, self.delivery_by_alias = self._alias_pattern(DELIVERY_MODE_ALIASES)
+
+    @staticmethod
+    def _alias_pattern(aliases):
+        by_alias = {alias: key for key, values in aliases.items() for alias in values}
+        return compile_alternation(by_alias), by_alias
+
+    @staticmethod
+    def _mentions(pattern, text, accept=None):
+        """
+        Phrases matched in the text, skipping those a negation in their clause applies to.
+
+        The whole text is matched at once, so phrases containing punctuation
+        ("st. george") are found; clauses only scope the negations.
+
+        Args:
+            accept (callable): Optional check of (text, match) a mention must pass.
+        """
+        spans = clause_spans(text)
+        mentions = []
+        for match in pattern.finditer(text):
+            clause_start = next(start for start, end in reversed(spans) if start <= match.start())
+            if is_negated(text, clause_start, match.start()):
+                continue
+            if accept is not None and not accept(text, match):
+                continue
+            mentions.append(match.group(1))
+        return mentions
+
+    def resolve(self, refined_query):
+        """
+        Build a filter such as
+            {"campus": {"$in": ["St. George"]}, "department": {"$in": [...]}}
+        from the refined query.
+
+        Returns:
+            tuple: (filter dict, dict of which constraints were found in the query)
+        """
+        text = normalize_text(refined_query)
+
+        campuses = sorted({self.campus_by_alias[alias] for alias in self._mentions(self.campus_pattern, text)})
+        found = {"campus": bool(campuses)}
+        if not campuses:
+            campuses = [DEFAULT_CAMPUS]
+        filter_dict = {"campus": {"$in": campuses}}
+
+        # Only consider departments that exist at the chosen campuses
+        available = set().union(*(self.campus_departments.get(campus, set()) for campus in campuses))
+        departments = set()
+        if self.department_pattern is not None:
+            for phrase in self._mentions(self.department_pattern, text):
+                departments.update(self.phrase_departments[phrase] & available)
+        found["department"] = bool(departments)
+        if departments:
+            filter_dict["department"] = {"$in": sorted(departments)}
+
+        sessions = {self.session_by_alias[alias] for alias in self._mentions(self.session_pattern, text, is_season_mention)}
+        found["session"] = bool(sessions)
+        if sessions:
+            section_codes = set()
+            for session in sessions:
+                section_codes.update(SESSION_SECTION_CODES[session])
+            filter_dict["section_code"] = {"$in": sorted(section_codes)}
+
+        delivery = {self.delivery_by_alias[alias] for alias in self._mentions(self.delivery_pattern, text)}
+        # Asking for both is the same as having no preference
+        found["delivery_mode"] = len(delivery) == 1
+        if len(delivery) == 1:
+            filter_dict["delivery_modes"] = {"$in": DELIVERY_MODES[delivery.pop()]}
+
+        return filter_dict, found
+
+
+def relax_filter(filter_dict):
+    """Drop the session and delivery mode constraints, keeping campus and department."""
+    return {key: value for key, value in filter_dict.items() if key in ("campus", "department")}
+
+
+def load_filter_engine(mongo_uri=MONGO_URI):
+    """
+    Build the filter engine from the distinct campus/department/division combinations.
+
+    They are read from the local Arrow snapshot of the catalog when it exists,
+    otherwise aggregated in MongoDB.
+    """
+    # Imported here, so the backend starts without pyarrow and falls back to MongoDB
+    try:
+        from mongodb import catalog_snapshot
+    except ImportError:
+        catalog_snapshot = None
+    if catalog_snapshot is not None and catalog_snapshot.snapshot_exists():
+        columns = ["campus", "department", "division"]
+        rows = catalog_snapshot.load_snapshot("courses", columns).group_by(columns).aggregate([])
+        return FilterEngine(rows.to_pylist())
+    client = MongoClient(mongo_uri)
+    rows = client['uoft_courses']['courses'].aggregate([
+        {"$group": {"_id": {"campus": "$campus", "department": "$department", "division": "$division"}}}
+    ])
+    return FilterEngine(row["_id"] for row in rows)
+
+
+_filter_engine = None
+_filter_engine_lock = threading.Lock()
+
+
+def get_filter_engine():
+    """Return the process-wide filter engine, building it on first use."""
+    global _filter_engine
+    with _filter_engine_lock:
+        if _filter_engine is None:
+            _filter_engine = load_filter_engine()
+            print(f"Loaded filter engine with {len(_filter_engine.campus_departments)} campuses and "
+                  f"{len(_filter_engine.department_divisions)} departments")
+        return _filter_engine
@@ -0,0 +1,326 @@
+import os
+import re
+import sys
+import json
+import math
+import time
+import shutil
+import threading
+from collections import Counter
+import numpy as np
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from RAG.vector_store import match_filter
+from mongodb.course_views import build_lecture_section_index, lecture_delivery_modes
+from mongodb.data_transform import iter_transformed
+from mongodb.catalog_version import CATALOG_VERSION_CHECK_INTERVAL, read_catalog_version
+
+LEXICAL_INDEX_DIR = os.getenv("LEXICAL_INDEX_DIR", os.path.join(current_dir, "lexical_index"))
+# File in LEXICAL_INDEX_DIR naming the build directory to load
+CURRENT_BUILD_FILE = "CURRENT"
+ARRAY_NAMES = ("offsets", "doc_ids", "term_frequencies", "doc_lengths")
+
+# Metadata kept per course so lexical results honour the same filters as the vector search
+FILTER_FIELDS = ["department", "campus", "division", "section_code"]
+
+# How many times each field is repeated in a course's bag of words (a simple field boost)
+FIELD_WEIGHTS = {"course_code": 3, "name": 2, "description": 1, "prerequisites": 1}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+# Course codes such as CSC108, CSC108H1 or MAT137Y5
+COURSE_CODE_PATTERN = re.compile(r"\b([A-Za-z]{3}\d{3})([A-Za-z]\d)?\b")
+
+# Words that may accompany course codes in a query that is only about those codes
+CODE_QUERY_STOPWORDS = {
+    "a", "about", "and", "course", "courses", "details", "for", "i", "info", "information",
+    "is", "me", "of", "on", "or", "take", "tell", "the", "to", "want", "what", "with",
+}
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall((text or "").lower())
+
+
+def course_code_tokens(course_code):
+    """Index a code like CSC108H1 as "csc108h1", "csc108" and the department prefix "csc"."""
+    code = (course_code or "").lower()
+    match = COURSE_CODE_PATTERN.match(code)
+    if not match:
+        return tokenize(code)
+    return [code, match.group(1), match.group(1)[:3]]
+
+
+def find_course_codes(query):
+    """Return the base course codes (e.g. "CSC108") mentioned in a query."""
+    return [match.group(1).upper() for match in COURSE_CODE_PATTERN.finditer(query)]
+
+
+def is_exact_code_query(query):
+    """True if the query names course codes and says nothing else of substance."""
+    if not find_course_codes(query):
+        return False
+    remainder = COURSE_CODE_PATTERN.sub(" ", query)
+    return all(token in CODE_QUERY_STOPWORDS for token in tokenize(remainder))
+
+
+class LexicalIndex:
+    """
+    BM25 index over course code, name, description and prerequisites.
+
+    Postings are stored as flat numpy arrays (CSR layout): the postings of
+    term t are doc_ids[offsets[t]:offsets[t + 1]] with term frequencies in the
+    same slice of term_frequencies. The arrays are saved as .npy files and
+    memory-mapped on load.
+    """
+
+    def __init__(self, terms, offsets, doc_ids, term_frequencies, doc_lengths, course_ids, metadata, k1=1.2, b=0.75):
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.term_frequencies = term_frequencies
+        self.doc_lengths = doc_lengths
+        self.course_ids = course_ids
+        self.metadata = metadata
+        self.k1 = k1
+        self.b = b
+        self.average_length = float(np.mean(doc_lengths)) if len(doc_lengths) else 0.0
+
+        # Exact course code lookup (base code -> doc positions)
+        self.code_positions = {}
+        for position, metadata in enumerate(metadata):
+            match = COURSE_CODE_PATTERN.match(metadata.get("course_code") or "")
+            if match:
+                self.code_positions.setdefault(match.group(1).upper(), []).append(position)
+
+    @classmethod
+    def build(cls, courses, meeting_sections=()):
+        """
+        Build the index from course dictionaries (as streamed by data_transform.iter_transformed).
+
+        Args:
+            meeting_sections (iterable): Meeting section dictionaries, used for the
+                delivery_modes filter field.
+        """
+        lecture_sections_by_id = build_lecture_section_index(meeting_sections)
+        postings = {}
+        doc_lengths = []
+        course_ids = []
+        metadata = []
+        seen_ids = set()
+        for course in courses:
+            course_id = str(course["course_id"])
+            if course_id in seen_ids:
+                continue
+            seen_ids.add(course_id)
+
+            tokens = []
+            for field, weight in FIELD_WEIGHTS.items():
+                field_tokens = course_code_tokens(course.get(field)) if field == "course_code" else tokenize(course.get(field))
+                tokens.extend(field_tokens * weight)
+
+            position = len(course_ids)
+            for term, frequency in Counter(tokens).items():
+                postings.setdefault(term, []).append((position, frequency))
+            doc_lengths.append(len(tokens))
+            course_ids.append(course_id)
+            course_metadata = {field: course.get(field) for field in ["course_code"] + FILTER_FIELDS}
+            course_metadata["delivery_modes"] = lecture_delivery_modes(lecture_sections_by_id.get(course["course_id"], []))
+            metadata.append(course_metadata)
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype='int64')
+        for i, term in enumerate(terms):
+            offsets[i + 1] = offsets[i] + len(postings[term])
+        doc_ids = np.empty(offsets[-1], dtype='int32')
+        term_frequencies = np.empty(offsets[-1], dtype='float32')
+        for i, term in enumerate(terms):
+            entries = postings[term]
+            doc_ids[offsets[i]:offsets[i + 1]] = [position for position, _ in entries]
+            term_frequencies[offsets[i]:offsets[i + 1]] = [frequency for _, frequency in entries]
+
+        return cls(terms, offsets, doc_ids, term_frequencies, np.asarray(doc_lengths, dtype='float32'), course_ids, metadata)
+
+    def save(self, index_dir=LEXICAL_INDEX_DIR):
+        """
+        Write the index into a new build directory under index_dir, then point
+        the CURRENT file at it.
+
+        CURRENT is replaced atomically, so a reader loads either the old build
+        or the new one, never arrays of one with the metadata of the other.
+        The previous build is kept for processes that still have it mapped.
+        """
+        build = f"build-{time.time_ns()}"
+        build_dir = os.path.join(index_dir, build)
+        os.makedirs(build_dir)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(build_dir, f"{name}.npy"), getattr(self, name))
+        terms = sorted(self.term_ids, key=self.term_ids.get)
+        with open(os.path.join(build_dir, "meta.json"), 'w', encoding='utf-8') as outfile:
+            json.dump({"terms": terms, "course_ids": self.course_ids, "metadata": self.metadata}, outfile, ensure_ascii=False)
+
+        previous = current_build_dir(index_dir)
+        current_path = os.path.join(index_dir, CURRENT_BUILD_FILE)
+        with open(f"{current_path}.tmp", 'w', encoding='utf-8') as outfile:
+            outfile.write(build)
+        os.replace(f"{current_path}.tmp", current_path)
+
+        for name in os.listdir(index_dir):
+            path = os.path.join(index_dir, name)
+            if name.startswith("build-") and path not in (build_dir, previous):
+                shutil.rmtree(path, ignore_errors=True)
+
+    @classmethod
+    def load(cls, index_dir=LEXICAL_INDEX_DIR):
+        build_dir = current_build_dir(index_dir)
+        arrays = {
+            name: np.load(os.path.join(build_dir, f"{name}.npy"), mmap_mode='r')
+            for name in ARRAY_NAMES
+        }
+        with open(os.path.join(build_dir, "meta.json"), 'r', encoding='utf-8') as infile:
+            meta = json.load(infile)
+        return cls(meta["terms"], arrays["offsets"], arrays["doc_ids"], arrays["term_frequencies"],
+                   arrays["doc_lengths"], meta["course_ids"], meta["metadata"])
+
+    def _allowed(self, filter):
+        if not filter:
+            return None
+        return np.fromiter((match_filter(metadata, filter) for metadata in self.metadata), dtype=bool, count=len(self.metadata))
+
+    def search(self, query, top_k=10, filter=None):
+        """
+        Score every course against the query with BM25.
+
+        Returns:
+            list: (course_id, score) pairs, best first.
+        """
+        num_docs = len(self.course_ids)
+        scores = np.zeros(num_docs, dtype='float32')
+        query_terms = set(tokenize(query))
+        for code in find_course_codes(query):
+            query_terms.add(code.lower())
+
+        for term in query_terms:
+            term_id = self.term_ids.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            docs = self.doc_ids[start:end]
+            frequencies = self.term_frequencies[start:end]
+            idf = math.log(1 + (num_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            length_norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[docs] / self.average_length)
+            scores[docs] += idf * frequencies * (self.k1 + 1) / (frequencies + length_norm)
+
+        allowed = self._allowed(filter)
+        if allowed is not None:
+            scores[~allowed] = 0
+        candidates = np.flatnonzero(scores > 0)
+        best = candidates[np.argsort(-scores[candidates])[:top_k]]
+        return [(self.course_ids[position], float(scores[position])) for position in best]
+
+    def exact_code_matches(self, query, filter=None):
+        """Course IDs whose code matches a course code named in the query."""
+        matches = []
+        for code in find_course_codes(query):
+            for position in self.code_positions.get(code, []):
+                if not filter or match_filter(self.metadata[position], filter):
+                    matches.append(self.course_ids[position])
+        return list(dict.fromkeys(matches))
+
+
+def reciprocal_rank_fusion(rankings, weights=None, k=60):
+    """
+    Fuse several ranked lists of IDs with (weighted) reciprocal rank fusion.
+
+    Returns:
+        list: IDs ordered by fused score.
+    """
+    weights = weights or [1.0] * len(rankings)
+    scores = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, item_id in enumerate(ranking):
+            scores[item_id] = scores.get(item_id, 0.0) + weight / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def current_build_dir(index_dir=LEXICAL_INDEX_DIR):
+    """
+    Return the directory of the current build, or None if there is none.
+
+    An index saved before builds were versioned (files directly in index_dir) is still read.
+    """
+    try:
+        with open(os.path.join(index_dir, CURRENT_BUILD_FILE), 'r', encoding='utf-8') as infile:
+            return os.path.join(index_dir, infile.read().strip())
+    except FileNotFoundError:
+        return index_dir if os.path.exists(os.path.join(index_dir, "meta.json")) else None
+
+
+def lexical_index_exists(index_dir=LEXICAL_INDEX_DIR):
+    return current_build_dir(index_dir) is not None
+
+
+def build_lexical_index(index_dir=LEXICAL_INDEX_DIR):
+    """
+    Build the index from the transformed records and save it.
+
+    Returns:
+        LexicalIndex: The new index.
+    """
+    index = LexicalIndex.build(iter_transformed('courses'), iter_transformed('meeting_sections'))
+    index.save(index_dir)
+    print(f"Built lexical index over {len(index.course_ids)} courses and {len(index.term_ids)} terms in {index_dir}")
+    return index
+
+
+_lexical_index = None
+_lexical_index_version = None
+_lexical_index_checked_at = 0.0
+_lexical_index_lock = threading.Lock()
+
+
+def get_lexical_index():
+    """
+    Return the process-wide lexical index, or None if it has not been built.
+
+    The catalog version is re-read at most every CATALOG_VERSION_CHECK_INTERVAL
+    seconds; when an ingest has changed it, the index is reloaded from disk.
+    """
+    global _lexical_index, _lexical_index_version, _lexical_index_checked_at
+    with _lexical_index_lock:
+        now = time.time()
+        if now - _lexical_index_checked_at < CATALOG_VERSION_CHECK_INTERVAL:
+            return _lexical_index
+        _lexical_index_checked_at = now
+
+        try:
+            version = read_catalog_version()
+        except Exception as e:
+            print(f"Could not read the catalog version, keeping the current lexical index: {e}")
+            version = _lexical_index_version
+        if _lexical_index is not None and version == _lexical_index_version:
+            return _lexical_index
+
+        if not lexical_index_exists():
+            print(f"No lexical index found in {LEXICAL_INDEX_DIR}; run mongodb/db_store.py or RAG/lexical_index.py to build it.")
+            return _lexical_index
+        try:
+            index = LexicalIndex.load()
+        except (OSError, ValueError) as e:
+            print(f"Could not load the lexical index, keeping the current one: {e}")
+            return _lexical_index
+        if _lexical_index is not None:
+            print(f"Catalog version changed to {version}; reloading the lexical index.")
+        _lexical_index = index
+        _lexical_index_version = version
+        return _lexical_index
+
+
+def main():
+    build_lexical_index()
+
+
+if __name__ == '__main__':
+    main()
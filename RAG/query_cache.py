@@ -0,0 +1,190 @@
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+def normalize_query(text):
+    """Normalize a query so trivially different spellings share a cache entry."""
+    return re.sub(r'\s+', ' ', text).strip().lower()
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache with an optional time-to-live.
+
+    Args:
+        max_size (int): Maximum number of entries before the least recently used is evicted.
+        ttl (float): Seconds an entry stays valid (None for no expiry).
+    """
+
+    def __init__(self, max_size=1024, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self.lock:
+            self.entries[key] = (value, expires_at)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class QueryEmbeddingCache:
+    """
+    Two-tier cache of query embeddings keyed on the normalized query text and
+    the embedding model: an in-process LRU and, if `path` is set, a SQLite
+    file that can be shared by several worker processes.
+
+    The SQLite tier is pruned on open and every `prune_every` writes: rows
+    older than the TTL are deleted, then the oldest rows beyond `disk_max_rows`.
+    """
+
+    def __init__(self, max_size=1024, ttl=86400, path=None, disk_max_rows=100000, prune_every=100):
+        self.memory = LRUCache(max_size, ttl)
+        self.ttl = ttl
+        self.disk_max_rows = disk_max_rows
+        self.prune_every = prune_every
+        self.disk_writes = 0
+        self.conn = None
+        self.lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "disk_pruned": 0}
+        if path:
+            self.conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+            with self.conn:
+                self.conn.execute("PRAGMA journal_mode=WAL")
+                self.conn.execute(
+                    "CREATE TABLE IF NOT EXISTS query_embeddings (key TEXT PRIMARY KEY, vector BLOB, created REAL)"
+                )
+                self.conn.execute(
+                    "CREATE INDEX IF NOT EXISTS query_embeddings_created ON query_embeddings (created)"
+                )
+            self._disk_prune()
+
+    @staticmethod
+    def cache_key(text, model):
+        return hashlib.sha256(f"{model}\0{normalize_query(text)}".encode('utf-8')).hexdigest()
+
+    def _count(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+
+    def _disk_get(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT vector, created FROM query_embeddings WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        vector, created = row
+        if self.ttl and created + self.ttl < time.time():
+            return None
+        return np.frombuffer(vector, dtype='float32').tolist()
+
+    def _disk_set(self, key, embedding):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO query_embeddings (key, vector, created) VALUES (?, ?, ?)",
+                (key, np.asarray(embedding, dtype='float32').tobytes(), time.time())
+            )
+            self.disk_writes += 1
+            prune = self.disk_writes % self.prune_every == 0
+        if prune:
+            self._disk_prune()
+
+    def _disk_prune(self):
+        """Delete rows past the TTL, then the oldest rows beyond disk_max_rows."""
+        with self.lock, self.conn:
+            pruned = 0
+            if self.ttl:
+                pruned += self.conn.execute(
+                    "DELETE FROM query_embeddings WHERE created < ?", (time.time() - self.ttl,)
+                ).rowcount
+            if self.disk_max_rows:
+                pruned += self.conn.execute(
+                    "DELETE FROM query_embeddings WHERE key IN "
+                    "(SELECT key FROM query_embeddings ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                    (self.disk_max_rows,)
+                ).rowcount
+            self.counters["disk_pruned"] += pruned
+
+    def _lookup(self, key):
+        embedding = self.memory.get(key)
+        if embedding is not None:
+            self._count("memory_hits")
+            return embedding
+
+        if self.conn is not None:
+            embedding = self._disk_get(key)
+            if embedding is not None:
+                self._count("disk_hits")
+                self.memory.set(key, embedding)
+                return embedding
+
+        self._count("misses")
+        return None
+
+    def _store(self, key, embedding):
+        self.memory.set(key, embedding)
+        if self.conn is not None:
+            self._disk_set(key, embedding)
+
+    def get_or_compute(self, text, model, compute_fn):
+        """
+        Return the cached embedding of `text` for `model`, calling
+        `compute_fn(text)` and caching its result on a miss.
+        """
+        key = self.cache_key(text, model)
+        embedding = self._lookup(key)
+        if embedding is None:
+            embedding = compute_fn(text)
+            self._store(key, embedding)
+        return embedding
+
+    async def aget_or_compute(self, text, model, compute_fn):
+        """Same as get_or_compute, for a `compute_fn(text)` that returns an awaitable."""
+        key = self.cache_key(text, model)
+        embedding = self._lookup(key)
+        if embedding is None:
+            embedding = await compute_fn(text)
+            self._store(key, embedding)
+        return embedding
+
+    def stats(self):
+        """Return the hit/miss counters and the overall hit rate."""
+        with self.lock:
+            stats = dict(self.counters)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        stats["size"] = len(self.memory)
+        stats["evictions"] = self.memory.evictions
+        return stats
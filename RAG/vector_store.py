@@ -0,0 +1,373 @@
+import os
+import sys
+import json
+import threading
+import numpy as np
+import faiss
+from dotenv import load_dotenv
+from pinecone import Pinecone
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from RAG.embeddings import default_index_name
+
+load_dotenv()
+PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
+
+# Which vector store backend to use: "pinecone" (remote) or "faiss" (local)
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "pinecone").lower()
+
+# Name of the Pinecone index (also used as the file name of the local FAISS index).
+# Vectors from different embedding backends have different dimensions, so by
+# default the name is derived from the embedding backend and model.
+INDEX_NAME = os.getenv("VECTOR_INDEX_NAME") or default_index_name()
+
+# Directory holding the local FAISS index and its metadata
+current_dir = os.path.dirname(os.path.abspath(__file__))
+FAISS_INDEX_DIR = os.getenv("FAISS_INDEX_DIR", os.path.join(current_dir, "faiss_index"))
+# Read flag that memory-maps the vectors of a flat index. IO_FLAG_MMAP does not
+# apply to flat indexes; IO_FLAG_MMAP_IFC only exists from faiss 1.11 on.
+FAISS_MMAP_FLAG = getattr(faiss, "IO_FLAG_MMAP_IFC", None)
+
+
+def _as_list(value):
+    if isinstance(value, (list, tuple, set)):
+        return list(value)
+    return [value]
+
+
+def match_filter(metadata, filter):
+    """
+    Check whether a metadata dict satisfies a Mongo-style metadata filter.
+
+    Supports the same subset of operators Pinecone accepts: implicit equality,
+    $eq, $ne, $in, $nin, $gt, $gte, $lt, $lte, $exists, $and and $or. List-valued
+    metadata fields match if any of their elements match.
+
+    Args:
+        metadata (dict): Metadata of a single vector.
+        filter (dict): Filter such as {"campus": {"$in": ["St. George"]}}.
+
+    Returns:
+        bool: True if the metadata matches the filter.
+    """
+    if not filter:
+        return True
+
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(match_filter(metadata, sub_filter) for sub_filter in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(match_filter(metadata, sub_filter) for sub_filter in condition):
+                return False
+            continue
+
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+
+        present = key in metadata
+        values = _as_list(metadata.get(key))
+        for op, operand in condition.items():
+            if op == "$eq":
+                matched = present and operand in values
+            elif op == "$ne":
+                matched = not present or operand not in values
+            elif op == "$in":
+                matched = present and any(value in operand for value in values)
+            elif op == "$nin":
+                matched = not present or all(value not in operand for value in values)
+            elif op == "$exists":
+                matched = present == bool(operand)
+            elif op in ("$gt", "$gte", "$lt", "$lte"):
+                try:
+                    matched = present and any(
+                        (op == "$gt" and value > operand) or
+                        (op == "$gte" and value >= operand) or
+                        (op == "$lt" and value < operand) or
+                        (op == "$lte" and value <= operand)
+                        for value in values
+                    )
+                except TypeError:
+                    matched = False
+            else:
+                raise ValueError(f"Unsupported filter operator: {op}")
+            if not matched:
+                return False
+    return True
+
+
+class VectorStore:
+    """Common interface of the vector store backends used by the retriever."""
+
+    # Whether upserts are durable as soon as upsert() returns (otherwise only after flush())
+    writes_through = True
+
+    def upsert(self, vectors):
+        """Insert or replace vectors given as {"id", "values", "metadata"} dicts."""
+        raise NotImplementedError
+
+    def query(self, vector, top_k=10, filter=None, include_metadata=True):
+        """
+        Return the top_k most similar vectors.
+
+        Returns:
+            dict: {"matches": [{"id": ..., "score": ..., "metadata": ...}, ...]}
+        """
+        raise NotImplementedError
+
+    def delete(self, ids):
+        """Delete the vectors with the given ids."""
+        raise NotImplementedError
+
+    def flush(self):
+        """Persist pending writes. Remote backends write through, so this is a no-op."""
+        pass
+
+    def vector_count(self):
+        """Number of vectors stored in the index (0 if it does not exist yet)."""
+        raise NotImplementedError
+
+
+class PineconeVectorStore(VectorStore):
+    backend = "pinecone"
+
+    def __init__(self, index_name=INDEX_NAME):
+        self.index_name = index_name
+        self.pc = Pinecone(api_key=PINECONE_API_KEY)
+        self.index = self.pc.Index(index_name)
+
+    def upsert(self, vectors):
+        self.index.upsert(vectors=vectors)
+
+    def delete(self, ids, batch_size=1000):
+        ids = list(ids)
+        for i in range(0, len(ids), batch_size):
+            self.index.delete(ids=ids[i:i + batch_size])
+
+    def query(self, vector, top_k=10, filter=None, include_metadata=True):
+        response = self.index.query(
+            vector=vector,
+            top_k=top_k,
+            include_metadata=include_metadata,
+            filter=filter
+        )
+        return {
+            "matches": [
+                {"id": match["id"], "score": match["score"], "metadata": match.get("metadata") or {}}
+                for match in response["matches"]
+            ]
+        }
+
+    def vector_count(self):
+        return self.index.describe_index_stats()["total_vector_count"]
+
+
+class FaissVectorStore(VectorStore):
+    """
+    Local FAISS vector store.
+
+    The index is an inner-product flat index over L2-normalized vectors, so
+    scores are cosine similarities like the Pinecone index. It is stored as two
+    files in FAISS_INDEX_DIR: `<name>.faiss` and `<name>.meta.json` (vector ids
+    and metadata, in index order). The vectors are memory-mapped on load with
+    faiss 1.11 or later and read into memory with older versions; the metadata
+    and its filter postings are always loaded into memory.
+    """
+    backend = "faiss"
+    writes_through = False
+
+    def __init__(self, index_dir=FAISS_INDEX_DIR, index_name=INDEX_NAME):
+        self.index_name = index_name
+        self.index_path = os.path.join(index_dir, f"{index_name}.faiss")
+        self.metadata_path = os.path.join(index_dir, f"{index_name}.meta.json")
+        self.index = None
+        self.ids = []
+        self.metadata = []
+        self.positions = {}
+        self.field_postings = {}
+        self.pending = {}
+        self.pending_deletes = set()
+        if os.path.exists(self.index_path) and os.path.exists(self.metadata_path):
+            self.load()
+
+    def load(self):
+        if FAISS_MMAP_FLAG is not None:
+            # Workers on one host share the mapped pages instead of each holding a copy
+            self.index = faiss.read_index(self.index_path, FAISS_MMAP_FLAG | faiss.IO_FLAG_READ_ONLY)
+        else:
+            self.index = faiss.read_index(self.index_path)
+        with open(self.metadata_path, 'r', encoding='utf-8') as infile:
+            stored = json.load(infile)
+        self.ids = stored["ids"]
+        self.metadata = stored["metadata"]
+        self.positions = {vector_id: position for position, vector_id in enumerate(self.ids)}
+
+        # Inverted lists of positions for each (field, value) pair, used to
+        # resolve $eq/$in filters without scanning every metadata dict
+        self.field_postings = {}
+        for position, metadata in enumerate(self.metadata):
+            for field, value in metadata.items():
+                postings = self.field_postings.setdefault(field, {})
+                for item in _as_list(value):
+                    if isinstance(item, (str, int, float, bool)):
+                        postings.setdefault(item, []).append(position)
+
+    def _candidate_positions(self, filter):
+        """Resolve a filter to the array of positions that satisfy it."""
+        simple = all(
+            not key.startswith("$") and (
+                not isinstance(condition, dict) or set(condition) <= {"$eq", "$in"}
+            )
+            for key, condition in filter.items()
+        )
+        if not simple:
+            return np.array([
+                position for position, metadata in enumerate(self.metadata)
+                if match_filter(metadata, filter)
+            ], dtype='int64')
+
+        candidates = None
+        for field, condition in filter.items():
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            postings = self.field_postings.get(field, {})
+            for op, operand in condition.items():
+                wanted = [operand] if op == "$eq" else operand
+                positions = set()
+                for value in wanted:
+                    positions.update(postings.get(value, []))
+                candidates = positions if candidates is None else candidates & positions
+        return np.array(sorted(candidates or []), dtype='int64')
+
+    def query(self, vector, top_k=10, filter=None, include_metadata=True):
+        if self.index is None or self.index.ntotal == 0:
+            return {"matches": []}
+
+        query_vector = np.asarray([vector], dtype='float32')
+        faiss.normalize_L2(query_vector)
+
+        params = None
+        if filter:
+            candidates = self._candidate_positions(filter)
+            if len(candidates) == 0:
+                return {"matches": []}
+            params = faiss.SearchParameters(sel=faiss.IDSelectorBatch(candidates))
+
+        scores, positions = self.index.search(query_vector, min(top_k, self.index.ntotal), params=params)
+
+        matches = []
+        for score, position in zip(scores[0], positions[0]):
+            if position < 0:
+                continue
+            match = {"id": self.ids[position], "score": float(score)}
+            if include_metadata:
+                match["metadata"] = self.metadata[position]
+            matches.append(match)
+        return {"matches": matches}
+
+    def vector_count(self):
+        return self.index.ntotal if self.index is not None else 0
+
+    def upsert(self, vectors):
+        for vector in vectors:
+            self.pending[vector["id"]] = (vector["values"], vector.get("metadata") or {})
+            self.pending_deletes.discard(vector["id"])
+
+    def delete(self, ids):
+        for vector_id in ids:
+            self.pending.pop(vector_id, None)
+            self.pending_deletes.add(vector_id)
+
+    def flush(self):
+        """Merge pending upserts and deletes into the stored index and rewrite it to disk."""
+        if not self.pending and not self.pending_deletes:
+            return
+
+        ids = []
+        metadata = []
+        values = []
+        dimension = self.index.d if self.index is not None else None
+        # Keep existing vectors that are not being replaced or deleted
+        if self.index is not None and self.index.ntotal > 0:
+            existing = self.index.reconstruct_n(0, self.index.ntotal)
+            for position, vector_id in enumerate(self.ids):
+                if vector_id not in self.pending and vector_id not in self.pending_deletes:
+                    ids.append(vector_id)
+                    metadata.append(self.metadata[position])
+                    values.append(existing[position])
+        for vector_id, (vector_values, vector_metadata) in self.pending.items():
+            ids.append(vector_id)
+            metadata.append(vector_metadata)
+            values.append(np.asarray(vector_values, dtype='float32'))
+
+        if values:
+            matrix = np.vstack(values).astype('float32')
+            faiss.normalize_L2(matrix)
+            dimension = matrix.shape[1]
+        if dimension is None:
+            self.pending_deletes = set()
+            return
+        index = faiss.IndexFlatIP(dimension)
+        if values:
+            index.add(matrix)
+
+        # Write to temporary files first so readers never see a partial index
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        faiss.write_index(index, self.index_path + ".tmp")
+        with open(self.metadata_path + ".tmp", 'w', encoding='utf-8') as outfile:
+            json.dump({"ids": ids, "metadata": metadata}, outfile, ensure_ascii=False)
+        os.replace(self.index_path + ".tmp", self.index_path)
+        os.replace(self.metadata_path + ".tmp", self.metadata_path)
+
+        self.pending = {}
+        self.pending_deletes = set()
+        self.load()
+        print(f"Wrote {len(ids)} vectors to {self.index_path}")
+
+
+_vector_store = None
+# Request threads may ask for the store at the same time; only one of them should load it
+_vector_store_lock = threading.Lock()
+
+
+def get_vector_store(backend=None):
+    """Return the process-wide vector store for the configured backend."""
+    global _vector_store
+    backend = (backend or VECTOR_STORE_BACKEND).lower()
+    with _vector_store_lock:
+        if _vector_store is None or _vector_store.backend != backend:
+            if backend == "faiss":
+                _vector_store = FaissVectorStore()
+            elif backend == "pinecone":
+                _vector_store = PineconeVectorStore()
+            else:
+                raise ValueError(f"Unknown vector store backend: {backend}")
+        return _vector_store
+
+
+def build_faiss_from_pinecone(batch_size=100):
+    """
+    Copy every vector and its metadata from the Pinecone index into the local
+    FAISS index, so the local backend serves exactly what Pinecone serves.
+    """
+    source = PineconeVectorStore().index
+    target = FaissVectorStore()
+
+    copied = 0
+    for id_batch in source.list():
+        for i in range(0, len(id_batch), batch_size):
+            fetched = source.fetch(ids=id_batch[i:i + batch_size])
+            target.upsert([
+                {"id": vector_id, "values": vector["values"], "metadata": vector.get("metadata") or {}}
+                for vector_id, vector in fetched["vectors"].items()
+            ])
+            copied += len(fetched["vectors"])
+        print(f"Fetched {copied} vectors from Pinecone...")
+    target.flush()
+    print(f"Copied {copied} vectors into the local FAISS index.")
+
+
+if __name__ == '__main__':
+    build_faiss_from_pinecone()
@@ -1,25 +1,16 @@
-import os
-from dotenv import load_dotenv
-from openai import OpenAI
-import tiktoken
+from llm_clients import MODEL_ID, async_client, client, fit_messages, tokenizer, usage_tracker
 from JSONGeneratorAgent import JSONGeneratorAgent
 
-load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    print("Error: OPENAI_API_KEY is not set in the environment variables.")
-    exit(1)
-
-client = OpenAI(api_key=OPENAI_API_KEY)
+NO_RECOMMENDATIONS_MESSAGE = "It seems there are no course recommendations available at the moment."
+ERROR_MESSAGE = "Sorry, I couldn't generate the text recommendations at this time."
 
 class TextRecommendationAgent:
     def __init__(self, max_tokens=1000):
-        self.model_id = "gpt-4o"
+        self.model_id = MODEL_ID
         self.max_tokens = max_tokens
         self.max_context_length = 16383  # Context length limit for the model
 
-        # Initialize the tokenizer for the model
-        self.tokenizer = tiktoken.encoding_for_model(self.model_id)
+        self.tokenizer = tokenizer
 
         # System prompt for the text-based recommendations agent
         self.sys_prompt = """ 
@@ -84,66 +75,99 @@ class TextRecommendationAgent:
             Use this approach to provide the user with the most relevant, useful, and personalized recommendations based on their preferences. Ensure that your recommendations are clear, friendly, and helpful.
         """
 
-        self.messages = [{"role": "system", "content": self.sys_prompt}]
+        self.system_tokens = self.calculate_token_count(self.sys_prompt)
 
     def calculate_token_count(self, content):
         """Calculate the token count for a given string."""
         return len(self.tokenizer.encode(content))
 
-    def truncate_content(self, content, remaining_token_budget):
+    def user_message(self, course_json):
+        return f"""
+            Here are the recommended courses in JSON format:
+            {course_json}
+            Please generate the text-based recommendations based on these courses.
+            """
+
+    def build_messages(self, course_json):
         """
-        Truncate the content to fit within the remaining token budget.
+        Build the prompt for one request from the system prompt and the course JSON only,
+        truncating the course JSON if the prompt would not fit.
         """
-        content_tokens = self.tokenizer.encode(content)
-        if len(content_tokens) > remaining_token_budget:
-            # Keep only the tokens that fit within the budget
-            truncated_tokens = content_tokens[:remaining_token_budget]
-            return self.tokenizer.decode(truncated_tokens)
-        return content
+        return fit_messages(
+            self.sys_prompt, self.system_tokens, self.user_message, course_json,
+            self.max_tokens, self.max_context_length
+        )
 
     def generate_text_recommendations(self, course_json):
-        # Calculate token usage for system and course_json
-        system_tokens = self.calculate_token_count(self.sys_prompt)
-        course_json_tokens = self.calculate_token_count(course_json)
-
         if course_json == "[]":
-            return "It seems there are no course recommendations available at the moment."
-
-        # Reserve tokens for the assistant's output
-        reserved_for_output = self.max_tokens
-
-        # Calculate the remaining token budget
-        remaining_token_budget = (
-            self.max_context_length - system_tokens - course_json_tokens - reserved_for_output
-        )
-
-        if remaining_token_budget <= 0:
-            raise ValueError("Not enough token budget for system prompt and course JSON.")
+            return NO_RECOMMENDATIONS_MESSAGE
 
-        # Truncate course_json if necessary
-        truncated_course_json = self.truncate_content(course_json, remaining_token_budget)
+        try:
+            messages = self.build_messages(course_json)
+            response = client.chat.completions.create(
+                model=self.model_id,
+                messages=messages,
+                max_tokens=self.max_tokens,
+                temperature=1
+            )
+            usage_tracker.record("text_output", response.usage)
+            return response.choices[0].message.content.strip()
+        except Exception as e:
+            print("Error during text recommendation generation:", str(e))
+            return ERROR_MESSAGE
 
-        # Add the course_json to the conversation
-        self.messages.append({
-            "role": "user",
-            "content": f"""
-            Here are the recommended courses in JSON format:
-            {truncated_course_json}
-            Please generate the text-based recommendations based on these courses.
-            """
-        })
+    async def agenerate_text_recommendations(self, course_json):
+        """Same as generate_text_recommendations, using the async client."""
+        if course_json == "[]":
+            return NO_RECOMMENDATIONS_MESSAGE
 
         try:
-            response = client.chat.completions.create(
+            messages = self.build_messages(course_json)
+            response = await async_client.chat.completions.create(
                 model=self.model_id,
-                messages=self.messages,
+                messages=messages,
                 max_tokens=self.max_tokens,
                 temperature=1
             )
+            usage_tracker.record("text_output", response.usage)
             return response.choices[0].message.content.strip()
         except Exception as e:
             print("Error during text recommendation generation:", str(e))
-            return "Sorry, I couldn't generate the text recommendations at this time."
+            return ERROR_MESSAGE
+
+    def stream_text_recommendations(self, course_json, status=None):
+        """
+        Yield the text recommendations piece by piece as the model generates them.
+
+        Args:
+            status (dict): If given, status["failed"] is set to True when the stream
+                fails, after which the pieces so far end with the error message.
+        """
+        if course_json == "[]":
+            yield NO_RECOMMENDATIONS_MESSAGE
+            return
+
+        try:
+            messages = self.build_messages(course_json)
+            stream = client.chat.completions.create(
+                model=self.model_id,
+                messages=messages,
+                max_tokens=self.max_tokens,
+                temperature=1,
+                stream=True,
+                # The last chunk carries the token usage of the whole reply
+                stream_options={"include_usage": True}
+            )
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+                if chunk.usage:
+                    usage_tracker.record("text_output", chunk.usage)
+        except Exception as e:
+            print("Error during text recommendation streaming:", str(e))
+            if status is not None:
+                status["failed"] = True
+            yield ERROR_MESSAGE
         
 # Example usage
 if __name__ == "__main__":
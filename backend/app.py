@@ -1,30 +1,38 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 import os
 from dotenv import load_dotenv
-from openai import OpenAI
 from PyPDF2 import PdfReader
 import sys
 import json
 
-uploaded_resumes = {}
-
 # Add the parent directory (where `RAG` is located) to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from RAG.data_retriever_pinecone import retrieve_courses_from_db
+from RAG.data_retriever_pinecone import embed_query, retrieve_courses_from_db
+from RAG.filter_engine import get_filter_engine, relax_filter
 from JSONGeneratorAgent import JSONGeneratorAgent
-from TextRecommendationAgent import TextRecommendationAgent
+from TextRecommendationAgent import TextRecommendationAgent, ERROR_MESSAGE as TEXT_ERROR_MESSAGE
+from CombinedRecommendationAgent import CombinedRecommendationAgent, ERROR_MESSAGE as COMBINED_ERROR_MESSAGE
+from pipeline import StagePipeline, background_executor
+from history import ConversationHistory
+from session_store import get_session_store
+from result_cache import recommendation_cache
+from llm_clients import client, usage_tracker
 
 load_dotenv()
 api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI()
+
+# Created once and shared by every request; the agents keep no per-request state
+json_agent = JSONGeneratorAgent(max_tokens=4096)
+text_agent = TextRecommendationAgent(max_tokens=4096)
+combined_agent = CombinedRecommendationAgent(max_tokens=4096)
 
 app = Flask(__name__)
 CORS(app)
 
-# In-memory storage for conversation history
-conversations = {}
+# Conversation histories, kept in memory or shared between workers (SESSION_STORE)
+session_store = get_session_store()
 
 system_prompt = """
         You are a general academic advisor at the University of Toronto, assisting first-year students with course selection and program guidance. Your goal is to gather information to provide personalized course and program recommendations based on the student's interests, skills, and experiences.
@@ -93,64 +101,8 @@ system_prompt = """
 
         """
 
-def generate_final_output(refined_query, retrieved_courses):
-    # Generate the final output using the refined query and retrieved courses
-    print("Generating final output...")
-    json_agent = JSONGeneratorAgent(max_tokens=4096)
-    text_agent = TextRecommendationAgent(max_tokens=4096)
-    course_json = json_agent.generate_json_recommendations(refined_query, retrieved_courses)
-    text_recommendations = text_agent.generate_text_recommendations(course_json)
-    return course_json, text_recommendations
-
-@app.route('/query', methods=['POST'])
-def handle_query():
-    data = request.get_json()
-    user_id = data.get('userId')
-    message = data.get('message')
-
-    if not user_id or not message:
-        return jsonify({'error': 'Missing userId or message'}), 400
-
-    # Initialize conversation history for the user if not exists
-    if user_id not in conversations:
-        system_messages = [{'role': 'system', 'content': system_prompt}]
-
-        # Check if the user has uploaded a resume
-        if user_id in uploaded_resumes:
-            system_messages.append(
-                {"role": "system", "content": f"The user's resume:\n{uploaded_resumes[user_id]}"}
-            )
-        # else:
-        #     system_messages.append(
-        #         {"role": "system", "content": "No resume was uploaded for this user."}
-        #     )
-        
-        conversations[user_id] = system_messages
-
-    # Add user message to conversation history
-    conversations[user_id].append({'role': 'user', 'content': message})
-    
-    try:
-        # Call OpenAI API with conversation history
-        response = client.chat.completions.create(
-            model='gpt-4o',
-            messages=conversations[user_id],
-        )
-
-        bot_message = response.choices[0].message.content.strip()
-
-        # Add assistant response to conversation history
-        conversations[user_id].append({'role': 'assistant', 'content': bot_message})
-
-        # Check if the conversation should end
-        conversation_end_triggers = ['generate']
-        conversation_ended = False
-
-        if any(trigger in message.lower() for trigger in conversation_end_triggers):
-            conversation_ended = True
-
-            # Generate the refined query based on the conversation
-            refined_query_prompt = """
+# Prompt asking for a first-person summary of the student's needs, used as the retrieval query
+refined_query_prompt = """
                 Based on the entire conversation, generate a refined query that captures all of the student's interests, goals, 
                 preferences, and constraints. This refined query should be written in the first person and detail what the student 
                 wants to learn and achieve. In addition, it should analyze and elaborate on potential fields or subject areas that 
@@ -167,19 +119,9 @@ def handle_query():
                 I’m interested in exploring courses that blend coding, analytical reasoning, and hands-on development. I’m looking for foundational courses in computer science that introduce software architecture, data structures, and algorithms. I also want to consider software engineering classes that teach coding best practices, testing, and how to manage large codebases. Additionally, I’d be curious about information technology courses to understand how software systems are deployed and maintained in real-world environments.
                 In short, I’m looking for introductory and foundational courses related to Python coding, emphasizing software development contexts. I want to strengthen my analytical and problem-solving skills while learning about software design principles and applying math and science concepts to coding challenges. I have no restrictions on campus or session timing, and I’m flexible about delivery mode. I want this guidance to help me find a path that fuses my love of technology with practical, hands-on coding and software development opportunities.
             """
-            refined_query_response = client.chat.completions.create(
-                model='gpt-4o',
-                messages=[
-                    {'role': 'system', 'content': refined_query_prompt},
-                    *conversations[user_id],
-                ]
-            )
-            refined_query = refined_query_response.choices[0].message.content.strip()
-
-            print(refined_query)
 
-            # Generate a filter for retrieving courses based on the refined query
-            filter_prompt = """
+# Prompt for the optional LLM filter fallback, used when no department can be resolved locally
+filter_prompt = """
                 You are a system designed to generate a filter for database searches. Based on the refined user query and the user’s conversation history, 
                 create a filter in JSON format that will retrieve relevant courses from the database.
 
@@ -243,52 +185,364 @@ def handle_query():
                 If the user explicitly mentions a department, only include that department in the filter. If the user also mentions that they are 
                 interested in courses that are outside of his/her department, include all possible departments in the filter.
             """
-            filter_response = client.chat.completions.create(
-                model='gpt-4o',
-                messages=[
-                    {'role': 'system', 'content': filter_prompt},
-                    *conversations[user_id]
-                ]
+
+# The provider caches prompt prefixes of 1024+ tokens, but only on an exact match from the
+# first byte. So each task's static instructions are sent first, as the same message object
+# every time, followed by the conversation (which itself opens with the static system_prompt);
+# per-request content never goes ahead of them.
+refined_query_message = {'role': 'system', 'content': refined_query_prompt}
+filter_message = {'role': 'system', 'content': filter_prompt}
+
+# Fall back to asking the LLM for the filter when the query names no known department
+FILTER_LLM_FALLBACK = os.getenv("FILTER_LLM_FALLBACK", "false").lower() == "true"
+
+# "two_pass" asks for the course JSON and then for the text; "combined" gets both from one structured completion
+RECOMMENDATION_MODE = os.getenv("RECOMMENDATION_MODE", "two_pass").lower()
+
+# Run independent stages of the "generate" path concurrently (false runs them one after another)
+PIPELINE_PARALLEL = os.getenv("PIPELINE_PARALLEL", "true").lower() == "true"
+
+# Filter used when the LLM fallback returns something that is not valid JSON
+default_filter = {
+    "campus": {
+        "$in": [
+            "Centennial College",
+            "Off Campus",
+            "Scarborough",
+            "Sheridan College",
+            "St. George",
+            "University of Toronto at Mississauga"
+        ]
+    }
+}
+
+
+def generate_llm_filter(conversation):
+    # Ask the model for a filter based on the conversation history
+    filter_response = client.chat.completions.create(
+        model='gpt-4o',
+        messages=[filter_message, *conversation]
+    )
+    usage_tracker.record("llm_filter", filter_response.usage)
+
+    filter = filter_response.choices[0].message.content.strip()
+    print(filter_response)
+
+    try:
+        return json.loads(filter)
+    except json.JSONDecodeError as e:
+        print("Error parsing JSON:", e)
+        return default_filter
+
+
+def resolve_filter(refined_query, conversation):
+    """
+    Build the vector search filter for the refined query.
+
+    Campus, department, session and delivery mode are resolved by the local
+    filter engine. The LLM is only asked when FILTER_LLM_FALLBACK is set and
+    no department could be matched.
+    """
+    filter_dict, found = get_filter_engine().resolve(refined_query)
+    if not found["department"] and FILTER_LLM_FALLBACK:
+        print("No department resolved locally; falling back to the LLM filter")
+        return generate_llm_filter(conversation)
+    return filter_dict
+
+
+def generate_refined_query(conversation):
+    # Summarize the conversation into the query used for retrieval
+    refined_query_response = client.chat.completions.create(
+        model='gpt-4o',
+        messages=[refined_query_message, *conversation]
+    )
+    usage_tracker.record("refined_query", refined_query_response.usage)
+    return refined_query_response.choices[0].message.content.strip()
+
+
+def retrieve_courses(refined_query, filter_dict):
+    # Retrieve courses from the database based on the refined query
+    retrieved_courses = retrieve_courses_from_db(refined_query, filter_dict)
+    if not retrieved_courses and relax_filter(filter_dict) != filter_dict:
+        # Session or delivery mode constraints left nothing; retry without them
+        retrieved_courses = retrieve_courses_from_db(refined_query, relax_filter(filter_dict))
+    return retrieved_courses
+
+
+def retrieval_stages(conversation, pipeline):
+    """
+    Run the stages that lead up to the final output, yielding (stage, result)
+    as the refined query, the filter and the retrieved courses become ready.
+
+    Stages only wait for the stages they depend on:
+        refined_query -> filter (+ the LLM filter if needed) + query_embedding
+        -> result_cache -> retrieval
+
+    If the recommendations for this refined query and filter are cached, yields
+    ("cached_result", (course_json, text_recommendations)) instead of retrieving.
+    """
+    # The LLM filter is only requested once the local filter engine fails to find a
+    # department, so requests it resolves never pay for a gpt-4o call
+    refined_query = pipeline.run("refined_query", generate_refined_query, conversation)
+    print(refined_query)
+    yield "refined_query", refined_query
+
+    # Warm the query embedding cache while the filter is resolved
+    embedding_future = pipeline.submit("query_embedding", embed_query, refined_query)
+    filter_dict = pipeline.run("filter", resolve_filter, refined_query, conversation)
+    print(filter_dict)
+    yield "filter", filter_dict
+
+    def query_embedding():
+        # Retrieval embeds the query again and returns no courses if that fails too
+        try:
+            return embedding_future.result()
+        except Exception as e:
+            print(f"Error encoding query: {e}")
+            return None
+
+    if recommendation_cache is not None:
+        cached_result = pipeline.run(
+            "result_cache", recommendation_cache.get,
+            RECOMMENDATION_MODE, refined_query, filter_dict, query_embedding
+        )
+        if cached_result is not None:
+            yield "cached_result", cached_result
+            return
+    query_embedding()
+
+    retrieved_courses = pipeline.run("retrieval", retrieve_courses, refined_query, filter_dict)
+    yield "retrieved_courses", retrieved_courses
+
+
+def is_cacheable(course_json, text_recommendations):
+    """Only complete recommendations are cached; errors are retried on the next request."""
+    if text_recommendations in (TEXT_ERROR_MESSAGE, COMBINED_ERROR_MESSAGE):
+        return False
+    try:
+        return isinstance(json.loads(course_json), list)
+    except json.JSONDecodeError:
+        return False
+
+
+def cache_result(results, course_json, text_recommendations):
+    # Nothing retrieved usually means MongoDB or the index was unreachable; don't remember that
+    if recommendation_cache is None or not results["retrieved_courses"]:
+        return
+    if not is_cacheable(course_json, text_recommendations):
+        return
+    embedding = None
+    if recommendation_cache.semantic:
+        # The query embedding is usually already in the query cache, so this costs no API call
+        try:
+            embedding = embed_query(results["refined_query"])
+        except Exception as e:
+            print(f"Error encoding query: {e}")
+    recommendation_cache.set(
+        RECOMMENDATION_MODE, results["refined_query"], results["filter"],
+        (course_json, text_recommendations), embedding
+    )
+
+
+def run_generate_pipeline(conversation, parallel=PIPELINE_PARALLEL):
+    """
+    Produce the recommendations for a finished conversation.
+
+    Returns:
+        dict: refined_query, course_json, text_recommendations and the per-stage timings in seconds.
+    """
+    pipeline = StagePipeline(parallel=parallel)
+    try:
+        results = dict(retrieval_stages(conversation, pipeline))
+
+        if "cached_result" in results:
+            course_json, text_recommendations = results["cached_result"]
+        else:
+            course_json, text_recommendations = pipeline.run(
+                "final_output", generate_final_output, results["refined_query"], results["retrieved_courses"]
             )
+            cache_result(results, course_json, text_recommendations)
+
+        timings = pipeline.report()
+        print("Pipeline timings:", timings)
+        return {
+            "refined_query": results["refined_query"],
+            "course_json": course_json,
+            "text_recommendations": text_recommendations,
+            "timings": timings
+        }
+    finally:
+        pipeline.close()
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_recommendation_events(conversation):
+    """
+    Yield the "generate" path as Server-Sent Events:
+    refined_query, courses_retrieved, course_json, then one token event per
+    piece of the text recommendations, and done with the stage timings.
+    """
+    pipeline = StagePipeline(parallel=PIPELINE_PARALLEL)
+    try:
+        results = {}
+        for stage, result in retrieval_stages(conversation, pipeline):
+            results[stage] = result
+            if stage == "refined_query":
+                yield sse_event("refined_query", {"refinedQuery": result})
+            elif stage == "retrieved_courses":
+                yield sse_event("courses_retrieved", {"count": len(result)})
+
+        if "cached_result" in results or RECOMMENDATION_MODE == "combined":
+            # The text is already complete (cached, or part of the structured output), so it is sent in one piece
+            if "cached_result" in results:
+                course_json, text_recommendations = results["cached_result"]
+            else:
+                course_json, text_recommendations = pipeline.run(
+                    "final_output", generate_final_output, results["refined_query"], results["retrieved_courses"]
+                )
+                cache_result(results, course_json, text_recommendations)
+            yield sse_event("course_json", {"finalOutput": course_json})
+            pipeline.mark("first_token")
+            yield sse_event("token", {"text": text_recommendations})
+            yield sse_event("done", {"conversationEnded": True, "timings": pipeline.report()})
+            return
+
+        course_json = pipeline.run(
+            "json_output", json_agent.generate_json_recommendations,
+            results["refined_query"], results["retrieved_courses"]
+        )
+        yield sse_event("course_json", {"finalOutput": course_json})
+
+        first_token = True
+        text_recommendations = ''
+        stream_status = {}
+        for token in text_agent.stream_text_recommendations(course_json, stream_status):
+            if first_token:
+                pipeline.mark("first_token")
+                first_token = False
+            text_recommendations += token
+            yield sse_event("token", {"text": token})
+        # A stream that failed partway ends in the error message; retry it on the next request
+        if not stream_status.get("failed"):
+            cache_result(results, course_json, text_recommendations.strip())
+
+        timings = pipeline.report()
+        print("Pipeline timings:", timings)
+        yield sse_event("done", {"conversationEnded": True, "timings": timings})
+    finally:
+        pipeline.close()
+
+
+def load_conversation(user_id):
+    """Return the user's conversation history, starting a new one if needed."""
+    conversation = session_store.load(user_id)
+    if conversation is None:
+        conversation = ConversationHistory([{'role': 'system', 'content': system_prompt}])
+    return conversation
+
+
+def add_user_message(user_id, message):
+    """
+    Add the user's message to their conversation and save it before any LLM call,
+    so the message is kept if the reply fails or the stream is cut off.
+    """
+    conversation = load_conversation(user_id)
+    conversation.add('user', message)
+    session_store.save(user_id, conversation)
+    return conversation
+
+
+def compact_conversation(user_id, conversation):
+    version = conversation.version
+    conversation.compact()
+    # If another turn was saved meanwhile it wins, and the next turn compacts again
+    session_store.save(user_id, conversation, if_version=version)
+
+
+def add_reply(user_id, conversation, bot_message):
+    # Add assistant response to conversation history
+    conversation.add('assistant', bot_message)
+    session_store.save(user_id, conversation)
+    if conversation.needs_compaction():
+        # Summarize the older turns off the request path; the next turn sends the shorter history
+        background_executor.submit(compact_conversation, user_id, conversation)
+
+
+def stream_chat_events(user_id, conversation):
+    # Stream the chat reply and add it to the conversation once complete
+    stream = client.chat.completions.create(
+        model='gpt-4o',
+        messages=conversation.messages(),
+        stream=True,
+        stream_options={"include_usage": True}
+    )
+    bot_message = ''
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            bot_message += chunk.choices[0].delta.content
+            yield sse_event("token", {"text": chunk.choices[0].delta.content})
+        if chunk.usage:
+            usage_tracker.record("chat", chunk.usage)
+
+    add_reply(user_id, conversation, bot_message.strip())
+    yield sse_event("done", {"conversationEnded": False})
 
-            filter = filter_response.choices[0].message.content.strip()
-            print(filter_response)
-
-            try:
-                filter_dict = json.loads(filter)
-            except json.JSONDecodeError as e:
-                print("Error parsing JSON:", e)
-                filter_dict = {
-                    "campus": {
-                        "$in": [
-                            "Centennial College",
-                            "Off Campus",
-                            "Scarborough",
-                            "Sheridan College",
-                            "St. George",
-                            "University of Toronto at Mississauga"
-                        ]
-                    }
-                }
 
-            # Retrieve courses from the database based on the refined query
-            retrieved_courses = retrieve_courses_from_db(refined_query, filter_dict)
+def generate_final_output(refined_query, retrieved_courses):
+    # Generate the final output using the refined query and retrieved courses
+    print("Generating final output...")
+    if RECOMMENDATION_MODE == "combined":
+        return combined_agent.generate_recommendations(refined_query, retrieved_courses)
+
+    course_json = json_agent.generate_json_recommendations(refined_query, retrieved_courses)
+    text_recommendations = text_agent.generate_text_recommendations(course_json)
+    return course_json, text_recommendations
+
+@app.route('/query', methods=['POST'])
+def handle_query():
+    data = request.get_json()
+    user_id = data.get('userId')
+    message = data.get('message')
+
+    if not user_id or not message:
+        return jsonify({'error': 'Missing userId or message'}), 400
 
-            
+    # Add user message to conversation history
+    conversation = add_user_message(user_id, message)
+    
+    try:
+        # Check if the conversation should end
+        conversation_end_triggers = ['generate']
 
-            # Generate the final output using the refined query and retrieved courses
-            course_json, text_recommendations = generate_final_output(refined_query, retrieved_courses)
+        if any(trigger in message.lower() for trigger in conversation_end_triggers):
+            # The chat reply to 'generate' would be discarded, so go straight to the recommendations
+            result = run_generate_pipeline(conversation.messages())
 
             # Clear the conversation history
-            del conversations[user_id]
+            session_store.delete(user_id)
 
             # Return the final output to the frontend
             return jsonify({
-                'response': text_recommendations,
-                'finalOutput': course_json,
-                'conversationEnded': True
+                'response': result['text_recommendations'],
+                'finalOutput': result['course_json'],
+                'conversationEnded': True,
+                'timings': result['timings']
             })
 
+        # Call OpenAI API with conversation history
+        response = client.chat.completions.create(
+            model='gpt-4o',
+            messages=conversation.messages(),
+        )
+        usage_tracker.record("chat", response.usage)
+
+        bot_message = response.choices[0].message.content.strip()
+        add_reply(user_id, conversation, bot_message)
+
         return jsonify({'response': bot_message, 'conversationEnded': False})
 
     except Exception as e:
@@ -296,13 +550,45 @@ def handle_query():
         return jsonify({'error': 'An error occurred while processing your request.'}), 500
 
 
+@app.route('/query/stream', methods=['POST'])
+def handle_query_stream():
+    """Same as /query, but the reply is streamed back as Server-Sent Events."""
+    data = request.get_json()
+    user_id = data.get('userId')
+    message = data.get('message')
+
+    if not user_id or not message:
+        return jsonify({'error': 'Missing userId or message'}), 400
+
+    # Add user message to conversation history
+    conversation = add_user_message(user_id, message)
+
+    conversation_end_triggers = ['generate']
+    conversation_ended = any(trigger in message.lower() for trigger in conversation_end_triggers)
+
+    def events():
+        try:
+            if conversation_ended:
+                session_store.delete(user_id)
+                yield from stream_recommendation_events(conversation.messages())
+            else:
+                yield from stream_chat_events(user_id, conversation)
+        except Exception as e:
+            print('Error:', e)
+            yield sse_event("error", {"error": "An error occurred while processing your request."})
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        # Stop reverse proxies from buffering the stream
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/reset', methods=['POST'])
 def reset_conversation():
     data = request.get_json()
     user_id = data.get('userId')
 
-    if user_id in conversations:
-        del conversations[user_id]
+    session_store.delete(user_id)
 
     return jsonify({'message': 'Conversation reset.'})
 
@@ -341,18 +627,10 @@ def upload_resume():
     if len(resume_text) > max_resume_length:
         resume_text = resume_text[:max_resume_length] + '...'
 
-    # Append the resume text to the user's conversation history
-    if user_id in conversations:
-        conversation_history = conversations[user_id]
-    else:
-        # Initialize conversation history if it doesn't exist
-        conversation_history = [
-            {"role": "system", "content": system_prompt}
-        ]
-        conversations[user_id] = conversation_history
-
-    # Append the resume text as a user message
-    conversation_history.append({"role": "user", "content": f"My resume:\n{resume_text}"})
+    # Keep the resume text verbatim for the whole session; it is never summarized
+    conversation = load_conversation(user_id)
+    conversation.add('user', f"My resume:\n{resume_text}", pinned=True)
+    session_store.save(user_id, conversation)
 
     return jsonify({'message': 'Resume uploaded and processed successfully.'}), 200
 
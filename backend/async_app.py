@@ -0,0 +1,310 @@
+"""
+Async (ASGI) serving mode of backend/app.py, with the same /query, /reset
+and /upload_resume endpoints. OpenAI and MongoDB calls are awaited instead of
+holding a thread, so one process can keep hundreds of advising sessions in
+flight. Run it with
+
+    hypercorn backend/async_app:app --bind 127.0.0.1:5000
+"""
+from quart import Quart, request, jsonify
+from quart_cors import cors
+import os
+import io
+import sys
+import json
+import asyncio
+from dotenv import load_dotenv
+from PyPDF2 import PdfReader
+
+# Add the parent directory (where `RAG` is located) to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from RAG.async_retriever import aembed_query, aretrieve_courses_from_db
+from RAG.filter_engine import get_filter_engine, relax_filter
+from pipeline import StagePipeline
+from history import ConversationHistory
+from session_store import MemorySessionStore, get_session_store
+from llm_clients import async_client, usage_tracker
+from result_cache import recommendation_cache
+from app import (
+    FILTER_LLM_FALLBACK, RECOMMENDATION_MODE, combined_agent, default_filter, filter_message, is_cacheable,
+    json_agent, refined_query_message, system_prompt, text_agent
+)
+
+load_dotenv()
+
+app = cors(Quart(__name__))
+
+# Conversation histories, kept in memory or shared between workers (SESSION_STORE)
+session_store = get_session_store()
+
+# Background history compactions, kept referenced until they finish
+compaction_tasks = set()
+
+
+async def run_store(fn, *args, **kwargs):
+    # Shared stores do blocking I/O, so keep them off the event loop
+    if isinstance(session_store, MemorySessionStore):
+        return fn(*args, **kwargs)
+    return await asyncio.to_thread(fn, *args, **kwargs)
+
+
+async def generate_llm_filter(conversation):
+    # Ask the model for a filter based on the conversation history
+    filter_response = await async_client.chat.completions.create(
+        model='gpt-4o',
+        messages=[filter_message, *conversation]
+    )
+    usage_tracker.record("llm_filter", filter_response.usage)
+    try:
+        return json.loads(filter_response.choices[0].message.content.strip())
+    except json.JSONDecodeError as e:
+        print("Error parsing JSON:", e)
+        return default_filter
+
+
+async def generate_refined_query(conversation):
+    # Summarize the conversation into the query used for retrieval
+    refined_query_response = await async_client.chat.completions.create(
+        model='gpt-4o',
+        messages=[refined_query_message, *conversation]
+    )
+    usage_tracker.record("refined_query", refined_query_response.usage)
+    return refined_query_response.choices[0].message.content.strip()
+
+
+async def resolve_filter(refined_query, conversation, llm_filter_task=None):
+    """
+    Async version of app.resolve_filter.
+
+    The filter engine is built from MongoDB on first use, off the event loop.
+    If it cannot be built, the LLM filter is used instead.
+    """
+    try:
+        filter_engine = await asyncio.to_thread(get_filter_engine)
+    except Exception as e:
+        print(f"Filter engine unavailable, falling back to the LLM filter: {e}")
+        filter_engine = None
+
+    if filter_engine is not None:
+        filter_dict, found = filter_engine.resolve(refined_query)
+        if found["department"] or not FILTER_LLM_FALLBACK:
+            if llm_filter_task is not None:
+                llm_filter_task.cancel()
+            return filter_dict
+        print("No department resolved locally; falling back to the LLM filter")
+
+    if llm_filter_task is not None:
+        return await llm_filter_task
+    return await generate_llm_filter(conversation)
+
+
+async def retrieve_courses(refined_query, filter_dict):
+    retrieved_courses = await aretrieve_courses_from_db(refined_query, filter_dict)
+    if not retrieved_courses and relax_filter(filter_dict) != filter_dict:
+        # Session or delivery mode constraints left nothing; retry without them
+        retrieved_courses = await aretrieve_courses_from_db(refined_query, relax_filter(filter_dict))
+    return retrieved_courses
+
+
+async def generate_final_output(refined_query, retrieved_courses):
+    if RECOMMENDATION_MODE == "combined":
+        return await combined_agent.agenerate_recommendations(refined_query, retrieved_courses)
+
+    course_json = await json_agent.agenerate_json_recommendations(refined_query, retrieved_courses)
+    text_recommendations = await text_agent.agenerate_text_recommendations(course_json)
+    return course_json, text_recommendations
+
+
+async def run_generate_pipeline(conversation):
+    """Async version of app.run_generate_pipeline, with the same stages and timings."""
+    pipeline = StagePipeline()
+
+    refined_query_task = asyncio.create_task(
+        pipeline.arun("refined_query", generate_refined_query(conversation))
+    )
+    # The LLM filter only needs the conversation, so it can run alongside the refined query
+    llm_filter_task = asyncio.create_task(
+        pipeline.arun("llm_filter", generate_llm_filter(conversation))
+    ) if FILTER_LLM_FALLBACK else None
+
+    refined_query = await refined_query_task
+
+    # Warm the query embedding cache while the filter is resolved
+    embedding_task = asyncio.create_task(pipeline.arun("query_embedding", aembed_query(refined_query)))
+    filter_dict = await pipeline.arun("filter", resolve_filter(refined_query, conversation, llm_filter_task))
+    query_embedding = None
+    try:
+        query_embedding = await embedding_task
+    except Exception as e:
+        print(f"Error encoding query: {e}")
+
+    cached_result = None
+    if recommendation_cache is not None:
+        # The cache re-reads the catalog version from MongoDB now and then, so keep it off the event loop
+        cached_result = await pipeline.arun("result_cache", asyncio.to_thread(
+            recommendation_cache.get, RECOMMENDATION_MODE, refined_query, filter_dict,
+            (lambda: query_embedding) if query_embedding is not None else None
+        ))
+
+    if cached_result is not None:
+        course_json, text_recommendations = cached_result
+    else:
+        retrieved_courses = await pipeline.arun("retrieval", retrieve_courses(refined_query, filter_dict))
+        course_json, text_recommendations = await pipeline.arun(
+            "final_output", generate_final_output(refined_query, retrieved_courses)
+        )
+        # Nothing retrieved usually means MongoDB or the index was unreachable; don't remember that
+        if recommendation_cache is not None and retrieved_courses and is_cacheable(course_json, text_recommendations):
+            await asyncio.to_thread(
+                recommendation_cache.set,
+                RECOMMENDATION_MODE, refined_query, filter_dict, (course_json, text_recommendations), query_embedding
+            )
+
+    return {
+        "refined_query": refined_query,
+        "course_json": course_json,
+        "text_recommendations": text_recommendations,
+        "timings": pipeline.report()
+    }
+
+
+async def load_conversation(user_id):
+    """Return the user's conversation history, starting a new one if needed."""
+    conversation = await run_store(session_store.load, user_id)
+    if conversation is None:
+        conversation = ConversationHistory([{'role': 'system', 'content': system_prompt}])
+    return conversation
+
+
+async def add_user_message(user_id, message):
+    """Async version of app.add_user_message: the message is saved before any LLM call."""
+    conversation = await load_conversation(user_id)
+    conversation.add('user', message)
+    await run_store(session_store.save, user_id, conversation)
+    return conversation
+
+
+async def compact_conversation(user_id, conversation):
+    version = conversation.version
+    await conversation.acompact()
+    # If another turn was saved meanwhile it wins, and the next turn compacts again
+    await run_store(session_store.save, user_id, conversation, if_version=version)
+
+
+async def add_reply(user_id, conversation, bot_message):
+    conversation.add('assistant', bot_message)
+    await run_store(session_store.save, user_id, conversation)
+    if conversation.needs_compaction():
+        # Summarize the older turns without delaying this response
+        task = asyncio.create_task(compact_conversation(user_id, conversation))
+        compaction_tasks.add(task)
+        task.add_done_callback(compaction_tasks.discard)
+
+
+@app.before_serving
+async def load_filter_engine():
+    # Build the filter engine before the first request if MongoDB is reachable. Chat
+    # turns don't need it, so a failure here must not stop the app from starting.
+    try:
+        await asyncio.to_thread(get_filter_engine)
+    except Exception as e:
+        print(f"Could not build the filter engine at startup, will retry on the first generate request: {e}")
+
+
+@app.route('/query', methods=['POST'])
+async def handle_query():
+    data = await request.get_json()
+    user_id = data.get('userId')
+    message = data.get('message')
+
+    if not user_id or not message:
+        return jsonify({'error': 'Missing userId or message'}), 400
+
+    # Add user message to conversation history
+    conversation = await add_user_message(user_id, message)
+
+    try:
+        conversation_end_triggers = ['generate']
+
+        if any(trigger in message.lower() for trigger in conversation_end_triggers):
+            result = await run_generate_pipeline(conversation.messages())
+
+            # Clear the conversation history
+            await run_store(session_store.delete, user_id)
+
+            return jsonify({
+                'response': result['text_recommendations'],
+                'finalOutput': result['course_json'],
+                'conversationEnded': True,
+                'timings': result['timings']
+            })
+
+        response = await async_client.chat.completions.create(
+            model='gpt-4o',
+            messages=conversation.messages(),
+        )
+        usage_tracker.record("chat", response.usage)
+        bot_message = response.choices[0].message.content.strip()
+        await add_reply(user_id, conversation, bot_message)
+
+        return jsonify({'response': bot_message, 'conversationEnded': False})
+
+    except Exception as e:
+        print('Error:', e)
+        return jsonify({'error': 'An error occurred while processing your request.'}), 500
+
+
+@app.route('/reset', methods=['POST'])
+async def reset_conversation():
+    data = await request.get_json()
+    await run_store(session_store.delete, data.get('userId'))
+    return jsonify({'message': 'Conversation reset.'})
+
+
+def extract_pdf_text(content):
+    reader = PdfReader(io.BytesIO(content))
+    return ''.join(page.extract_text() for page in reader.pages)
+
+
+@app.route('/upload_resume', methods=['POST'])
+async def upload_resume():
+    form = await request.form
+    files = await request.files
+    user_id = form.get('userId')
+    if 'resume' not in files or not user_id:
+        return jsonify({'error': 'No file or userId provided'}), 400
+
+    file = files['resume']
+    if not file.filename.lower().endswith('.pdf'):
+        return jsonify({'error': 'Unsupported file type. Please upload a PDF file.'}), 400
+
+    # Save the file to a desired location
+    upload_folder = 'uploads'
+    os.makedirs(upload_folder, exist_ok=True)
+    file_path = os.path.join(upload_folder, f"{user_id}_{file.filename}")
+    await file.save(file_path)
+
+    try:
+        # PDF parsing is CPU-bound, so keep it off the event loop
+        with open(file_path, 'rb') as f:
+            content = f.read()
+        resume_text = await asyncio.to_thread(extract_pdf_text, content)
+    except Exception as e:
+        print(f"Error reading resume file: {e}")
+        return jsonify({'error': 'Failed to read resume file.'}), 500
+
+    max_resume_length = 2000
+    if len(resume_text) > max_resume_length:
+        resume_text = resume_text[:max_resume_length] + '...'
+
+    # Keep the resume text verbatim for the whole session; it is never summarized
+    conversation = await load_conversation(user_id)
+    conversation.add('user', f"My resume:\n{resume_text}", pinned=True)
+    await run_store(session_store.save, user_id, conversation)
+
+    return jsonify({'message': 'Resume uploaded and processed successfully.'}), 200
+
+
+if __name__ == '__main__':
+    app.run(port=5000)
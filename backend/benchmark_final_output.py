@@ -0,0 +1,92 @@
+"""
+Compare the two-pass final output (JSONGeneratorAgent then
+TextRecommendationAgent) with the single structured completion of
+CombinedRecommendationAgent: wall time and tokens per request.
+
+By default every call goes to the local stand-in in RAG/fake_openai_server.py,
+whose token counts are rough estimates; pass --openai to measure against the
+real API (makes paid calls).
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+QUERY = (
+    "I'm eager to learn programming with a focus on Python and I enjoy math. I'm looking for introductory "
+    "courses at St. George in the fall, and I'm flexible about delivery mode."
+)
+
+
+def usage_tokens(usage_tracker):
+    """Return the (prompt, cached, completion) tokens recorded since the last reset."""
+    report = usage_tracker.report()
+    usage_tracker.reset()
+    return tuple(sum(totals[key] for totals in report.values()) for key in ("prompt", "cached", "completion"))
+
+
+def run_benchmark(runs=3, num_courses=10, use_openai=False, chat_latency=0.5, port=8089):
+    server = None
+    if not use_openai:
+        from RAG.fake_openai_server import start_server
+        server, _ = start_server(port=port, chat_latency=chat_latency)
+        # The OpenAI clients are created at import time, so point them at the stand-in first
+        os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{port}/v1"
+        os.environ.setdefault("OPENAI_API_KEY", "fake")
+
+    from JSONGeneratorAgent import JSONGeneratorAgent
+    from TextRecommendationAgent import TextRecommendationAgent
+    from CombinedRecommendationAgent import CombinedRecommendationAgent
+    from RAG.data_retriever_pinecone import courses_collection, hydrate_courses
+    from llm_clients import usage_tracker
+
+    course_ids = [doc["course_id"] for doc in courses_collection.find({}, {"_id": 0, "course_id": 1}).limit(num_courses)]
+    retrieved_courses = hydrate_courses(course_ids, num_courses)
+    print(f"Benchmarking with {len(retrieved_courses)} retrieved courses, {runs} runs per mode")
+
+    # The agents keep no per-request state, so each is created once and reused, as in the app
+    json_agent = JSONGeneratorAgent(max_tokens=4096)
+    text_agent = TextRecommendationAgent(max_tokens=4096)
+    combined_agent = CombinedRecommendationAgent(max_tokens=4096)
+
+    def two_pass():
+        course_json = json_agent.generate_json_recommendations(QUERY, retrieved_courses)
+        text_agent.generate_text_recommendations(course_json)
+        return usage_tokens(usage_tracker)
+
+    def combined():
+        combined_agent.generate_recommendations(QUERY, retrieved_courses)
+        return usage_tokens(usage_tracker)
+
+    for mode, fn in (("two_pass", two_pass), ("combined", combined)):
+        usage_tracker.reset()
+        times, prompt_tokens, cached_tokens, completion_tokens = [], [], [], []
+        for i in range(runs):
+            start_time = time.time()
+            prompt, cached, completion = fn()
+            times.append(time.time() - start_time)
+            prompt_tokens.append(prompt)
+            cached_tokens.append(cached)
+            completion_tokens.append(completion)
+        print(f"{mode:<9} {statistics.median(times):.2f}s median | "
+              f"prompt tokens {statistics.mean(prompt_tokens):.0f} ({statistics.mean(cached_tokens):.0f} cached), "
+              f"completion tokens {statistics.mean(completion_tokens):.0f}")
+
+    if server is not None:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare the two-pass and combined final output modes.")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--courses", type=int, default=10, help="Number of retrieved courses to recommend from")
+    parser.add_argument("--openai", action="store_true", help="Use the real OpenAI API instead of the local stand-in")
+    parser.add_argument("--chat-latency", type=float, default=0.5, help="Seconds per completion on the stand-in")
+    parser.add_argument("--port", type=int, default=8089)
+    args = parser.parse_args()
+    run_benchmark(args.runs, args.courses, args.openai, args.chat_latency, args.port)
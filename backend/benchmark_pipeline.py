@@ -0,0 +1,73 @@
+"""
+End-to-end latency of the "generate" path, sequential vs. pipelined, with
+every OpenAI call answered by the local stand-in in RAG/fake_openai_server.py.
+
+Retrieval still uses the configured MongoDB and vector store (set
+VECTOR_STORE_BACKEND=faiss to avoid network calls); the vectors of the fake
+embeddings are random, so only the timings are meaningful.
+"""
+import os
+import sys
+import argparse
+import statistics
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from RAG.fake_openai_server import start_server
+
+CONVERSATION = [
+    {"role": "user", "content": "I enjoy math and want to learn programming in Python."},
+    {"role": "assistant", "content": "That's great! Are there any campus or session preferences?"},
+    {"role": "user", "content": "St. George in the fall, in person please. generate"},
+]
+
+# Names no department, so the LLM filter fallback is used when enabled
+VAGUE_CONVERSATION = [
+    {"role": "user", "content": "I'm not sure what I want to study yet, I just like solving puzzles."},
+    {"role": "assistant", "content": "That's great! Are there any campus or session preferences?"},
+    {"role": "user", "content": "No preferences. generate"},
+]
+
+
+def run_benchmark(runs=5, chat_latency=0.5, latency=0.05, port=8089, llm_filter=False):
+    server, state = start_server(port=port, latency=latency, chat_latency=chat_latency)
+    # The OpenAI clients are created at import time, so point them at the stand-in first
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+    import app
+    from RAG.data_retriever_pinecone import query_cache
+
+    # With the fallback enabled the vague conversation needs the LLM filter
+    app.FILTER_LLM_FALLBACK = llm_filter
+    # Every run should go through retrieval and the final output, not the result cache
+    app.recommendation_cache = None
+    conversation = [{"role": "system", "content": app.system_prompt}]
+    conversation += VAGUE_CONVERSATION if llm_filter else CONVERSATION
+    for mode, parallel in (("sequential", False), ("parallel", True)):
+        reports = []
+        for i in range(runs):
+            # Clear cached query embeddings so every run pays for the embedding stage
+            query_cache.memory.clear()
+            reports.append(app.run_generate_pipeline(list(conversation), parallel=parallel)["timings"])
+        stages = ", ".join(
+            f"{name} {statistics.median(report[name] for report in reports):.3f}s"
+            for name in reports[0] if name != "total"
+        )
+        total = statistics.median(report["total"] for report in reports)
+        print(f"{mode:<10} total {total:.3f}s (median of {runs}) | {stages}")
+
+    print(f"Requests served by the stand-in: {state.requests}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the generate pipeline against a local OpenAI stand-in.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--chat-latency", type=float, default=0.5, help="Seconds per chat completion")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per embeddings request")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--llm-filter", action="store_true", help="Enable the LLM filter fallback")
+    args = parser.parse_args()
+    run_benchmark(args.runs, args.chat_latency, args.latency, args.port, args.llm_filter)
@@ -0,0 +1,100 @@
+"""
+Prompt-cache savings of the advising flow: billed input tokens and time to
+first token with the provider's prompt cache off and on.
+
+Every OpenAI call is answered by the local stand-in in
+RAG/fake_openai_server.py, which simulates prefix caching (1024+ identical
+leading tokens) and charges `--prefill-latency` seconds per 1000 uncached
+prompt tokens before the first token. Each simulated student uploads a
+resume, chats for a few turns through the streaming endpoint's code path and
+then asks for the refined query, as /query does on "generate".
+
+Retrieval is not exercised, so no MongoDB or vector store is needed.
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+
+from RAG.fake_openai_server import start_server
+
+TURNS = [
+    "I enjoy math and want to learn programming in Python.",
+    "I'd like to stay at St. George and take courses in the fall.",
+    "In person please, and nothing with heavy lab work.",
+]
+
+# Cached input tokens are billed at half the price of uncached ones
+CACHED_TOKEN_PRICE = 0.5
+
+
+def fake_resume(student):
+    # Long enough, and different enough per student, to matter for the prompt size
+    return " ".join(f"Student {student} project {i}: built a small tool in Python and wrote about it." for i in range(40))
+
+
+def run_students(app, students, prefix):
+    """Run every student's session; return the chat times to first token."""
+    first_token_times = []
+    for student in range(students):
+        user_id = f"{prefix}-{student}"
+        conversation = app.load_conversation(user_id)
+        conversation.add('user', f"My resume:\n{fake_resume(student)}", pinned=True)
+        app.session_store.save(user_id, conversation)
+
+        for message in TURNS:
+            conversation = app.load_conversation(user_id)
+            conversation.add('user', message)
+            start_time = time.perf_counter()
+            for i, event in enumerate(app.stream_chat_events(user_id, conversation)):
+                if i == 0:
+                    first_token_times.append(time.perf_counter() - start_time)
+
+        conversation = app.load_conversation(user_id)
+        conversation.add('user', "generate")
+        app.generate_refined_query(conversation.messages())
+        app.session_store.delete(user_id)
+    return first_token_times
+
+
+def run_benchmark(students=10, chat_latency=0.05, prefill_latency=0.2, port=8089):
+    server, state = start_server(port=port, chat_latency=chat_latency, prefill_latency=prefill_latency)
+    # The OpenAI clients are created at import time, so point them at the stand-in first
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+    import app
+    from llm_clients import usage_tracker
+
+    for mode, prompt_cache in (("no_cache", False), ("prompt_cache", True)):
+        state.prompt_cache = prompt_cache
+        state.prompt_prefixes.clear()
+        usage_tracker.reset()
+        first_token_times = run_students(app, students, mode)
+
+        report = usage_tracker.report()
+        prompt = sum(totals["prompt"] for totals in report.values())
+        cached = sum(totals["cached"] for totals in report.values())
+        billed = prompt - cached + cached * CACHED_TOKEN_PRICE
+        stages = ", ".join(
+            f"{stage} {totals['cached_rate']:.0%} cached" for stage, totals in report.items()
+        )
+        print(f"{mode:<12} chat TTFT {statistics.median(first_token_times) * 1000:.0f}ms median | "
+              f"prompt tokens {prompt}, cached {cached}, billed as {billed:.0f} | {stages}")
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure the prompt cache savings of the advising flow.")
+    parser.add_argument("--students", type=int, default=10)
+    parser.add_argument("--chat-latency", type=float, default=0.05, help="Seconds per completion on the stand-in")
+    parser.add_argument("--prefill-latency", type=float, default=0.2,
+                        help="Seconds per 1000 uncached prompt tokens on the stand-in")
+    parser.add_argument("--port", type=int, default=8089)
+    args = parser.parse_args()
+    run_benchmark(args.students, args.chat_latency, args.prefill_latency, args.port)
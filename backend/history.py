@@ -0,0 +1,158 @@
+import os
+import sys
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from llm_clients import MESSAGE_OVERHEAD_TOKENS, MODEL_ID, async_client, client, count_tokens, usage_tracker
+
+# Token budget for the whole conversation prompt (system messages, summary and turns)
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "6000"))
+# Number of most recent messages that are always kept verbatim
+HISTORY_KEEP_RECENT = int(os.getenv("HISTORY_KEEP_RECENT", "6"))
+
+summary_prompt = """
+You keep a running summary of a course advising conversation between a University of Toronto student and an assistant.
+You are given the current summary (possibly empty) and the messages that follow it. Rewrite the summary so it also covers
+those messages. Keep every fact that matters for recommending courses: the student's program and year, campus, interests,
+skills, completed courses, session and delivery mode preferences, and anything they ruled out or changed their mind about.
+Write plain sentences, at most 200 words, with no preamble.
+"""
+
+
+def message_tokens(message):
+    """Tokens a message takes up in the prompt, including the chat format overhead."""
+    return count_tokens(message['content']) + MESSAGE_OVERHEAD_TOKENS
+
+
+class ConversationHistory:
+    """
+    Messages of one advising session, with their token counts tracked as they are added.
+
+    Once the prompt goes over `token_budget`, `compact` folds every turn except the
+    latest `keep_recent` into a rolling summary written by the model. System messages
+    and pinned messages (the resume) are never summarized.
+    """
+
+    def __init__(self, system_messages, token_budget=HISTORY_TOKEN_BUDGET, keep_recent=HISTORY_KEEP_RECENT):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.pinned = list(system_messages)
+        self.pinned_tokens = sum(message_tokens(message) for message in self.pinned)
+        self.summary = None
+        self.summary_tokens = 0
+        self.turns = []
+        self.turn_tokens = []
+        self.lock = threading.Lock()
+        self.compacting = False
+        # Version of the stored copy this history was loaded from (see session_store.py)
+        self.version = 0
+
+    def to_dict(self):
+        """Return the history as plain data, with the token counts so loading needs no tokenizing."""
+        with self.lock:
+            return {
+                'pinned': [[message['role'], message['content']] for message in self.pinned],
+                'pinned_tokens': self.pinned_tokens,
+                'summary': self.summary,
+                'summary_tokens': self.summary_tokens,
+                'turns': [
+                    [turn['role'], turn['content'], tokens] for turn, tokens in zip(self.turns, self.turn_tokens)
+                ]
+            }
+
+    @classmethod
+    def from_dict(cls, data, **kwargs):
+        history = cls([], **kwargs)
+        history.pinned = [{'role': role, 'content': content} for role, content in data['pinned']]
+        history.pinned_tokens = data['pinned_tokens']
+        history.summary = data['summary']
+        history.summary_tokens = data['summary_tokens']
+        history.turns = [{'role': role, 'content': content} for role, content, _ in data['turns']]
+        history.turn_tokens = [tokens for _, _, tokens in data['turns']]
+        return history
+
+    def add(self, role, content, pinned=False):
+        """Add a message; pinned messages are kept verbatim for the whole session."""
+        message = {'role': role, 'content': content}
+        with self.lock:
+            if pinned:
+                self.pinned.append(message)
+                self.pinned_tokens += message_tokens(message)
+            else:
+                self.turns.append(message)
+                self.turn_tokens.append(message_tokens(message))
+
+    def messages(self):
+        """Return the messages to send: pinned messages, the summary, then the recent turns."""
+        with self.lock:
+            summary = [self.summary_message()] if self.summary else []
+            return self.pinned + summary + list(self.turns)
+
+    def summary_message(self):
+        return {'role': 'system', 'content': f"Summary of the earlier conversation:\n{self.summary}"}
+
+    def token_count(self):
+        with self.lock:
+            return self.pinned_tokens + self.summary_tokens + sum(self.turn_tokens)
+
+    def needs_compaction(self):
+        with self.lock:
+            over_budget = self.pinned_tokens + self.summary_tokens + sum(self.turn_tokens) > self.token_budget
+            return over_budget and len(self.turns) > self.keep_recent and not self.compacting
+
+    def start_compaction(self):
+        """Claim the older turns to summarize, or return None if there is nothing to do."""
+        with self.lock:
+            if self.compacting or len(self.turns) <= self.keep_recent:
+                return None
+            self.compacting = True
+            older_turns = self.turns[:len(self.turns) - self.keep_recent]
+            transcript = '\n\n'.join(f"{turn['role']}: {turn['content']}" for turn in older_turns)
+            request = [
+                {'role': 'system', 'content': summary_prompt},
+                {'role': 'user', 'content': f"Current summary:\n{self.summary or ''}\n\nMessages:\n{transcript}"}
+            ]
+            return len(older_turns), request
+
+    def finish_compaction(self, summarized, summary):
+        # Turns are only ever appended, so the first `summarized` are still the ones that were summarized
+        with self.lock:
+            if summary:
+                del self.turns[:summarized]
+                del self.turn_tokens[:summarized]
+                self.summary = summary
+                self.summary_tokens = message_tokens(self.summary_message())
+            self.compacting = False
+
+    def compact(self):
+        """Fold the older turns into the summary. Safe to run on a background thread."""
+        claim = self.start_compaction()
+        if claim is None:
+            return
+        summarized, request = claim
+        summary = None
+        try:
+            response = client.chat.completions.create(model=MODEL_ID, messages=request)
+            usage_tracker.record("history_summary", response.usage)
+            summary = response.choices[0].message.content.strip()
+        except Exception as e:
+            print(f"Error summarizing conversation history: {e}")
+        finally:
+            self.finish_compaction(summarized, summary)
+
+    async def acompact(self):
+        """Same as compact, using the async client."""
+        claim = self.start_compaction()
+        if claim is None:
+            return
+        summarized, request = claim
+        summary = None
+        try:
+            response = await async_client.chat.completions.create(model=MODEL_ID, messages=request)
+            usage_tracker.record("history_summary", response.usage)
+            summary = response.choices[0].message.content.strip()
+        except Exception as e:
+            print(f"Error summarizing conversation history: {e}")
+        finally:
+            self.finish_compaction(summarized, summary)
@@ -0,0 +1,184 @@
+"""
+Load test the WSGI app (backend/app.py) against the ASGI app
+(backend/async_app.py): N advising sessions send their chat turns at the same
+time, and the wall time, throughput and latency percentiles are reported.
+
+Both apps talk to the local stand-in in RAG/fake_openai_server.py, run in its
+own process so it doesn't compete with the app for the GIL. The numbers reflect how many in-flight LLM calls each serving mode can hold, not
+the real API. The WSGI app is served from a fixed pool of --threads worker
+threads, as it would be behind gunicorn; the ASGI app runs on one event loop
+under hypercorn.
+
+Chat turns only need the LLM. Pass --generate to end each session with a
+"generate" turn as well, which also needs MongoDB and the vector index.
+"""
+import os
+import sys
+import time
+import uuid
+import asyncio
+import argparse
+import threading
+import subprocess
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from werkzeug.serving import BaseWSGIServer
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, ".."))
+sys.path.append(parent_dir)
+sys.path.append(current_dir)
+
+CHAT_TURNS = [
+    "Hi, I'm a first year student at St. George.",
+    "I like programming and math, and I'd prefer courses in the fall.",
+]
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug server that handles requests on a fixed pool of threads."""
+    request_queue_size = 1024
+
+    def __init__(self, host, port, app, threads):
+        super().__init__(host, port, app)
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def start_wsgi(port, threads):
+    from app import app as flask_app
+    server = PooledWSGIServer("127.0.0.1", port, flask_app, threads)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.shutdown
+
+
+def start_asgi(port):
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+    from async_app import app as quart_app
+
+    config = Config()
+    config.bind = [f"127.0.0.1:{port}"]
+    config.backlog = 1024
+    config.accesslog = None
+    # Sessions pause between turns; keep their connections open meanwhile
+    config.keep_alive_timeout = 60
+    loop = asyncio.new_event_loop()
+    stop = asyncio.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(serve(quart_app, config, shutdown_trigger=stop.wait))
+
+    threading.Thread(target=run, daemon=True).start()
+    return lambda: loop.call_soon_threadsafe(stop.set)
+
+
+async def wait_until_ready(client, base_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            await client.post(f"{base_url}/reset", json={"userId": "warmup"})
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not start")
+
+
+async def run_session(client, base_url, turns, latencies, errors):
+    user_id = str(uuid.uuid4())
+    for message in turns:
+        start_time = time.time()
+        try:
+            response = await client.post(f"{base_url}/query", json={"userId": user_id, "message": message})
+            response.raise_for_status()
+            latencies.append(time.time() - start_time)
+        except httpx.HTTPError as e:
+            print(f"Request failed: {e!r}")
+            errors.append(e)
+            return
+    await client.post(f"{base_url}/reset", json={"userId": user_id})
+
+
+async def run_load(base_url, sessions, turns):
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(timeout=300, limits=limits) as client:
+        await wait_until_ready(client, base_url)
+        start_time = time.time()
+        await asyncio.gather(*(run_session(client, base_url, turns, latencies, errors) for _ in range(sessions)))
+        wall_time = time.time() - start_time
+    return wall_time, latencies, errors
+
+
+def report(mode, wall_time, latencies, errors):
+    if not latencies:
+        print(f"{mode:<5} no successful requests ({len(errors)} errors)")
+        return
+    latencies = sorted(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"{mode:<5} {wall_time:.2f}s wall | {len(latencies) / wall_time:.1f} req/s | "
+          f"p50 {statistics.median(latencies):.2f}s | p95 {p95:.2f}s | {len(errors)} errors")
+
+
+def run_load_test(sessions=200, threads=16, chat_latency=1.0, generate=False,
+                  fake_port=8090, wsgi_port=5001, asgi_port=5002, modes=("wsgi", "asgi")):
+    fake_server = subprocess.Popen(
+        [sys.executable, os.path.join(parent_dir, "RAG", "fake_openai_server.py"),
+         "--port", str(fake_port), "--chat-latency", str(chat_latency)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    # The OpenAI clients are created at import time, so point them at the stand-in first
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{fake_port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+
+    turns = CHAT_TURNS + (["Please generate my recommendations."] if generate else [])
+    print(f"{sessions} concurrent sessions x {len(turns)} turns, {chat_latency}s per completion, "
+          f"{threads} WSGI worker threads")
+
+    try:
+        for mode in modes:
+            if mode == "wsgi":
+                stop = start_wsgi(wsgi_port, threads)
+                base_url = f"http://127.0.0.1:{wsgi_port}"
+            else:
+                stop = start_asgi(asgi_port)
+                base_url = f"http://127.0.0.1:{asgi_port}"
+            try:
+                report(mode, *asyncio.run(run_load(base_url, sessions, turns)))
+            finally:
+                stop()
+    finally:
+        # Don't leave the stand-in holding its port when a run fails
+        fake_server.terminate()
+        fake_server.wait()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare concurrent sessions on the WSGI and ASGI apps.")
+    parser.add_argument("--sessions", type=int, default=200, help="Number of concurrent advising sessions")
+    parser.add_argument("--threads", type=int, default=16, help="Worker threads serving the WSGI app")
+    parser.add_argument("--chat-latency", type=float, default=1.0, help="Seconds per completion on the stand-in")
+    parser.add_argument("--generate", action="store_true", help="End each session with a generate turn")
+    parser.add_argument("--mode", choices=["wsgi", "asgi", "both"], default="both")
+    parser.add_argument("--fake-port", type=int, default=8090)
+    parser.add_argument("--wsgi-port", type=int, default=5001)
+    parser.add_argument("--asgi-port", type=int, default=5002)
+    args = parser.parse_args()
+    run_load_test(
+        args.sessions, args.threads, args.chat_latency, args.generate,
+        args.fake_port, args.wsgi_port, args.asgi_port,
+        ("wsgi", "asgi") if args.mode == "both" else (args.mode,)
+    )
@@ -0,0 +1,84 @@
+import os
+import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Threads of one request's pipeline; at most three stages (refined query, LLM filter, query embedding) overlap
+PIPELINE_STAGE_WORKERS = int(os.getenv("PIPELINE_STAGE_WORKERS", "3"))
+# Threads shared by all requests for work that outlives the request, such as compacting a conversation
+BACKGROUND_WORKERS = int(os.getenv("BACKGROUND_WORKERS", "4"))
+background_executor = ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS, thread_name_prefix="background")
+
+
+class StagePipeline:
+    """
+    Run the named stages of one request and record how long each took.
+
+    Stages submitted with `submit` run concurrently on the pipeline's own
+    thread pool and return a Future; the caller waits on the futures a later
+    stage depends on. Each request gets its own pool, so concurrent requests
+    never queue behind each other's stages. With parallel=False every stage
+    runs inline, in submission order, which gives the sequential baseline for
+    benchmarks. Call `close` when the request is done.
+    """
+
+    def __init__(self, parallel=True, max_workers=PIPELINE_STAGE_WORKERS):
+        self.parallel = parallel
+        self.max_workers = max_workers
+        # Created on the first submitted stage
+        self.executor = None
+        self.started_at = time.perf_counter()
+        self.timings = {}
+        self.lock = threading.Lock()
+
+    def run(self, name, fn, *args, **kwargs):
+        """Run a stage on the calling thread and return its result."""
+        start_time = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self.lock:
+                self.timings[name] = time.perf_counter() - start_time
+
+    async def arun(self, name, awaitable):
+        """Await a stage on the event loop and return its result."""
+        start_time = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            with self.lock:
+                self.timings[name] = time.perf_counter() - start_time
+
+    def submit(self, name, fn, *args, **kwargs):
+        """Start a stage and return a Future for its result."""
+        if self.parallel:
+            with self.lock:
+                if self.executor is None:
+                    self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pipeline")
+            return self.executor.submit(self.run, name, fn, *args, **kwargs)
+
+        future = Future()
+        try:
+            future.set_result(self.run(name, fn, *args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def close(self):
+        """Release the pipeline's threads; stages still running (e.g. a warm-up embedding) finish first."""
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def mark(self, name):
+        """Record the time since the pipeline started, e.g. when the first token was sent."""
+        with self.lock:
+            self.timings[name] = time.perf_counter() - self.started_at
+
+    def report(self):
+        """Seconds spent in each stage, plus the total since the pipeline started."""
+        with self.lock:
+            report = {name: round(seconds, 4) for name, seconds in self.timings.items()}
+        report["total"] = round(time.perf_counter() - self.started_at, 4)
+        return report
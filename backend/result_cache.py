@@ -0,0 +1,149 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from dotenv import load_dotenv
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from RAG.query_cache import LRUCache, normalize_query
+from mongodb.catalog_version import CATALOG_VERSION_CHECK_INTERVAL, read_catalog_version
+
+load_dotenv()
+
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "1024"))
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "86400"))
+# Also serve results cached for a different refined query with the same filter when
+# the two query embeddings are at least this similar
+RESULT_CACHE_SEMANTIC = os.getenv("RESULT_CACHE_SEMANTIC", "false").lower() == "true"
+RESULT_CACHE_SIMILARITY = float(os.getenv("RESULT_CACHE_SIMILARITY", "0.97"))
+
+
+class RecommendationCache:
+    """
+    Cache of finished recommendations (course JSON and text) for the generate stage.
+
+    Entries are keyed on the recommendation mode, the normalized refined query,
+    the filter and the catalog version. A re-ingest changes the catalog version,
+    which empties the cache. With `semantic=True`, a miss on the exact key falls
+    back to the most similar cached query under the same filter, if its
+    embedding's cosine similarity is at least `similarity`.
+    """
+
+    def __init__(self, max_size=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL, semantic=RESULT_CACHE_SEMANTIC,
+                 similarity=RESULT_CACHE_SIMILARITY, version_fn=None, version_interval=CATALOG_VERSION_CHECK_INTERVAL):
+        self.results = LRUCache(max_size, ttl)
+        self.semantic = semantic
+        self.similarity = similarity
+        self.max_size = max_size
+        # Unit-length query embeddings of the cached entries, by key, oldest first
+        self.vectors = OrderedDict()
+        self.version_fn = version_fn or read_catalog_version
+        self.version_interval = version_interval
+        self.version = None
+        self.version_checked_at = 0
+        self.lock = threading.Lock()
+        self.counters = {"exact_hits": 0, "semantic_hits": 0, "misses": 0}
+
+    def catalog_version(self):
+        """Return the catalog version, re-reading it at most every `version_interval` seconds."""
+        now = time.time()
+        if now - self.version_checked_at >= self.version_interval:
+            try:
+                version = self.version_fn()
+            except Exception as e:
+                print(f"Error reading the catalog version: {e}")
+                version = self.version
+            with self.lock:
+                if version != self.version:
+                    # Everything cached was built on the old catalog
+                    self.results.clear()
+                    self.vectors.clear()
+                    self.version = version
+                self.version_checked_at = now
+        return self.version
+
+    @staticmethod
+    def scope_key(mode, filter_dict, version):
+        return f"{version}\0{mode}\0{json.dumps(filter_dict, sort_keys=True)}"
+
+    def cache_key(self, mode, refined_query, filter_dict, version):
+        scope = self.scope_key(mode, filter_dict, version)
+        return hashlib.sha256(f"{scope}\0{normalize_query(refined_query)}".encode('utf-8')).hexdigest()
+
+    def _count(self, counter):
+        with self.lock:
+            self.counters[counter] += 1
+
+    def get(self, mode, refined_query, filter_dict, embedding_fn=None):
+        """
+        Return the cached (course_json, text_recommendations), or None.
+
+        Args:
+            embedding_fn (callable): Returns the refined query's embedding (or None if
+                it could not be computed); only called for the semantic tier, after an exact miss.
+        """
+        version = self.catalog_version()
+        result = self.results.get(self.cache_key(mode, refined_query, filter_dict, version))
+        if result is not None:
+            self._count("exact_hits")
+            return result
+
+        embedding = embedding_fn() if self.semantic and embedding_fn is not None else None
+        if embedding is not None:
+            result = self._semantic_get(self.scope_key(mode, filter_dict, version), embedding)
+            if result is not None:
+                self._count("semantic_hits")
+                return result
+
+        self._count("misses")
+        return None
+
+    def _semantic_get(self, scope, embedding):
+        query_vector = np.asarray(embedding, dtype='float32')
+        query_vector /= np.linalg.norm(query_vector) or 1.0
+        with self.lock:
+            candidates = [(key, vector) for key, (entry_scope, vector) in self.vectors.items() if entry_scope == scope]
+        if not candidates:
+            return None
+
+        scores = np.stack([vector for _, vector in candidates]) @ query_vector
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity:
+            return None
+        result = self.results.get(candidates[best][0])
+        if result is None:
+            # Evicted or expired from the result tier
+            with self.lock:
+                self.vectors.pop(candidates[best][0], None)
+        return result
+
+    def set(self, mode, refined_query, filter_dict, result, embedding=None):
+        version = self.catalog_version()
+        key = self.cache_key(mode, refined_query, filter_dict, version)
+        self.results.set(key, result)
+        if self.semantic and embedding is not None:
+            vector = np.asarray(embedding, dtype='float32')
+            vector = vector / (np.linalg.norm(vector) or 1.0)
+            with self.lock:
+                self.vectors[key] = (self.scope_key(mode, filter_dict, version), vector)
+                self.vectors.move_to_end(key)
+                while len(self.vectors) > self.max_size:
+                    self.vectors.popitem(last=False)
+
+    def stats(self):
+        """Return the hit/miss counters and the overall hit rate."""
+        with self.lock:
+            stats = dict(self.counters)
+        lookups = stats["exact_hits"] + stats["semantic_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["exact_hits"] + stats["semantic_hits"]) / lookups if lookups else 0.0
+        stats["size"] = len(self.results)
+        return stats
+
+
+recommendation_cache = RecommendationCache() if RESULT_CACHE_ENABLED else None
@@ -0,0 +1,182 @@
+import os
+import sys
+import json
+import time
+import zlib
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+from pymongo import MongoClient, ReturnDocument
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from RAG.query_cache import LRUCache
+from history import ConversationHistory
+
+load_dotenv()
+
+# Where advising sessions live: "memory" (this process only), "sqlite" (a file shared by
+# the worker processes of one machine) or "mongo" (shared through MONGO_URI)
+SESSION_STORE = os.getenv("SESSION_STORE", "memory").lower()
+# Seconds of inactivity after which a session is dropped
+SESSION_TTL = int(os.getenv("SESSION_TTL", "21600"))
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", os.path.join(os.path.dirname(__file__), "sessions.sqlite"))
+MONGO_URI = os.getenv('MONGO_URI')
+
+
+def encode_history(history):
+    """Serialize a history into a compressed JSON blob."""
+    return zlib.compress(json.dumps(history.to_dict(), separators=(',', ':')).encode('utf-8'))
+
+
+def decode_history(blob, version):
+    history = ConversationHistory.from_dict(json.loads(zlib.decompress(blob)))
+    history.version = version
+    return history
+
+
+class MemorySessionStore:
+    """
+    Sessions kept in this process, in an LRU with a time-to-live.
+
+    Every store keeps a version per session. `save` with `if_version` only
+    writes if nobody saved the session since that version (and it still
+    exists), which lets a background compaction give way to a newer turn.
+    """
+
+    def __init__(self, max_sessions=SESSION_MAX_SESSIONS, ttl=SESSION_TTL):
+        self.sessions = LRUCache(max_sessions, ttl)
+        self.lock = threading.Lock()
+
+    def load(self, user_id):
+        entry = self.sessions.get(user_id)
+        return decode_history(entry[1], entry[0]) if entry else None
+
+    def save(self, user_id, history, if_version=None):
+        """Store the history; returns False if `if_version` no longer matches."""
+        blob = encode_history(history)
+        with self.lock:
+            entry = self.sessions.get(user_id)
+            if if_version is not None and (entry is None or entry[0] != if_version):
+                return False
+            version = entry[0] + 1 if entry else 1
+            self.sessions.set(user_id, (version, blob))
+        history.version = version
+        return True
+
+    def delete(self, user_id):
+        self.sessions.delete(user_id)
+
+
+class SQLiteSessionStore:
+    """Sessions in a SQLite file, shared by every worker process on the machine."""
+
+    # Expired sessions are purged once every this many saves
+    purge_every = 100
+
+    def __init__(self, path=SESSION_DB_PATH, ttl=SESSION_TTL):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.saves = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        with self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions "
+                "(user_id TEXT PRIMARY KEY, history BLOB, version INTEGER, updated REAL)"
+            )
+
+    def load(self, user_id):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT history, version FROM sessions WHERE user_id = ? AND updated > ?",
+                (user_id, time.time() - self.ttl)
+            ).fetchone()
+        return decode_history(*row) if row else None
+
+    def save(self, user_id, history, if_version=None):
+        """Store the history; returns False if `if_version` no longer matches."""
+        blob = encode_history(history)
+        now = time.time()
+        with self.lock, self.conn:
+            if if_version is None:
+                row = self.conn.execute(
+                    "INSERT INTO sessions (user_id, history, version, updated) VALUES (?, ?, 1, ?) "
+                    "ON CONFLICT(user_id) DO UPDATE SET history = excluded.history, "
+                    "version = sessions.version + 1, updated = excluded.updated RETURNING version",
+                    (user_id, blob, now)
+                ).fetchone()
+            else:
+                row = self.conn.execute(
+                    "UPDATE sessions SET history = ?, version = version + 1, updated = ? "
+                    "WHERE user_id = ? AND version = ? RETURNING version",
+                    (blob, now, user_id, if_version)
+                ).fetchone()
+            self.saves += 1
+            if self.saves % self.purge_every == 0:
+                self.conn.execute("DELETE FROM sessions WHERE updated <= ?", (now - self.ttl,))
+        if row is None:
+            return False
+        history.version = row[0]
+        return True
+
+    def delete(self, user_id):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM sessions WHERE user_id = ?", (user_id,))
+
+
+class MongoSessionStore:
+    """Sessions in MongoDB, shared by every worker on every machine; a TTL index drops idle ones."""
+
+    def __init__(self, mongo_uri=MONGO_URI, ttl=SESSION_TTL):
+        self.ttl = ttl
+        self.collection = MongoClient(mongo_uri)['uoft_courses']['sessions']
+        self.collection.create_index("updated_at", expireAfterSeconds=ttl)
+
+    def load(self, user_id):
+        # The TTL monitor only runs once a minute, so check the expiry here as well
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.ttl)
+        session = self.collection.find_one({"_id": user_id, "updated_at": {"$gt": cutoff}})
+        return decode_history(session["history"], session["version"]) if session else None
+
+    def save(self, user_id, history, if_version=None):
+        """Store the history; returns False if `if_version` no longer matches."""
+        query = {"_id": user_id} if if_version is None else {"_id": user_id, "version": if_version}
+        session = self.collection.find_one_and_update(
+            query,
+            {"$set": {"history": encode_history(history), "updated_at": datetime.now(timezone.utc)},
+             "$inc": {"version": 1}},
+            upsert=if_version is None,
+            projection={"version": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if session is None:
+            return False
+        history.version = session["version"]
+        return True
+
+    def delete(self, user_id):
+        self.collection.delete_one({"_id": user_id})
+
+
+_session_store = None
+_session_store_lock = threading.Lock()
+
+
+def get_session_store(backend=None):
+    """Return the process-wide session store for the configured backend."""
+    global _session_store
+    backend = (backend or SESSION_STORE).lower()
+    with _session_store_lock:
+        if _session_store is None:
+            if backend == "memory":
+                _session_store = MemorySessionStore()
+            elif backend == "sqlite":
+                _session_store = SQLiteSessionStore()
+            elif backend == "mongo":
+                _session_store = MongoSessionStore()
+            else:
+                raise ValueError(f"Unknown session store backend: {backend}")
+        return _session_store
@@ -54,12 +54,49 @@ const ChatBox = forwardRef(({ onCoursesReceived }, ref) => {
     setChatHistory(prev => [...prev, { text: message, isBot: false }]);
   };
 
+  // Split a Server-Sent Events buffer into complete events, returning the unfinished remainder
+  const parseEvents = (buffer) => {
+    const events = [];
+    const blocks = buffer.split('\n\n');
+    const remainder = blocks.pop();
+    for (const block of blocks) {
+      let event = 'message';
+      let data = '';
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event:')) {
+          event = line.slice(6).trim();
+        } else if (line.startsWith('data:')) {
+          data += line.slice(5).trim();
+        }
+      }
+      if (data) {
+        events.push({ event, data: JSON.parse(data) });
+      }
+    }
+    return { events, remainder };
+  };
+
+  const handleCourseJson = (finalOutput) => {
+    // Parse and handle the courses data
+    let courses = [];
+    try {
+      courses = JSON.parse(finalOutput);
+      console.log("Parsed JSON:", courses);
+
+      // Pass the courses data to the parent component (if needed)
+      onCoursesReceived(courses);
+    } catch (error) {
+      console.error("Failed to parse JSON:", error);
+      onCoursesReceived([]);
+    }
+  };
+
   const getBotResponse = async (userMessage) => {
     try {
       // Add "I am thinking ..." indicator to chat history
       setChatHistory(prev => [...prev, { text: 'I am thinking ...', isBot: true }]);
 
-      const response = await fetch('http://127.0.0.1:5000/query', {
+      const response = await fetch('http://127.0.0.1:5000/query/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -70,38 +107,42 @@ const ChatBox = forwardRef(({ onCoursesReceived }, ref) => {
         }),
       });
 
-      const data = await response.json();
-
       if (!response.ok) {
+        const data = await response.json();
         throw new Error(data.error || 'Network response was not ok');
       }
 
-      // Remove "I am thinking ..." message
-      setIsThinking(false);
-      setChatHistory(prev => prev.slice(0, -1));
-
-      // Add the assistant's response to the chat history
-      let botMessage = data.response;
-
-      setChatHistory(prev => [
-        ...prev,
-        { text: botMessage, isBot: true },
-      ]);
-
-      if (data.conversationEnded) {
-        // Parse and handle the courses data
-        let courses = [];
-        try {
-          courses = JSON.parse(data.finalOutput);
-          console.log("Parsed JSON:", courses);
-
-          // Pass the courses data to the parent component (if needed)
-          onCoursesReceived(courses);
-        } catch (error) {
-          console.error("Failed to parse JSON:", error);
-          onCoursesReceived([]);
+      // Read the events as they arrive, replacing the last bot message as text streams in
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let botMessage = '';
+      let done = false;
+
+      while (!done) {
+        const result = await reader.read();
+        done = result.done;
+        buffer += decoder.decode(result.value || new Uint8Array(), { stream: !done });
+        const parsed = parseEvents(buffer);
+        buffer = parsed.remainder;
+
+        for (const { event, data } of parsed.events) {
+          if (event === 'refined_query') {
+            updateBotMessage('Understood your goals, searching for courses ...');
+          } else if (event === 'courses_retrieved') {
+            updateBotMessage(`Found ${data.count} candidate courses, picking the best ones ...`);
+          } else if (event === 'course_json') {
+            handleCourseJson(data.finalOutput);
+          } else if (event === 'token') {
+            botMessage += data.text;
+            setIsThinking(false);
+            updateBotMessage(botMessage);
+          } else if (event === 'error') {
+            throw new Error(data.error);
+          }
         }
       }
+      setIsThinking(false);
     } catch (error) {
       console.error("Error fetching bot response:", error);
       let botMessage = fake_response;
@@ -0,0 +1,118 @@
+import os
+import threading
+from dotenv import load_dotenv
+from openai import AsyncOpenAI, OpenAI
+import tiktoken
+
+load_dotenv()
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+if not OPENAI_API_KEY:
+    print("Error: OPENAI_API_KEY is not set in the environment variables.")
+    exit(1)
+
+MODEL_ID = "gpt-4o"
+
+# One client of each kind per process, so every agent and request reuses the same
+# HTTP connection pool. Both clients are safe to share across threads (the async
+# one across the tasks of its event loop).
+client = OpenAI(api_key=OPENAI_API_KEY)
+async_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+
+# Encodings are immutable once loaded, so one tokenizer serves every thread
+tokenizer = tiktoken.encoding_for_model(MODEL_ID)
+
+
+def count_tokens(content):
+    """Calculate the token count for a given string."""
+    return len(tokenizer.encode(content))
+
+
+# The chat format adds a few tokens around each message, and primes the reply with a few more
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_OVERHEAD_TOKENS = 3
+
+
+def count_prompt_tokens(message_tokens):
+    """
+    Count the tokens of a whole chat prompt.
+
+    Args:
+        message_tokens (list): Token count of each message's content.
+    """
+    return sum(message_tokens) + MESSAGE_OVERHEAD_TOKENS * len(message_tokens) + REPLY_OVERHEAD_TOKENS
+
+
+def fit_messages(system_prompt, system_tokens, user_message, text, max_tokens, max_context_length):
+    """
+    Build the system and user messages of one agent request within the model's context.
+
+    The whole prompt plus the max_tokens reserved for the output must fit in
+    max_context_length. If it doesn't, the variable text is cut by the number
+    of tokens over the budget and the user message is rebuilt from it.
+
+    Args:
+        system_tokens (int): Token count of the system prompt, computed once per agent.
+        user_message (callable): Builds the user message from the variable text.
+        text (str): The part of the user message that may be truncated (the user
+            query or the course JSON).
+
+    Raises:
+        ValueError: If the prompt would not fit even with the text left out.
+    """
+    content = user_message(text)
+    excess_tokens = count_prompt_tokens([system_tokens, count_tokens(content)]) + max_tokens - max_context_length
+    if excess_tokens > 0:
+        text_tokens = tokenizer.encode(text)
+        if excess_tokens >= len(text_tokens):
+            raise ValueError("Not enough token budget for the system prompt and the rest of the user message.")
+        content = user_message(tokenizer.decode(text_tokens[:len(text_tokens) - excess_tokens]))
+
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": content}
+    ]
+
+
+class UsageTracker:
+    """
+    Token usage of every chat completion, totalled by pipeline stage.
+
+    `cached` counts the prompt tokens the provider served from its prompt cache,
+    which are billed at a discount and skip most of the prefill. The cache only
+    matches on an identical prefix, so the static instructions of every prompt
+    go first and the per-request content after them.
+    """
+
+    def __init__(self):
+        self.totals = {}
+        self.lock = threading.Lock()
+
+    def record(self, stage, usage):
+        """Log the usage of one call and add it to the stage's totals."""
+        if usage is None:
+            return
+        details = getattr(usage, 'prompt_tokens_details', None)
+        cached_tokens = (details.cached_tokens if details else 0) or 0
+        print(f"Usage [{stage}]: {usage.prompt_tokens} prompt tokens ({cached_tokens} cached), "
+              f"{usage.completion_tokens} completion tokens")
+        with self.lock:
+            totals = self.totals.setdefault(stage, {"calls": 0, "prompt": 0, "cached": 0, "completion": 0})
+            totals["calls"] += 1
+            totals["prompt"] += usage.prompt_tokens
+            totals["cached"] += cached_tokens
+            totals["completion"] += usage.completion_tokens
+
+    def report(self):
+        """Totals per stage, with the share of prompt tokens that were cached."""
+        with self.lock:
+            report = {stage: dict(totals) for stage, totals in self.totals.items()}
+        for totals in report.values():
+            totals["cached_rate"] = round(totals["cached"] / totals["prompt"], 4) if totals["prompt"] else 0.0
+        return report
+
+    def reset(self):
+        with self.lock:
+            self.totals.clear()
+
+
+usage_tracker = UsageTracker()
@@ -0,0 +1,67 @@
+"""
+Compare the original sequential scraper with PageScraper against the local
+stand-in in fake_ttb_server.py: a fresh scrape, a restart after an
+interrupted run, and a refresh after a few pages changed.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from mongodb.scraper import PageScraper, scrape_sequential
+from mongodb.fake_ttb_server import start_server
+
+
+def run_benchmark(pages=40, latency=0.2, workers=8, rate=10.0, delay=(0.5, 1.5), port=8090):
+    result_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'result')
+    server, state = start_server(port=port, result_dir=result_dir, pages=pages, latency=latency)
+    endpoint = f"http://127.0.0.1:{port}/ttb/getPageableCourses"
+    work_dir = tempfile.mkdtemp()
+
+    try:
+        start_time = time.time()
+        scrape_sequential(pages, os.path.join(work_dir, "sequential"), endpoint, delay)
+        print(f"sequential   {time.time() - start_time:.2f}s for {pages} pages")
+
+        output_dir = os.path.join(work_dir, "parallel")
+        state.max_in_flight = 0
+        report = PageScraper(output_dir, endpoint, workers, rate).run()
+        print(f"parallel     {report['seconds']:.2f}s for {pages} pages, "
+              f"at most {state.max_in_flight} requests in flight")
+
+        # Interrupt a run: every 4th request fails and nothing is retried
+        output_dir = os.path.join(work_dir, "resumed")
+        state.fail_every = 4
+        report = PageScraper(output_dir, endpoint, workers, rate, max_retries=0).run()
+        state.fail_every = 0
+        requests_before = state.requests
+        report = PageScraper(output_dir, endpoint, workers, rate).run()
+        print(f"restart      {report['seconds']:.2f}s, fetched {state.requests - requests_before} requests, "
+              f"skipped {report['skipped']} saved pages")
+
+        # A refresh after three pages changed only rewrites those three
+        for page in (2, pages // 2, pages):
+            state.update_page(page)
+        report = PageScraper(os.path.join(work_dir, "parallel"), endpoint, workers, rate).run(refresh=True)
+        print(f"refresh      {report['seconds']:.2f}s, changed pages {report['changed_pages']}, "
+              f"{report['not_modified']} not modified")
+    finally:
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the sequential and pooled scrapers.")
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per response on the stand-in")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=10.0, help="Requests per second for PageScraper")
+    parser.add_argument("--delay", type=float, nargs=2, default=(0.5, 1.5),
+                        help="Pause range between pages of the sequential scraper")
+    parser.add_argument("--port", type=int, default=8090)
+    args = parser.parse_args()
+    run_benchmark(args.pages, args.latency, args.workers, args.rate, tuple(args.delay), args.port)
@@ -0,0 +1,61 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from mongodb.course_views import build_lecture_section_index, format_meeting_section
+from mongodb.data_transform import load_transformed_data
+
+# Number of pages in the full scrape (see scraper.py)
+FULL_SCRAPE_PAGES = 395
+
+
+def extract_with_linear_scan(course_id, meeting_sections_data_list):
+    """The previous lookup: scan every meeting section for each course."""
+    return [
+        format_meeting_section(meeting)
+        for meeting in meeting_sections_data_list
+        if meeting['course_id'] == course_id and meeting['type'] == "Lecture"
+    ]
+
+
+def replicate(courses, meeting_sections, copies):
+    """Scale the catalog up by giving each copy of a course a distinct course_id."""
+    scaled_courses = []
+    scaled_sections = []
+    for copy in range(copies):
+        scaled_courses.extend({**course, 'course_id': f"{course['course_id']}-{copy}"} for course in courses)
+        scaled_sections.extend({**ms, 'course_id': f"{ms['course_id']}-{copy}"} for ms in meeting_sections)
+    return scaled_courses, scaled_sections
+
+
+def run_benchmark():
+    transformed_data = load_transformed_data()
+    courses = transformed_data['courses']
+    meeting_sections = transformed_data['meeting_sections']
+
+    # Estimate how many pages the loaded data covers (20 courses per page)
+    pages = max(1, round(len(courses) / 20))
+    full_copies = max(1, round(FULL_SCRAPE_PAGES / pages))
+
+    print(f"{'courses':>8} | {'sections':>8} | {'linear scan (s)':>15} | {'index (s)':>9}")
+    for copies in sorted({1, max(1, full_copies // 4), max(1, full_copies // 2), full_copies}):
+        scaled_courses, scaled_sections = replicate(courses, meeting_sections, copies)
+
+        start_time = time.time()
+        for course in scaled_courses:
+            extract_with_linear_scan(course['course_id'], scaled_sections)
+        linear_time = time.time() - start_time
+
+        start_time = time.time()
+        index = build_lecture_section_index(scaled_sections)
+        for course in scaled_courses:
+            [format_meeting_section(meeting) for meeting in index.get(course['course_id'], [])]
+        index_time = time.time() - start_time
+
+        print(f"{len(scaled_courses):>8} | {len(scaled_sections):>8} | {linear_time:>15.3f} | {index_time:>9.3f}")
+
+
+if __name__ == '__main__':
+    run_benchmark()
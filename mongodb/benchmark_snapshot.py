@@ -0,0 +1,74 @@
+"""
+Compare loading the catalog from the NDJSON output with mapping the Arrow
+snapshot, on the scraped pages replicated up to a full scrape: time and peak
+Python memory for the whole course table and for the division column that
+course_stats.py plots.
+"""
+import io
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from mongodb import data_transform
+from mongodb.catalog_snapshot import load_snapshot
+from mongodb.benchmark_section_index import FULL_SCRAPE_PAGES
+from mongodb.benchmark_transform import replicate_pages
+
+
+def measure(label, load):
+    tracemalloc.start()
+    start_time = time.time()
+    result = load()
+    seconds = time.time() - start_time
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {seconds * 1000:8.1f} ms {peak / 1e6:8.1f} MB peak")
+    return result
+
+
+def run_benchmark(pages=FULL_SCRAPE_PAGES):
+    work_dir = tempfile.mkdtemp()
+    pages_dir = os.path.join(work_dir, "result")
+    output_dir = os.path.join(work_dir, "transformed")
+    snapshot_dir = os.path.join(work_dir, "snapshot")
+    os.makedirs(pages_dir)
+    replicate_pages(data_transform.RESULT_DIR, pages, pages_dir)
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            counts = data_transform.main(pages_dir, output_dir, 1, snapshot_dir)
+        sizes = {name: sum(os.path.getsize(os.path.join(directory, file)) for file in os.listdir(directory))
+                 for name, directory in (("ndjson", output_dir), ("snapshot", snapshot_dir))}
+        print(f"{counts['courses']} courses, {counts['meeting_sections']} meeting sections; "
+              f"NDJSON {sizes['ndjson'] / 1e6:.1f} MB, snapshot {sizes['snapshot'] / 1e6:.1f} MB")
+
+        json_courses = measure("courses, NDJSON",
+                               lambda: pd.DataFrame(data_transform.iter_transformed("courses", output_dir)))
+        arrow_courses = measure("courses, snapshot",
+                                lambda: load_snapshot("courses", snapshot_dir=snapshot_dir))
+        json_divisions = measure("divisions, NDJSON", lambda: pd.Series(
+            [course["division"] for course in data_transform.iter_transformed("courses", output_dir)]
+        ).value_counts())
+        arrow_divisions = measure("divisions, snapshot", lambda: load_snapshot(
+            "courses", ["division"], snapshot_dir).column("division").to_pandas().value_counts())
+
+        identical = (len(json_courses) == arrow_courses.num_rows
+                     and json_divisions.to_dict() == arrow_divisions[arrow_divisions > 0].to_dict())
+        print(f"results identical: {identical}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark loading the NDJSON output against the Arrow snapshot.")
+    parser.add_argument("--pages", type=int, default=FULL_SCRAPE_PAGES)
+    args = parser.parse_args()
+    run_benchmark(args.pages)
@@ -0,0 +1,81 @@
+"""
+Time data_transform.py on the checked-in pages replicated up to a full
+scrape: the previous datetime-based time conversion on one core, the cached
+arithmetic conversion on one core, and the process pool.
+"""
+import io
+import os
+import sys
+import time
+import shutil
+import filecmp
+import argparse
+import tempfile
+import contextlib
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from mongodb import data_transform
+from mongodb.benchmark_section_index import FULL_SCRAPE_PAGES
+
+
+def millis_to_time_datetime(millisofday):
+    """The previous conversion, through datetime and timedelta."""
+    return (datetime(1970, 1, 1) + timedelta(milliseconds=millisofday)).strftime('%H:%M:%S')
+
+
+def replicate_pages(result_dir, pages, target_dir):
+    """Fill target_dir with `pages` pages, cycling through the scraped ones."""
+    source_paths = data_transform.page_paths(result_dir)
+    for page in range(1, pages + 1):
+        shutil.copyfile(source_paths[(page - 1) % len(source_paths)], os.path.join(target_dir, f"{page}.json"))
+
+
+def timed_transform(pages_dir, output_dir, workers):
+    start_time = time.time()
+    # The per-page progress lines would drown out the results
+    with contextlib.redirect_stdout(io.StringIO()):
+        counts = data_transform.main(pages_dir, output_dir, workers, os.path.join(output_dir, "snapshot"))
+    return time.time() - start_time, counts
+
+
+def run_benchmark(pages=FULL_SCRAPE_PAGES, workers=None):
+    workers = workers or os.cpu_count() or 1
+    work_dir = tempfile.mkdtemp()
+    pages_dir = os.path.join(work_dir, "result")
+    os.makedirs(pages_dir)
+    replicate_pages(data_transform.RESULT_DIR, pages, pages_dir)
+    print(f"Transforming {pages} pages, {os.cpu_count()} CPUs")
+
+    try:
+        fast_millis_to_time = data_transform.millis_to_time
+        data_transform.millis_to_time = millis_to_time_datetime
+        baseline, _ = timed_transform(pages_dir, os.path.join(work_dir, "baseline"), 1)
+        data_transform.millis_to_time = fast_millis_to_time
+        print(f"{'datetime conversion, 1 process':<36} {baseline:.2f}s")
+
+        single, counts = timed_transform(pages_dir, os.path.join(work_dir, "single"), 1)
+        print(f"{'cached conversion, 1 process':<36} {single:.2f}s ({baseline / single:.1f}x)")
+
+        pooled, _ = timed_transform(pages_dir, os.path.join(work_dir, "pooled"), workers)
+        label = f"cached conversion, {workers} processes"
+        print(f"{label:<36} {pooled:.2f}s ({baseline / pooled:.1f}x)")
+
+        identical = all(
+            filecmp.cmp(data_transform.transformed_path(kind, os.path.join(work_dir, "baseline")),
+                        data_transform.transformed_path(kind, os.path.join(work_dir, output)), shallow=False)
+            for kind in data_transform.RECORD_KINDS for output in ("single", "pooled")
+        )
+        print(f"{counts['courses']} courses, {counts['meeting_sections']} meeting sections; "
+              f"outputs identical: {identical}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the page transform.")
+    parser.add_argument("--pages", type=int, default=FULL_SCRAPE_PAGES)
+    parser.add_argument("--workers", type=int, default=None, help="Processes for the pooled run (default: CPU count)")
+    args = parser.parse_args()
+    run_benchmark(args.pages, args.workers)
@@ -0,0 +1,182 @@
+"""
+Columnar snapshot of the transformed catalog, written by data_transform.py.
+
+Courses and meeting sections are stored as Arrow IPC files (uncompressed, so
+they can be memory-mapped and read without copying). Repetitive columns such
+as campus, department, division and session are dictionary-encoded: each
+value is stored once and every row holds a small integer code.
+"""
+import os
+import sys
+import time
+import argparse
+from itertools import islice
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from mongodb.data_transform import RECORD_KINDS, TRANSFORMED_DIR, iter_transformed
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+CATALOG_SNAPSHOT_DIR = os.getenv("CATALOG_SNAPSHOT_DIR", os.path.join(current_dir, 'snapshot'))
+# Records converted and written per record batch
+SNAPSHOT_BATCH_SIZE = 4096
+
+CATEGORY = pa.dictionary(pa.int32(), pa.string())
+
+SCHEMAS = {
+    "courses": pa.schema([
+        ("course_id", pa.string()),
+        ("course_code", pa.string()),
+        ("section_code", CATEGORY),
+        ("name", pa.string()),
+        ("description", pa.string()),
+        ("division", CATEGORY),
+        ("prerequisites", pa.string()),
+        ("exclusions", pa.string()),
+        ("department", CATEGORY),
+        ("campus", CATEGORY),
+        ("sessions", pa.list_(CATEGORY)),
+    ]),
+    "meeting_sections": pa.schema([
+        ("course_id", pa.string()),
+        ("course_code", pa.string()),
+        ("section_code", pa.string()),
+        ("type", CATEGORY),
+        ("instructors", pa.list_(pa.string())),
+        ("times", pa.list_(pa.struct([
+            ("day", pa.int8()),
+            ("start", pa.string()),
+            ("end", pa.string()),
+            ("location", pa.string()),
+        ]))),
+        ("size", pa.int32()),
+        ("enrolment", pa.int32()),
+        ("notes", CATEGORY),
+    ]),
+}
+
+
+def snapshot_path(kind, snapshot_dir=CATALOG_SNAPSHOT_DIR):
+    return os.path.join(snapshot_dir, f"{kind}.arrow")
+
+
+def category_fields(schema):
+    """Names of the dictionary-encoded fields, directly or as list items."""
+    return [
+        field.name for field in schema
+        if pa.types.is_dictionary(field.type)
+        or (pa.types.is_list(field.type) and pa.types.is_dictionary(field.type.value_type))
+    ]
+
+
+def collect_categories(kind, fields, transformed_dir):
+    """
+    First pass over the records: the distinct values of each categorical field.
+
+    The IPC file format needs one dictionary per field for the whole file,
+    so the values are gathered before any batch is written.
+    """
+    values = {field: set() for field in fields}
+    for record in iter_transformed(kind, transformed_dir):
+        for field in fields:
+            value = record.get(field)
+            if isinstance(value, list):
+                values[field].update(item for item in value if item is not None)
+            elif value is not None:
+                values[field].add(value)
+    return {field: sorted(field_values) for field, field_values in values.items()}
+
+
+def encode_category(values, codes, dictionary):
+    indices = pa.array([codes[value] if value is not None else None for value in values], type=pa.int32())
+    return pa.DictionaryArray.from_arrays(indices, dictionary)
+
+
+def build_batch(records, schema, categories, dictionaries):
+    columns = []
+    for field in schema:
+        values = [record.get(field.name) for record in records]
+        if pa.types.is_dictionary(field.type):
+            columns.append(encode_category(values, categories[field.name], dictionaries[field.name]))
+        elif pa.types.is_list(field.type) and pa.types.is_dictionary(field.type.value_type):
+            offsets = [0]
+            for value in values:
+                offsets.append(offsets[-1] + len(value or []))
+            items = [item for value in values for item in (value or [])]
+            columns.append(pa.ListArray.from_arrays(
+                pa.array(offsets, type=pa.int32()),
+                encode_category(items, categories[field.name], dictionaries[field.name])
+            ))
+        else:
+            columns.append(pa.array(values, type=field.type))
+    return pa.record_batch(columns, schema=schema)
+
+
+def write_snapshot(snapshot_dir=CATALOG_SNAPSHOT_DIR, transformed_dir=TRANSFORMED_DIR, batch_size=SNAPSHOT_BATCH_SIZE):
+    """
+    Write the transformed records as Arrow IPC files, one batch at a time.
+
+    Returns:
+        dict: Number of rows written per kind.
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    counts = {}
+    for kind in RECORD_KINDS:
+        schema = SCHEMAS[kind]
+        fields = category_fields(schema)
+        vocabularies = collect_categories(kind, fields, transformed_dir)
+        categories = {field: {value: code for code, value in enumerate(vocabulary)}
+                      for field, vocabulary in vocabularies.items()}
+        dictionaries = {field: pa.array(vocabulary, type=pa.string()) for field, vocabulary in vocabularies.items()}
+
+        path = snapshot_path(kind, snapshot_dir)
+        # Written under a temporary name, so readers never map a half-written file
+        temp_path = f"{path}.tmp"
+        counts[kind] = 0
+        records = iter_transformed(kind, transformed_dir)
+        with ipc.new_file(temp_path, schema) as writer:
+            while True:
+                batch = list(islice(records, batch_size))
+                if not batch:
+                    break
+                writer.write_batch(build_batch(batch, schema, categories, dictionaries))
+                counts[kind] += len(batch)
+        os.replace(temp_path, path)
+    return counts
+
+
+def load_snapshot(kind, columns=None, snapshot_dir=CATALOG_SNAPSHOT_DIR):
+    """
+    Memory-map one snapshot file and return it as a pyarrow Table.
+
+    The table's buffers point into the mapped file, so only the pages of the
+    columns actually read are loaded from disk.
+
+    Args:
+        kind (str): "courses" or "meeting_sections".
+        columns (list): Columns to keep; all by default.
+    """
+    table = ipc.open_file(pa.memory_map(snapshot_path(kind, snapshot_dir), 'r')).read_all()
+    return table.select(columns) if columns else table
+
+
+def snapshot_exists(snapshot_dir=CATALOG_SNAPSHOT_DIR):
+    return all(os.path.exists(snapshot_path(kind, snapshot_dir)) for kind in RECORD_KINDS)
+
+
+def main(snapshot_dir=CATALOG_SNAPSHOT_DIR, transformed_dir=TRANSFORMED_DIR):
+    start_time = time.time()
+    counts = write_snapshot(snapshot_dir, transformed_dir)
+    sizes = ", ".join(f"{kind} {os.path.getsize(snapshot_path(kind, snapshot_dir)) / 1e6:.1f} MB" for kind in RECORD_KINDS)
+    print(f"Wrote the catalog snapshot ({counts['courses']} courses, {counts['meeting_sections']} meeting sections; "
+          f"{sizes}) to {snapshot_dir} in {time.time() - start_time:.2f}s")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Write the Arrow snapshot of the transformed catalog.")
+    parser.add_argument("--snapshot-dir", default=CATALOG_SNAPSHOT_DIR)
+    parser.add_argument("--transformed-dir", default=TRANSFORMED_DIR)
+    args = parser.parse_args()
+    main(args.snapshot_dir, args.transformed_dir)
@@ -0,0 +1,49 @@
+import os
+import threading
+from datetime import datetime, timezone
+from pymongo import MongoClient
+
+# Collection holding the catalog version stamp, changed by every ingest
+CATALOG_META_COLLECTION = 'catalog_meta'
+CATALOG_VERSION_ID = 'catalog'
+# Seconds between catalog version checks in serving processes
+CATALOG_VERSION_CHECK_INTERVAL = float(os.getenv("CATALOG_VERSION_CHECK_INTERVAL", "30"))
+
+
+def bump_catalog_version(db):
+    """
+    Record that the catalog changed, so caches built on the old catalog stop being used.
+
+    Returns:
+        str: The new catalog version.
+    """
+    now = datetime.now(timezone.utc)
+    version = now.strftime('%Y%m%dT%H%M%S%fZ')
+    db[CATALOG_META_COLLECTION].update_one(
+        {"_id": CATALOG_VERSION_ID}, {"$set": {"version": version, "updated_at": now}}, upsert=True
+    )
+    return version
+
+
+def get_catalog_version(db):
+    """Return the current catalog version, or "0" if nothing has been ingested with a stamp yet."""
+    meta = db[CATALOG_META_COLLECTION].find_one({"_id": CATALOG_VERSION_ID}, {"version": 1})
+    return meta["version"] if meta else "0"
+
+
+_mongo_client = None
+_mongo_client_lock = threading.Lock()
+
+
+def read_catalog_version():
+    """
+    Return the current catalog version from the MongoDB at MONGO_URI.
+
+    Serving processes check the version periodically, so they share one
+    client (created on first use) instead of opening one per check.
+    """
+    global _mongo_client
+    with _mongo_client_lock:
+        if _mongo_client is None:
+            _mongo_client = MongoClient(os.getenv('MONGO_URI'))
+    return get_catalog_version(_mongo_client['uoft_courses'])
@@ -1,19 +1,26 @@
+import os
+import sys
 import pandas as pd
 import matplotlib.pyplot as plt
-import json
 
-# Load the transformed data
-with open("transformed_data.json", "r", encoding="utf-8") as file:
-    data = json.load(file)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-# Extract course data
-courses = data["courses"]
+from mongodb.data_transform import iter_transformed
 
-# Create a DataFrame for analysis
-df = pd.DataFrame(courses)
+try:
+    from mongodb.catalog_snapshot import load_snapshot, snapshot_exists
+except ImportError:
+    load_snapshot = snapshot_exists = None
+
+if snapshot_exists is not None and snapshot_exists():
+    # Map only the division column of the Arrow snapshot; it stays a categorical
+    divisions = load_snapshot("courses", ["division"]).column("division").to_pandas()
+else:
+    # No snapshot (or no pyarrow): read the divisions from the transformed records
+    divisions = pd.Series([course["division"] for course in iter_transformed("courses")])
 
 # Count courses by division
-division_counts = df["division"].value_counts()
+division_counts = divisions.value_counts()
 
 # Plot the barplot
 plt.figure(figsize=(10, 6))
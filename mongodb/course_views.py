@@ -0,0 +1,181 @@
+import json
+import hashlib
+import os
+import sys
+from pymongo import MongoClient, ReplaceOne
+from dotenv import load_dotenv
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from mongodb.catalog_version import bump_catalog_version
+from mongodb.data_transform import iter_transformed
+
+load_dotenv()
+
+# Name of the collection holding the precomputed per-course payloads
+COURSE_VIEWS_COLLECTION = 'course_views'
+
+
+# Convert a meeting section into the string format used by the agents
+def format_meeting_section(ms):
+    instructors = ', '.join(ms.get('instructors', []))
+    # Format times
+    times_str = []
+    for t in ms.get('times', []):
+        day = t.get('day', 'N/A')
+        start = t.get('start', 'N/A')
+        end = t.get('end', 'N/A')
+        location = t.get('location', 'N/A')
+        times_str.append(f"Day {day}, {start}-{end} at {location}")
+    times_str = ', '.join(times_str)
+
+    return f"Section: {ms.get('section_code','N/A')}, Type: {ms.get('type','N/A')}, Instructors: {instructors}, Times: {times_str}, Class Size: {ms.get('size','N/A')}"
+
+
+def build_lecture_section_index(meeting_sections_data_list):
+    """
+    Group the lecture sections by course_id in a single pass.
+
+    Args:
+        meeting_sections_data_list (list): Meeting section dictionaries.
+
+    Returns:
+        dict: Mapping of course_id to its lecture sections, in input order.
+    """
+    lecture_sections_by_id = {}
+    for ms in meeting_sections_data_list:
+        if ms.get('type') == "Lecture":
+            lecture_sections_by_id.setdefault(ms['course_id'], []).append(ms)
+    return lecture_sections_by_id
+
+
+def lecture_delivery_modes(lecture_sections):
+    """Distinct delivery modes (e.g. INPER, SYNC) of a course's lecture sections."""
+    return sorted({ms['notes'] for ms in lecture_sections if ms.get('notes')})
+
+
+def build_course_payload(course, lecture_sections):
+    """Create the final course object in the format consumed by the agents."""
+    return {
+        "course_code": course.get("course_code", "N/A"),
+        "name": course.get("name", "N/A"),
+        "department": course.get("department", "N/A"),
+        "division": course.get("division", "N/A"),
+        "description": course.get("description", "N/A"),
+        "prerequisites": course.get("prerequisites", "No prerequisites") or "No prerequisites",
+        "exclusions": course.get("exclusions", "No exclusions") or "No exclusions",
+        "campus": course.get("campus", "N/A"),
+        "section_code": course.get("section_code", "N/A"),
+        "sessions": ', '.join(course.get("sessions", [])) if course.get("sessions") else "N/A",
+        "meeting_sections": [format_meeting_section(ms) for ms in lecture_sections]
+    }
+
+
+def source_hash(course, lecture_sections):
+    """Hash of the source records a view is built from, used to detect changes."""
+    source = json.dumps([course, lecture_sections], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+def build_course_views(courses_data_list, meeting_sections_data_list, views_collection, batch_size=500):
+    """
+    Write one denormalized view per course, holding the exact payload the
+    agents consume. Only views whose source records changed are rewritten,
+    and views of courses that disappeared are deleted.
+
+    Args:
+        courses_data_list (iterable): Course dictionaries, e.g. streamed by
+            data_transform.iter_transformed; read once, in order.
+        meeting_sections_data_list (iterable): Meeting section dictionaries.
+        views_collection: The MongoDB collection to write the views to.
+
+    Returns:
+        dict: Counts of upserted, unchanged and deleted views.
+    """
+    lecture_sections_by_id = build_lecture_section_index(meeting_sections_data_list)
+
+    # Hashes of the views currently stored, to skip unchanged courses
+    existing_hashes = {
+        view['course_id']: view.get('source_hash')
+        for view in views_collection.find({}, {"_id": 0, "course_id": 1, "source_hash": 1})
+    }
+
+    operations = []
+    seen_ids = set()
+    unchanged = 0
+    upserted = 0
+    for course in courses_data_list:
+        course_id = str(course['course_id'])
+        if course_id in seen_ids:
+            continue
+        seen_ids.add(course_id)
+
+        course = {key: value for key, value in course.items() if key != '_id'}
+        lecture_sections = [
+            {key: value for key, value in ms.items() if key != '_id'}
+            for ms in lecture_sections_by_id.get(course['course_id'], [])
+        ]
+        view_hash = source_hash(course, lecture_sections)
+        if existing_hashes.get(course_id) == view_hash:
+            unchanged += 1
+            continue
+
+        operations.append(ReplaceOne(
+            {"course_id": course_id},
+            {
+                "course_id": course_id,
+                "source_hash": view_hash,
+                "payload": build_course_payload(course, lecture_sections)
+            },
+            upsert=True
+        ))
+        # Write as we go, so only one batch of views is held in memory
+        if len(operations) == batch_size:
+            views_collection.bulk_write(operations, ordered=False)
+            upserted += len(operations)
+            operations = []
+
+    if operations:
+        views_collection.bulk_write(operations, ordered=False)
+        upserted += len(operations)
+
+    removed_ids = [course_id for course_id in existing_hashes if course_id not in seen_ids]
+    if removed_ids:
+        views_collection.delete_many({"course_id": {"$in": removed_ids}})
+
+    views_collection.create_index("course_id", unique=True)
+
+    return {"upserted": upserted, "unchanged": unchanged, "deleted": len(removed_ids)}
+
+
+def fetch_course_views(course_ids, views_collection):
+    """
+    Fetch the precomputed payloads for the given course IDs in a single query.
+
+    Returns:
+        dict: Mapping of course ID to payload for the IDs that have a view.
+    """
+    return {
+        view['course_id']: view['payload']
+        for view in views_collection.find({"course_id": {"$in": list(course_ids)}}, {"_id": 0, "course_id": 1, "payload": 1})
+    }
+
+
+def main():
+    # Connect to MongoDB
+    mongo_uri = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
+    client = MongoClient(mongo_uri)
+    db = client['uoft_courses']
+
+    report = build_course_views(
+        iter_transformed('courses'),
+        iter_transformed('meeting_sections'),
+        db[COURSE_VIEWS_COLLECTION]
+    )
+    print(f"Course views: {report['upserted']} upserted, {report['unchanged']} unchanged, {report['deleted']} deleted.")
+    if report['upserted'] or report['deleted']:
+        print(f"Catalog version is now {bump_catalog_version(db)}.")
+
+
+if __name__ == '__main__':
+    main()
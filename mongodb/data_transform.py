@@ -1,95 +1,240 @@
 import json
 import os
-from datetime import datetime, timedelta
+import sys
+import tempfile
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 
-# Data structure to hold transformed data
-courses_data_list = []
-meeting_sections_data_list = []
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-# Function to convert milliseconds of the day to HH:MM:SS format
+current_dir = os.path.dirname(os.path.abspath(__file__))
+RESULT_DIR = os.path.join(current_dir, 'result')
+# One newline-delimited JSON file per record kind, written as the pages are transformed
+TRANSFORMED_DIR = os.path.join(current_dir, 'transformed')
+RECORD_KINDS = ("courses", "meeting_sections")
+# Single-document output of earlier versions, still read if no NDJSON output exists
+LEGACY_TRANSFORMED_PATH = os.path.join(current_dir, 'transformed_data.json')
+# Processes transforming pages at once (1 transforms them in this process)
+TRANSFORM_WORKERS = int(os.getenv("TRANSFORM_WORKERS", str(os.cpu_count() or 1)))
+
+# Permissions open(path, 'w') gives a new file. NamedTemporaryFile creates its file
+# 0600 and os.replace keeps that, so temporary files are set to this before the swap.
+# The umask can only be read by setting it, so that is done once, at import.
+_umask = os.umask(0)
+os.umask(_umask)
+NEW_FILE_MODE = 0o666 & ~_umask
+
+
+# Function to convert milliseconds of the day to HH:MM:SS format.
+# Meetings start and end on a handful of half hours, so the results are cached.
+@lru_cache(maxsize=4096)
 def millis_to_time(millisofday):
-    # Start from midnight
-    base_time = datetime(1970, 1, 1)
-    # Add the milliseconds as timedelta
-    time_of_day = base_time + timedelta(milliseconds=millisofday)
-    # Return formatted time string
-    return time_of_day.strftime('%H:%M:%S')
-
-# Process each JSON file and transform data
-number_of_files = len(os.listdir("./result"))
-for i in range(1, number_of_files + 1):
-    file_path = f'result/{i}.json'
-    with open(file_path, 'r', encoding='utf-8') as file:
-        data = json.load(file)
+    seconds = millisofday // 1000
+    # Same as formatting midnight plus the offset: wraps around past 24 hours
+    return f"{seconds // 3600 % 24:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def transform_course(course_data):
+    """
+    Transform one scraped course into its course record and meeting section records.
+
+    Returns:
+        tuple: (course, list of meeting sections)
+    """
+    # Prepare course data dictionary
+    course = {
+        'course_id': course_data["id"],
+        'course_code': course_data["code"],
+        'section_code': course_data["sectionCode"],
+        'name': course_data["name"],
+        'description': '',
+        'division': '',
+        'prerequisites': '',
+        'exclusions': '',
+        'department': course_data["department"]["name"] if course_data.get("department") else None,
+        'campus': course_data["campus"],
+        'sessions': course_data["sessions"]
+    }
+
+    # If additional information exists, populate it
+    if course_data.get("cmCourseInfo"):
+        course['description'] = course_data["cmCourseInfo"].get('description', '')
+        course['division'] = course_data["cmCourseInfo"].get('division', '')
+        course['prerequisites'] = course_data["cmCourseInfo"].get('prerequisitesText', '')
+        course['exclusions'] = course_data["cmCourseInfo"].get('exclusionsText', '')
 
-    # Extract courses data from JSON
-    courses_data = data['payload']["pageableCourse"]["courses"]
-    
-    for course_data in courses_data:
-        # Prepare course data dictionary
-        course = {
+    # Extract meeting sections for each course
+    meeting_sections = []
+    for meeting_time_data in course_data["sections"]:
+        # Prepare meeting section data dictionary
+        meeting_sections.append({
             'course_id': course_data["id"],
             'course_code': course_data["code"],
-            'section_code': course_data["sectionCode"],
-            'name': course_data["name"],
-            'description': '',
-            'division': '',
-            'prerequisites': '',
-            'exclusions': '',
-            'department': course_data["department"]["name"] if course_data.get("department") else None,
-            'campus': course_data["campus"],
-            'sessions': course_data["sessions"]
-        }
-        
-        # If additional information exists, populate it
-        if course_data.get("cmCourseInfo"):
-            course['description'] = course_data["cmCourseInfo"].get('description', '')
-            course['division'] = course_data["cmCourseInfo"].get('division', '')
-            course['prerequisites'] = course_data["cmCourseInfo"].get('prerequisitesText', '')
-            course['exclusions'] = course_data["cmCourseInfo"].get('exclusionsText', '')
-        
-        # Append transformed course data to the list
-        courses_data_list.append(course)
-
-        # Extract meeting sections for each course
-        meeting_times_data = course_data["sections"]
-        
-        for meeting_time_data in meeting_times_data:
-            # Prepare meeting section data dictionary
-            meeting_section = {
-                'course_id': course_data["id"],
-                'course_code': course_data["code"],
-                'section_code': meeting_time_data['name'],
-                'type': meeting_time_data.get('type', ''),
-                'instructors': [instructor["firstName"] + ' ' + instructor["lastName"] for instructor in meeting_time_data.get('instructors', [])],
-                'times': [
-                    {
-                        'day': time["start"]['day'],
-                        'start': millis_to_time(time["start"]['millisofday']),
-                        'end': millis_to_time(time["end"]["millisofday"]),
-                        'location': time["building"]["buildingCode"]
-                    }
-                    for time in meeting_time_data.get('meetingTimes', [])
-                ],
-                'size': meeting_time_data.get('maxEnrolment', 0),
-                'enrolment': meeting_time_data.get('currentEnrolment', 0),
-                'notes': meeting_time_data.get('deliveryModes', [{}])[0].get('mode', '')
-            }
-            
-            # Append transformed meeting section data to the list
-            meeting_sections_data_list.append(meeting_section)
-
-    print(f'File {i} successfully transformed')
-
-# Combine all data into a single dictionary for JSON export
-transformed_data = {
-    "courses": courses_data_list,
-    "meeting_sections": meeting_sections_data_list
-}
-
-# Save the transformed data to a JSON file
-output_file_path = "transformed_data.json"
-with open(output_file_path, 'w', encoding='utf-8') as outfile:
-    json.dump(transformed_data, outfile, ensure_ascii=False, indent=4)
-
-print(f"Transformed data successfully written to {output_file_path}")
+            'section_code': meeting_time_data['name'],
+            'type': meeting_time_data.get('type', ''),
+            'instructors': [instructor["firstName"] + ' ' + instructor["lastName"] for instructor in meeting_time_data.get('instructors', [])],
+            'times': [
+                {
+                    'day': time["start"]['day'],
+                    'start': millis_to_time(time["start"]['millisofday']),
+                    'end': millis_to_time(time["end"]["millisofday"]),
+                    'location': time["building"]["buildingCode"]
+                }
+                for time in meeting_time_data.get('meetingTimes', [])
+            ],
+            'size': meeting_time_data.get('maxEnrolment', 0),
+            'enrolment': meeting_time_data.get('currentEnrolment', 0),
+            'notes': meeting_time_data.get('deliveryModes', [{}])[0].get('mode', '')
+        })
+    return course, meeting_sections
+
+
+def page_paths(result_dir=RESULT_DIR):
+    """Paths of the scraped pages (result/N.json), in page order."""
+    pages = sorted(int(name[:-len(".json")]) for name in os.listdir(result_dir)
+                   if name.endswith(".json") and name[:-len(".json")].isdigit())
+    return [os.path.join(result_dir, f"{page}.json") for page in pages]
+
+
+def transform_page(file_path):
+    """
+    Transform one scraped page into NDJSON text per record kind.
+
+    Pages depend on nothing but themselves, so this runs in worker processes;
+    returning text keeps what is sent back to the parent small and cheap.
+
+    Returns:
+        dict: kind -> the page's records of that kind, one JSON object per line.
+    """
+    with open(file_path, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+    lines = {kind: [] for kind in RECORD_KINDS}
+    for course_data in data['payload']["pageableCourse"]["courses"]:
+        course, meeting_sections = transform_course(course_data)
+        lines["courses"].append(json.dumps(course, ensure_ascii=False) + '\n')
+        lines["meeting_sections"].extend(json.dumps(ms, ensure_ascii=False) + '\n' for ms in meeting_sections)
+    return {kind: ''.join(kind_lines) for kind, kind_lines in lines.items()}
+
+
+def iter_transformed_pages(result_dir=RESULT_DIR, workers=TRANSFORM_WORKERS):
+    """
+    Yield transform_page's output for every page, in page order.
+
+    With workers > 1 the pages are sharded across a process pool. Results are
+    still yielded strictly in page order, so the output does not depend on the
+    worker count, and at most a few pages per worker are held at once.
+    """
+    paths = page_paths(result_dir)
+    if workers <= 1:
+        for file_path in paths:
+            yield transform_page(file_path)
+            print(f'File {os.path.basename(file_path)} successfully transformed')
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        paths = iter(paths)
+        while True:
+            while len(pending) < workers * 2:
+                file_path = next(paths, None)
+                if file_path is None:
+                    break
+                pending.append((file_path, executor.submit(transform_page, file_path)))
+            if not pending:
+                return
+            file_path, future = pending.popleft()
+            yield future.result()
+            print(f'File {os.path.basename(file_path)} successfully transformed')
+
+
+def write_transformed(pages, output_dir=TRANSFORMED_DIR):
+    """
+    Append each page's NDJSON text (as yielded by iter_transformed_pages) to output_dir/<kind>.ndjson.
+
+    The files are written under temporary names and swapped in at the end,
+    so readers never see a half-written catalog.
+
+    Returns:
+        dict: Number of records written per kind.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    files = {
+        kind: tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=output_dir, suffix='.tmp', delete=False)
+        for kind in RECORD_KINDS
+    }
+    counts = dict.fromkeys(RECORD_KINDS, 0)
+    try:
+        for page in pages:
+            for kind, text in page.items():
+                files[kind].write(text)
+                counts[kind] += text.count('\n')
+    except BaseException:
+        for file in files.values():
+            file.close()
+            os.remove(file.name)
+        raise
+    for kind, file in files.items():
+        file.close()
+        os.chmod(file.name, NEW_FILE_MODE)
+        os.replace(file.name, transformed_path(kind, output_dir))
+    return counts
+
+
+def transformed_path(kind, output_dir=TRANSFORMED_DIR):
+    return os.path.join(output_dir, f"{kind}.ndjson")
+
+
+def iter_transformed(kind, output_dir=TRANSFORMED_DIR):
+    """
+    Yield the transformed records of one kind ("courses" or "meeting_sections"), one line at a time.
+
+    Falls back to transformed_data.json from earlier versions (loaded whole) if
+    there is no NDJSON output yet.
+    """
+    path = transformed_path(kind, output_dir)
+    if not os.path.exists(path) and os.path.exists(LEGACY_TRANSFORMED_PATH):
+        print(f"No {kind} in {output_dir}; reading the older {LEGACY_TRANSFORMED_PATH}. "
+              f"Run data_transform.py to refresh it.")
+        with open(LEGACY_TRANSFORMED_PATH, 'r', encoding='utf-8') as infile:
+            yield from json.load(infile).get(kind, [])
+        return
+    with open(path, 'r', encoding='utf-8') as infile:
+        for line in infile:
+            if line.strip():
+                yield json.loads(line)
+
+
+def load_transformed_data(output_dir=TRANSFORMED_DIR):
+    """Load every transformed record into lists, keyed like the old transformed_data.json."""
+    return {kind: list(iter_transformed(kind, output_dir)) for kind in RECORD_KINDS}
+
+
+def main(result_dir=RESULT_DIR, output_dir=TRANSFORMED_DIR, workers=TRANSFORM_WORKERS, snapshot_dir=None,
+         snapshot=True):
+    counts = write_transformed(iter_transformed_pages(result_dir, workers), output_dir)
+    print(f"Transformed {counts['courses']} courses and {counts['meeting_sections']} meeting sections "
+          f"into {output_dir}")
+    if snapshot:
+        # Imported here, as catalog_snapshot reads the records back through this module
+        try:
+            from mongodb import catalog_snapshot
+        except ImportError as e:
+            print(f"Skipping the Arrow snapshot, pyarrow is not available ({e}). "
+                  f"Install pyarrow to write it, or pass --no-snapshot to silence this.")
+            return counts
+        catalog_snapshot.main(snapshot_dir or catalog_snapshot.CATALOG_SNAPSHOT_DIR, output_dir)
+    return counts
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Transform the scraped pages into NDJSON course and section records.")
+    parser.add_argument("--result-dir", default=RESULT_DIR)
+    parser.add_argument("--output-dir", default=TRANSFORMED_DIR)
+    parser.add_argument("--workers", type=int, default=TRANSFORM_WORKERS,
+                        help="Processes transforming pages at once (1 runs in this process)")
+    parser.add_argument("--snapshot-dir", default=None, help="Where to write the Arrow snapshot (default: ./snapshot)")
+    parser.add_argument("--no-snapshot", action="store_true", help="Don't write the Arrow snapshot")
+    args = parser.parse_args()
+    main(args.result_dir, args.output_dir, args.workers, args.snapshot_dir, not args.no_snapshot)
@@ -1,63 +1,182 @@
+import sys
 import json
-from pymongo import MongoClient
+import hashlib
+import threading
+from pymongo import MongoClient, ASCENDING, DeleteMany, ReplaceOne
+from pymongo.errors import OperationFailure
 import numpy as np
 from openai import OpenAI
 import os
 from dotenv import load_dotenv
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from mongodb.course_views import (
+    COURSE_VIEWS_COLLECTION, build_course_views, build_lecture_section_index, format_meeting_section
+)
+from mongodb.catalog_version import bump_catalog_version
+from mongodb.data_transform import iter_transformed
+from RAG.lexical_index import build_lexical_index, lexical_index_exists
+
 # Load API key from .env file
 load_dotenv()
 api_key = os.getenv("OPENAI_API_KEY")
 client = OpenAI()
 
-# Load the transformed data
-current_dir = os.path.dirname(__file__)
-input_file_path = os.path.join(current_dir, 'transformed_data.json')
+# Write operations sent per bulk_write call
+BULK_WRITE_BATCH_SIZE = 1000
+
+# Fields identifying a record in each collection
+COURSE_KEY = ("course_id",)
+MEETING_SECTION_KEY = ("course_id", "section_code")
+
+# MongoDB error codes: an index with the same keys but other options exists, or duplicate keys
+INDEX_CONFLICT_ERRORS = (85, 86)  # IndexOptionsConflict, IndexKeySpecsConflict
+DUPLICATE_KEY_ERROR = 11000
+
+# Lecture sections grouped by course_id, built from the transformed data on first use
+_lecture_sections_by_id = None
+_lecture_sections_lock = threading.Lock()
 
-with open(input_file_path, 'r', encoding='utf-8') as infile:
-    transformed_data = json.load(infile)
 
-courses_data_list = transformed_data['courses']
-meeting_sections_data_list = transformed_data['meeting_sections']
+def get_lecture_sections_by_id():
+    global _lecture_sections_by_id
+    with _lecture_sections_lock:
+        if _lecture_sections_by_id is None:
+            _lecture_sections_by_id = build_lecture_section_index(iter_transformed('meeting_sections'))
+        return _lecture_sections_by_id
 
 
-def extract_lecture_meeting_sections(course_id, meeting_sections_data_list):
+def extract_lecture_meeting_sections(course_id, lecture_sections_index=None):
     """
     Extract lecture meeting sections for a specific course_id.
     
     Args:
         course_id (str): The unique identifier for the course.
-        meeting_sections (list): List of meeting section dictionaries.
+        lecture_sections_index (dict): Mapping of course_id to lecture sections, as built by
+            build_lecture_section_index. Defaults to the index of the loaded transformed data.
+            A plain list of meeting sections is also accepted and indexed first.
 
     Returns:
         list: A list of formatted strings representing lecture meeting sections.
     """
-    lecture_sections = [
-        """Section: {section_code}, Type: {type}, Instructors: {instructors}, Times: {times}, Class Size: {size}""".format(
-            section_code=meeting.get('section_code', 'N/A'),
-            type=meeting.get('type', 'N/A'),
-            instructors=', '.join(meeting.get('instructors', [])),
-            times=", ".join([
-                f"Day {time.get('day', 'N/A')}, {time.get('start', 'N/A')}-{time.get('end', 'N/A')} at {time.get('location', 'N/A')}"
-                for time in meeting.get('times', [])
-            ]),
-            size=meeting.get('size', 'N/A')
-        )
-        for meeting in meeting_sections_data_list
-        if meeting['course_id'] == course_id and meeting['type'] == "Lecture"
+    if lecture_sections_index is None:
+        lecture_sections_index = get_lecture_sections_by_id()
+    elif not isinstance(lecture_sections_index, dict):
+        lecture_sections_index = build_lecture_section_index(lecture_sections_index)
+
+    return [format_meeting_section(meeting) for meeting in lecture_sections_index.get(course_id, [])]
+
+
+def find_duplicate_keys(collection, keys, limit=10):
+    """Return up to limit key values stored more than once, with their counts."""
+    pipeline = [
+        {"$group": {"_id": {key: f"${key}" for key in keys}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$limit": limit},
     ]
-    return lecture_sections
+    return [(doc["_id"], doc["count"]) for doc in collection.aggregate(pipeline, allowDiskUse=True)]
 
 
-def main():
-    # Load the transformed data
-    input_file_path = "transformed_data.json"
-    with open(input_file_path, 'r', encoding='utf-8') as infile:
-        transformed_data = json.load(infile)
+def ensure_unique_index(collection, keys):
+    """
+    Create a unique index on the keys, replacing a non-unique one left by earlier loaders.
 
-    courses_data_list = transformed_data.get('courses', [])
-    meeting_sections_data_list = transformed_data.get('meeting_sections', [])
+    Raises:
+        ValueError: If the collection holds duplicate keys, which earlier loaders
+            could insert. They are reported rather than silently dropped.
+    """
+    index_keys = [(key, ASCENDING) for key in keys]
+    try:
+        collection.create_index(index_keys, unique=True)
+    except OperationFailure as e:
+        if e.code == DUPLICATE_KEY_ERROR:
+            duplicates = find_duplicate_keys(collection, keys)
+            listed = "; ".join(f"{key} x{count}" for key, count in duplicates)
+            raise ValueError(
+                f"Cannot create a unique index on {keys} in '{collection.name}': duplicate keys ({listed}). "
+                f"Remove the duplicates and run db_store.py again."
+            ) from e
+        if e.code not in INDEX_CONFLICT_ERRORS:
+            raise
+        collection.drop_index(index_keys)
+        collection.create_index(index_keys, unique=True)
+
+
+def create_indexes(courses_collection, meeting_sections_collection):
+    """Create the indexes the upserts, the embedding upsert and retrieval lookups rely on."""
+    ensure_unique_index(courses_collection, COURSE_KEY)
+    ensure_unique_index(meeting_sections_collection, MEETING_SECTION_KEY)
+    meeting_sections_collection.create_index([("course_id", ASCENDING), ("type", ASCENDING)])
+    meeting_sections_collection.create_index([("type", ASCENDING)])
+
+
+def record_hash(record):
+    """Hash of a record's content, stored with it to skip rewriting unchanged records."""
+    return hashlib.sha256(json.dumps(record, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+
+
+def sync_collection(collection, records, key_fields, batch_size=BULK_WRITE_BATCH_SIZE):
+    """
+    Bring a collection in line with the records without emptying it first.
+
+    Records are upserted on their key fields in unordered bulk writes of
+    batch_size, skipping those whose content hash matches the stored one.
+    Stored records whose key no longer appears are deleted afterwards, so
+    readers see the old or the new version of each record, never a gap.
+
+    Returns:
+        dict: Counts of upserted, unchanged and deleted records.
+    """
+    # Key and content hash of every stored record
+    existing = {
+        tuple(doc.get(field) for field in key_fields): (doc['_id'], doc.get('source_hash'))
+        for doc in collection.find({}, {field: 1 for field in key_fields + ('source_hash',)})
+    }
+
+    operations = []
+    seen_keys = set()
+    upserted = 0
+    unchanged = 0
+    for record in records:
+        key = tuple(record.get(field) for field in key_fields)
+        if key in seen_keys:
+            continue
+        seen_keys.add(key)
+
+        record = {field: value for field, value in record.items() if field != '_id'}
+        content_hash = record_hash(record)
+        if key in existing and existing[key][1] == content_hash:
+            unchanged += 1
+            continue
+
+        operations.append(ReplaceOne(dict(zip(key_fields, key)), dict(record, source_hash=content_hash), upsert=True))
+        if len(operations) == batch_size:
+            collection.bulk_write(operations, ordered=False)
+            upserted += len(operations)
+            operations = []
+
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+        upserted += len(operations)
+
+    if not seen_keys:
+        # An empty transform is far more likely a failed scrape than an empty catalog
+        print(f"No records for '{collection.name}'; leaving it as it is.")
+        return {"upserted": 0, "unchanged": 0, "deleted": 0}
+
+    removed_ids = [doc_id for key, (doc_id, _) in existing.items() if key not in seen_keys]
+    deletions = [
+        DeleteMany({"_id": {"$in": removed_ids[i:i + batch_size]}})
+        for i in range(0, len(removed_ids), batch_size)
+    ]
+    if deletions:
+        collection.bulk_write(deletions, ordered=False)
+
+    return {"upserted": upserted, "unchanged": unchanged, "deleted": len(removed_ids)}
 
+
+def main():
     # Connect to MongoDB
     mongo_uri = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
     client = MongoClient(mongo_uri)
@@ -69,23 +188,33 @@ def main():
     courses_collection = db['courses']
     meeting_sections_collection = db['meeting_sections']
 
-    # Insert courses data
-    if courses_data_list:
-        # Remove any existing documents to avoid duplicates (optional)
-        courses_collection.delete_many({})
-        courses_collection.insert_many(courses_data_list)
-        print(f"Inserted {len(courses_data_list)} documents into 'courses' collection.")
-    else:
-        print("No courses data to insert.")
-
-    # Insert meeting sections data
-    if meeting_sections_data_list:
-        # Remove any existing documents to avoid duplicates (optional)
-        meeting_sections_collection.delete_many({})
-        meeting_sections_collection.insert_many(meeting_sections_data_list)
-        print(f"Inserted {len(meeting_sections_data_list)} documents into 'meeting_sections' collection.")
-    else:
-        print("No meeting sections data to insert.")
+    # Unique keys first: the upserts match on them
+    create_indexes(courses_collection, meeting_sections_collection)
+    print("Created course_id, (course_id, section_code) and type indexes.")
+
+    # Upsert courses, then meeting sections, streamed from the transformed records
+    changed = False
+    for kind, collection, key_fields in (
+        ('courses', courses_collection, COURSE_KEY),
+        ('meeting_sections', meeting_sections_collection, MEETING_SECTION_KEY)
+    ):
+        report = sync_collection(collection, iter_transformed(kind), key_fields)
+        print(f"'{kind}': {report['upserted']} upserted, {report['unchanged']} unchanged, {report['deleted']} deleted.")
+        changed = changed or report['upserted'] or report['deleted']
+
+    # Retrieval reads the views first, so bring them up to date before the version bump
+    report = build_course_views(iter_transformed('courses'), iter_transformed('meeting_sections'),
+                                db[COURSE_VIEWS_COLLECTION])
+    print(f"Course views: {report['upserted']} upserted, {report['unchanged']} unchanged, {report['deleted']} deleted.")
+    changed = changed or report['upserted'] or report['deleted']
+
+    # Rebuilt before the version bump, so serving processes reload a complete index
+    if changed or not lexical_index_exists():
+        build_lexical_index()
+
+    if changed:
+        # Cached recommendations and the loaded lexical index were built on the old catalog
+        print(f"Catalog version is now {bump_catalog_version(db)}.")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,155 @@
+"""
+Local stand-in for the timetable API that scraper.py reads, used to test and
+benchmark the scraper without hitting the university's servers. Point the
+scraper at it with
+
+    python scraper.py --url http://127.0.0.1:8090/ttb/getPageableCourses
+
+Pages are served from the scraped files in ./result, cycled to make up
+`pages` pages, after `latency` seconds each. Every response carries an ETag,
+and a request whose If-None-Match matches gets a 304. `update_page` changes
+a page's content, as a catalog update would.
+"""
+import os
+import json
+import time
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeTTBState:
+    def __init__(self, result_dir="./result", pages=395, latency=0.2, rate_limit_every=0, fail_every=0,
+                 retry_after=1.0):
+        self.result_dir = result_dir
+        self.pages = pages
+        self.latency = latency
+        # Answer every Nth request with a 429 or a 503 (0 disables either)
+        self.rate_limit_every = rate_limit_every
+        self.fail_every = fail_every
+        self.retry_after = retry_after
+        self.source_pages = len([name for name in os.listdir(result_dir) if name.endswith(".json")])
+        self.revisions = {}
+        self.bodies = {}
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def update_page(self, page):
+        with self.lock:
+            self.revisions[page] = self.revisions.get(page, 0) + 1
+
+    def page_body(self, page):
+        with self.lock:
+            revision = self.revisions.get(page, 0)
+            # The course total changes with `pages`, so it is part of the key
+            key = (page, self.pages, revision)
+            if key in self.bodies:
+                return self.bodies[key]
+        with open(os.path.join(self.result_dir, f"{(page - 1) % self.source_pages + 1}.json"), 'r',
+                  encoding='utf-8') as f:
+            data = json.load(f)
+        pageable = data["payload"]["pageableCourse"]
+        pageable["page"] = page
+        pageable["total"] = self.pages * pageable["pageSize"]
+        if revision:
+            pageable["revision"] = revision
+        body = json.dumps(data).encode('utf-8')
+        with self.lock:
+            self.bodies[key] = body
+        return body
+
+
+class FakeTTBHandler(BaseHTTPRequestHandler):
+    state = None
+    # Keep connections open, so a pooled session can reuse them
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        state = self.state
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/getPageableCourses"):
+            self._send(404, b'{"error": "not found"}', {"Content-Type": "application/json"})
+            return
+
+        with state.lock:
+            state.requests += 1
+            count = state.requests
+            state.in_flight += 1
+            state.max_in_flight = max(state.max_in_flight, state.in_flight)
+        try:
+            time.sleep(state.latency)
+            if state.rate_limit_every and count % state.rate_limit_every == 0:
+                self._send(429, b'{"error": "too many requests"}', {"Retry-After": str(state.retry_after)})
+                return
+            if state.fail_every and count % state.fail_every == 0:
+                self._send(503, b'{"error": "unavailable"}')
+                return
+
+            page = int(request.get("page", 1))
+            if page < 1 or page > state.pages:
+                body = json.dumps({"payload": {"pageableCourse": {"courses": [], "total": 0}}}).encode('utf-8')
+            else:
+                body = state.page_body(page)
+            etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304, headers={"ETag": etag})
+                return
+            self._send(200, body, {"Content-Type": "application/json", "ETag": etag})
+        finally:
+            with state.lock:
+                state.in_flight -= 1
+
+
+class FakeTTBServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+def start_server(host="127.0.0.1", port=8090, **state_options):
+    """Start the fake server on a background thread and return (server, state)."""
+    state = FakeTTBState(**state_options)
+    handler = type("Handler", (FakeTTBHandler,), {"state": state})
+    server = FakeTTBServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run a local fake timetable API server.")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--result-dir", default="./result", help="Scraped pages to serve")
+    parser.add_argument("--pages", type=int, default=395)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds added to every response")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="Answer every Nth request with a 429")
+    parser.add_argument("--fail-every", type=int, default=0, help="Answer every Nth request with a 503")
+    args = parser.parse_args()
+
+    server, state = start_server(
+        port=args.port,
+        result_dir=args.result_dir,
+        pages=args.pages,
+        latency=args.latency,
+        rate_limit_every=args.rate_limit_every,
+        fail_every=args.fail_every
+    )
+    print(f"Fake timetable API listening on http://127.0.0.1:{args.port}/ttb/getPageableCourses")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -1,4 +1,11 @@
-import requests, random, json, time, os
+import requests, random, json, time, os, sys, math, hashlib, argparse, tempfile, threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from RAG.embedding_pipeline import TokenBucket
+from mongodb.data_transform import NEW_FILE_MODE
 
 USER_AGENTS = [
     "Mozilla/5.0 (Windows; U; Windows NT 5.2) Gecko/2008070208 Firefox/3.0.1"
@@ -28,10 +35,16 @@ USER_AGENTS = [
 
 url = "https://api.easi.utoronto.ca/ttb/getPageableCourses"
 
-print("----Scraping start----")
+PAGE_SIZE = 20
+# Used when the first page does not report the total number of courses
+DEFAULT_PAGES = 395
+
+# Statuses worth retrying: rate limited, or the server is having a bad moment
+RETRY_STATUSES = {429, 500, 502, 503, 504}
 
-for i in range(0,395):
-    headers = {
+
+def build_headers():
+    return {
         "Accept": "application/json, text/plain, */*",
         "Content-Type": "application/json",
         "Host": "api.easi.utoronto.ca",
@@ -40,7 +53,9 @@ for i in range(0,395):
         "User-Agent": random.choice(USER_AGENTS)
     }
 
-    data = {
+
+def build_payload(page, page_size=PAGE_SIZE):
+    return {
         "courseCodeAndTitleProps": {
             "courseCode": "",
             "courseTitle": "",
@@ -60,17 +75,252 @@ for i in range(0,395):
         "creditWeights": [],
         "availableSpace": True,
         "waitListable": True,
-        "page": i+1,
-        "pageSize": 20,
+        "page": page,
+        "pageSize": page_size,
         "direction": "asc"
     }
 
-    res = requests.post(url, data=json.dumps(data), headers=headers)
-    if not os.path.exists(f"./result"):
-        os.makedirs(f"./result")
-    with open(f"./result/{i+1}.json", "w", encoding="utf-8") as f:
-        f.write(res.text)
-    print(f"{i+1} page complet")
-    time.sleep(random.uniform(0.5, 1.5))
-    
-print("finish!")
\ No newline at end of file
+
+def write_atomic(path, text):
+    """Write the file in one step, so an interrupted run never leaves half a page behind."""
+    # The temporary file goes next to the target, on the same filesystem; its .tmp
+    # suffix keeps it out of page_paths and remove_stale_pages
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=directory, suffix='.tmp', delete=False) as f:
+        f.write(text)
+    # NamedTemporaryFile creates the file 0600; give the page the mode open(path, 'w') would
+    os.chmod(f.name, NEW_FILE_MODE)
+    os.replace(f.name, path)
+
+
+def scrape_sequential(pages=DEFAULT_PAGES, output_dir="./result", endpoint=url, delay=(0.5, 1.5)):
+    """The original scraper: one page at a time, a new connection per page, a random pause in between."""
+    os.makedirs(output_dir, exist_ok=True)
+    for i in range(pages):
+        res = requests.post(endpoint, data=json.dumps(build_payload(i + 1)), headers=build_headers())
+        with open(f"{output_dir}/{i+1}.json", "w", encoding="utf-8") as f:
+            f.write(res.text)
+        print(f"{i+1} page complet")
+        time.sleep(random.uniform(*delay))
+
+
+class PageScraper:
+    """
+    Fetch the timetable pages concurrently over one pooled session.
+
+    At most `workers` requests are in flight, and all of them together stay
+    under `rate` requests per second. Failed pages are retried with
+    exponential backoff, or after the server's Retry-After, which pauses every
+    worker. Each saved page is recorded in a checkpoint file next to the
+    output directory (content hash, ETag, Last-Modified), so a restarted run
+    only fetches the pages that are missing.
+
+    With refresh=True every page is fetched again, conditionally if the
+    server sent validators; pages whose content did not change are not
+    rewritten, and the report lists the ones that did.
+    """
+
+    def __init__(self, output_dir="./result", endpoint=url, workers=4, rate=2.0, max_retries=5, page_size=PAGE_SIZE):
+        self.output_dir = output_dir
+        self.endpoint = endpoint
+        self.workers = workers
+        self.max_retries = max_retries
+        self.page_size = page_size
+        self.bucket = TokenBucket(rate, capacity=max(1, min(workers, rate)))
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.checkpoint_path = f"{os.path.normpath(output_dir)}.checkpoint.json"
+        self.checkpoint = self.load_checkpoint()
+        self.lock = threading.Lock()
+        self.report = {"fetched": 0, "changed": 0, "unchanged": 0, "not_modified": 0, "skipped": 0,
+                       "failed": 0, "retries": 0, "removed": 0}
+        self.changed_pages = []
+
+    def page_path(self, page):
+        return os.path.join(self.output_dir, f"{page}.json")
+
+    def load_checkpoint(self):
+        if not os.path.exists(self.checkpoint_path):
+            return {}
+        with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_checkpoint(self):
+        # Called with self.lock held
+        write_atomic(self.checkpoint_path, json.dumps(self.checkpoint, indent=1, sort_keys=True))
+
+    def is_complete(self, page):
+        return str(page) in self.checkpoint and os.path.exists(self.page_path(page))
+
+    def _count(self, key):
+        with self.lock:
+            self.report[key] += 1
+
+    def _post(self, page, conditional):
+        headers = build_headers()
+        entry = self.checkpoint.get(str(page), {})
+        # A 304 is only useful if the saved copy is still there
+        conditional = conditional and os.path.exists(self.page_path(page))
+        if conditional and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if conditional and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                response = self.session.post(self.endpoint, data=json.dumps(build_payload(page, self.page_size)),
+                                             headers=headers, timeout=30)
+            except requests.RequestException as e:
+                error, retry_after = str(e), None
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    # Other errors (400, 404, ...) would fail the same way again, so they are not retried
+                    response.raise_for_status()
+                    return response
+                error = f"HTTP {response.status_code}"
+                retry_after = response.headers.get("Retry-After")
+
+            if attempt == self.max_retries:
+                raise RuntimeError(f"page {page} failed after {attempt + 1} attempts: {error}")
+            self._count("retries")
+            try:
+                delay = float(retry_after)
+                # Stop every worker until the server says it is ready again
+                self.bucket.pause(delay)
+            except (TypeError, ValueError):
+                delay = min(30, 2 ** attempt) + random.uniform(0, 0.5)
+                time.sleep(delay)
+            print(f"Page {page} failed ({error}), retrying in {delay:.1f}s...")
+
+    def fetch_page(self, page, conditional=False):
+        """
+        Fetch one page and save it if its content changed.
+
+        Returns:
+            tuple: (status, parsed page or None); status is "changed",
+                "unchanged" or "not_modified".
+        """
+        response = self._post(page, conditional)
+        self._count("fetched")
+        if response.status_code == 304:
+            self._count("not_modified")
+            return "not_modified", None
+
+        # Anything but a page of courses (an error page, a maintenance notice) is not saved
+        data = response.json()
+        if "courses" not in ((data.get("payload") or {}).get("pageableCourse") or {}):
+            raise ValueError(f"page {page} has no courses in its response")
+
+        content_hash = hashlib.sha256(response.content).hexdigest()
+        with self.lock:
+            entry = self.checkpoint.get(str(page), {})
+            changed = entry.get("sha256") != content_hash or not os.path.exists(self.page_path(page))
+        if changed:
+            write_atomic(self.page_path(page), response.text)
+
+        with self.lock:
+            self.checkpoint[str(page)] = {
+                "sha256": content_hash,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "fetched_at": time.time()
+            }
+            self.save_checkpoint()
+            if changed:
+                self.changed_pages.append(page)
+            self.report["changed" if changed else "unchanged"] += 1
+        return ("changed" if changed else "unchanged"), data
+
+    def page_count(self, refresh=False):
+        """Work out the number of pages from the course total on the first page, fetching it if needed."""
+        data = None
+        if refresh or not self.is_complete(1):
+            status, data = self.fetch_page(1, refresh)
+        else:
+            self.report["skipped"] += 1
+        if data is None:
+            with open(self.page_path(1), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        pageable = data["payload"]["pageableCourse"]
+        if not pageable.get("total"):
+            return DEFAULT_PAGES
+        return math.ceil(pageable["total"] / (pageable.get("pageSize") or self.page_size))
+
+    def remove_stale_pages(self, pages):
+        # The catalog shrank; drop the pages past its end so they are not transformed again
+        with self.lock:
+            for key in [key for key in self.checkpoint if int(key) > pages]:
+                del self.checkpoint[key]
+                self.report["removed"] += 1
+            self.save_checkpoint()
+        for name in os.listdir(self.output_dir):
+            stem = name[:-len(".json")] if name.endswith(".json") else ""
+            if stem.isdigit() and int(stem) > pages:
+                os.remove(os.path.join(self.output_dir, name))
+
+    def run(self, pages=None, refresh=False):
+        """
+        Fetch every page not fetched yet (every page with refresh=True).
+
+        Args:
+            pages (int): Number of pages; by default read from the first page's course total.
+
+        Returns:
+            dict: Counts of fetched, changed, unchanged, skipped and failed pages,
+                and the sorted list of changed pages.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        start_time = time.time()
+        if pages is None:
+            pages = self.page_count(refresh)
+            self.remove_stale_pages(pages)
+            done = {1}
+        else:
+            done = set()
+
+        todo = []
+        for page in range(1, pages + 1):
+            if page in done:
+                continue
+            if not refresh and self.is_complete(page):
+                self.report["skipped"] += 1
+            else:
+                todo.append(page)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.fetch_page, page, refresh): page for page in todo}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    self._count("failed")
+                    print(f"Page {futures[future]} not saved: {e}")
+
+        report = dict(self.report, changed_pages=sorted(self.changed_pages), pages=pages,
+                      seconds=round(time.time() - start_time, 2))
+        print(f"Scraped {pages} pages in {report['seconds']}s: " + ", ".join(f"{key} {value}" for key, value in self.report.items()))
+        return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Scrape the course timetable into ./result.")
+    parser.add_argument("--output-dir", default="./result")
+    parser.add_argument("--url", default=url)
+    parser.add_argument("--pages", type=int, default=None, help="Number of pages (default: from the course total)")
+    parser.add_argument("--workers", type=int, default=4, help="Requests in flight at once")
+    parser.add_argument("--rate", type=float, default=2.0, help="Requests per second across all workers")
+    parser.add_argument("--retries", type=int, default=5)
+    parser.add_argument("--refresh", action="store_true",
+                        help="Fetch every page again and only rewrite the pages that changed")
+    parser.add_argument("--sequential", action="store_true", help="Use the original one-page-at-a-time scraper")
+    args = parser.parse_args()
+
+    print("----Scraping start----")
+    if args.sequential:
+        scrape_sequential(args.pages or DEFAULT_PAGES, args.output_dir, args.url)
+    else:
+        PageScraper(args.output_dir, args.url, args.workers, args.rate, args.retries).run(args.pages, args.refresh)
+    print("finish!")
@@ -0,0 +1,15 @@
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from mongodb.data_transform import RESULT_DIR, iter_transformed_pages, write_transformed
+
+
+@pytest.fixture(scope="session")
+def transformed_dir(tmp_path_factory):
+    """The scraped pages in mongodb/result, transformed into NDJSON in a temporary directory."""
+    output_dir = str(tmp_path_factory.mktemp("transformed"))
+    write_transformed(iter_transformed_pages(RESULT_DIR, workers=1), output_dir)
+    return output_dir
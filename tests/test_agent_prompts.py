@@ -0,0 +1,57 @@
+import os
+import sys
+import json
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# The agents never call the API here, but llm_clients needs a key to create its clients
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+try:
+    from llm_clients import count_prompt_tokens, count_tokens
+except Exception as e:
+    # The tokenizer's encoding is downloaded on first use
+    pytest.skip(f"tokenizer unavailable: {e}", allow_module_level=True)
+
+from JSONGeneratorAgent import JSONGeneratorAgent
+from TextRecommendationAgent import TextRecommendationAgent
+from CombinedRecommendationAgent import CombinedRecommendationAgent
+
+USER_QUERY = "A second-year student at St. George looking for statistics courses in the fall."
+RETRIEVED_COURSES = [
+    {
+        "course_code": f"STA{200 + i}H1",
+        "name": f"Statistics course {i}",
+        "description": "Probability models, estimation and hypothesis testing. " * 5,
+        "prerequisites": "STA130H1",
+        "sessions": ["20249"],
+    }
+    for i in range(10)
+]
+COURSE_JSON = json.dumps(RETRIEVED_COURSES)
+
+
+def prompt_tokens(messages):
+    return count_prompt_tokens([count_tokens(message["content"]) for message in messages])
+
+
+@pytest.mark.parametrize("agent, args", [
+    (JSONGeneratorAgent(), (USER_QUERY, RETRIEVED_COURSES)),
+    (TextRecommendationAgent(), (COURSE_JSON,)),
+    (CombinedRecommendationAgent(), (USER_QUERY, RETRIEVED_COURSES)),
+])
+def test_prompt_size_is_constant_across_calls(agent, args):
+    sizes = {prompt_tokens(agent.build_messages(*args)) for _ in range(50)}
+    assert len(sizes) == 1
+    assert len(agent.build_messages(*args)) == 2
+
+
+@pytest.mark.parametrize("agent, args", [
+    (JSONGeneratorAgent(), (USER_QUERY * 2000, RETRIEVED_COURSES)),
+    (TextRecommendationAgent(), (COURSE_JSON * 200,)),
+    (CombinedRecommendationAgent(), (USER_QUERY * 2000, RETRIEVED_COURSES)),
+])
+def test_oversized_inputs_fit_the_context(agent, args):
+    messages = agent.build_messages(*args)
+    assert prompt_tokens(messages) + agent.max_tokens <= agent.max_context_length
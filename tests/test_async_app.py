@@ -0,0 +1,74 @@
+import os
+import sys
+import asyncio
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+# The app never calls the API or MongoDB here, but its modules create clients at import
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+try:
+    import async_app
+except Exception as e:
+    # Quart and the tokenizer's encoding (downloaded on first use) are needed to import the app
+    pytest.skip(f"async app unavailable: {e}", allow_module_level=True)
+
+from RAG.filter_engine import FilterEngine
+
+ROWS = [
+    {"campus": "St. George", "department": "Department of Computer Science", "division": "Arts and Science, Faculty of"},
+]
+LLM_FILTER = {"campus": {"$in": ["St. George"]}, "department": {"$in": ["Department of Mathematics"]}}
+
+
+def unreachable():
+    raise ConnectionError("MongoDB is unreachable")
+
+
+@pytest.fixture
+def llm_filter(monkeypatch):
+    """Replace the LLM filter call, recording how often it is made."""
+    calls = []
+
+    async def generate_llm_filter(conversation):
+        calls.append(conversation)
+        return LLM_FILTER
+
+    monkeypatch.setattr(async_app, "generate_llm_filter", generate_llm_filter)
+    monkeypatch.setattr(async_app, "FILTER_LLM_FALLBACK", True)
+    return calls
+
+
+def test_falls_back_to_the_llm_filter_without_mongodb(monkeypatch, llm_filter):
+    monkeypatch.setattr(async_app, "get_filter_engine", unreachable)
+    assert asyncio.run(async_app.resolve_filter("Computer science courses.", [])) == LLM_FILTER
+    assert len(llm_filter) == 1
+
+
+def test_local_filter_cancels_the_llm_filter(monkeypatch, llm_filter):
+    monkeypatch.setattr(async_app, "get_filter_engine", lambda: FilterEngine(ROWS))
+
+    async def resolve():
+        llm_filter_task = asyncio.create_task(asyncio.sleep(10, result=LLM_FILTER))
+        filter_dict = await async_app.resolve_filter("Computer science courses.", [], llm_filter_task)
+        await asyncio.sleep(0)
+        return filter_dict, llm_filter_task.cancelled()
+
+    filter_dict, cancelled = asyncio.run(resolve())
+    assert filter_dict["department"] == {"$in": ["Department of Computer Science"]}
+    assert cancelled
+    assert llm_filter == []
+
+
+def test_unresolved_department_uses_the_llm_filter(monkeypatch, llm_filter):
+    monkeypatch.setattr(async_app, "get_filter_engine", lambda: FilterEngine(ROWS))
+    assert asyncio.run(async_app.resolve_filter("Courses about ancient history.", [])) == LLM_FILTER
+    assert len(llm_filter) == 1
+
+
+def test_starts_without_mongodb(monkeypatch):
+    monkeypatch.setattr(async_app, "get_filter_engine", unreachable)
+    asyncio.run(async_app.load_filter_engine())
+
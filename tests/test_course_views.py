@@ -0,0 +1,85 @@
+import os
+import sys
+import copy
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+mongomock = pytest.importorskip("mongomock")
+
+# db_store creates an OpenAI client at import; these tests never call it
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from mongodb import db_store
+from mongodb.catalog_version import get_catalog_version
+from mongodb.course_views import build_course_payload, build_course_views, fetch_course_views
+
+COURSES = [
+    {"course_id": "c1", "course_code": "CSC108H1", "name": "Introduction to Computer Programming",
+     "section_code": "F", "department": "Department of Computer Science", "campus": "St. George",
+     "division": "Arts and Science, Faculty of", "description": "Programming in Python.",
+     "prerequisites": "", "exclusions": "CSC120H1", "sessions": ["20249"]},
+    {"course_id": "c2", "course_code": "MAT137Y1", "name": "Calculus with Proofs",
+     "section_code": "Y", "department": "Department of Mathematics", "campus": "St. George",
+     "division": "Arts and Science, Faculty of", "description": "Limits, derivatives and integrals.",
+     "prerequisites": "MHF4U", "exclusions": None, "sessions": ["20249", "20251"]},
+]
+MEETING_SECTIONS = [
+    {"course_id": "c1", "section_code": "LEC0101", "type": "Lecture", "instructors": ["A. Smith"],
+     "times": [{"day": 1, "start": "10:00:00", "end": "11:00:00", "location": "BA"}], "size": 300, "notes": "INPER"},
+    {"course_id": "c1", "section_code": "TUT0101", "type": "Tutorial", "instructors": [],
+     "times": [], "size": 30, "notes": "INPER"},
+    {"course_id": "c2", "section_code": "LEC0101", "type": "Lecture", "instructors": ["B. Jones"],
+     "times": [{"day": 3, "start": "14:00:00", "end": "16:00:00", "location": "MP"}], "size": 200, "notes": "SYNC"},
+]
+
+
+@pytest.fixture
+def views():
+    return mongomock.MongoClient()['uoft_courses']['course_views']
+
+
+def test_payload(views):
+    build_course_views(COURSES, MEETING_SECTIONS, views)
+    payload = fetch_course_views(["c1"], views)["c1"]
+    assert payload == build_course_payload(COURSES[0], [MEETING_SECTIONS[0]])
+    assert payload["prerequisites"] == "No prerequisites"
+    assert payload["sessions"] == "20249"
+    assert payload["meeting_sections"] == [
+        "Section: LEC0101, Type: Lecture, Instructors: A. Smith, Times: Day 1, 10:00:00-11:00:00 at BA, Class Size: 300"
+    ]
+    assert fetch_course_views(["c2"], views)["c2"]["exclusions"] == "No exclusions"
+
+
+def test_rebuild_is_incremental(views):
+    assert build_course_views(COURSES, MEETING_SECTIONS, views) == {"upserted": 2, "unchanged": 0, "deleted": 0}
+    assert build_course_views(COURSES, MEETING_SECTIONS, views) == {"upserted": 0, "unchanged": 2, "deleted": 0}
+
+    # A changed lecture section rewrites its course's view; a removed course loses its view
+    sections = copy.deepcopy(MEETING_SECTIONS)
+    sections[0]["instructors"] = ["C. Brown"]
+    assert build_course_views(COURSES[:1], sections, views) == {"upserted": 1, "unchanged": 0, "deleted": 1}
+    assert set(fetch_course_views(["c1", "c2"], views)) == {"c1"}
+    assert "C. Brown" in fetch_course_views(["c1"], views)["c1"]["meeting_sections"][0]
+
+
+def test_ingest_builds_views_before_bumping_the_version(monkeypatch):
+    client = mongomock.MongoClient()
+    records = {"courses": COURSES, "meeting_sections": MEETING_SECTIONS}
+    events = []
+    monkeypatch.setattr(db_store, "MongoClient", lambda *args, **kwargs: client)
+    monkeypatch.setattr(db_store, "iter_transformed", lambda kind: iter(copy.deepcopy(records[kind])))
+    monkeypatch.setattr(db_store, "lexical_index_exists", lambda: True)
+    monkeypatch.setattr(db_store, "build_lexical_index", lambda: events.append("lexical_index"))
+    monkeypatch.setattr(db_store, "bump_catalog_version",
+                        lambda db: events.append(("bump", db['course_views'].count_documents({}))))
+
+    db_store.main()
+    assert events == ["lexical_index", ("bump", 2)]
+    assert set(fetch_course_views(["c1", "c2"], client['uoft_courses']['course_views'])) == {"c1", "c2"}
+
+    # Nothing changed: no rebuild and no new version
+    events.clear()
+    db_store.main()
+    assert events == []
+    assert get_catalog_version(client['uoft_courses']) == "0"
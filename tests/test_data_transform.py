@@ -0,0 +1,95 @@
+import os
+import sys
+import json
+import stat
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from mongodb import data_transform
+from mongodb.data_transform import (
+    NEW_FILE_MODE, RECORD_KINDS, RESULT_DIR, iter_transformed, iter_transformed_pages, load_transformed_data,
+    millis_to_time, page_paths, transform_course, transformed_path, write_transformed
+)
+
+
+def raw_courses():
+    for file_path in page_paths(RESULT_DIR):
+        with open(file_path, 'r', encoding='utf-8') as file:
+            yield from json.load(file)['payload']["pageableCourse"]["courses"]
+
+
+def test_page_order():
+    assert [os.path.basename(path) for path in page_paths(RESULT_DIR)] == \
+        [f"{page}.json" for page in range(1, len(page_paths(RESULT_DIR)) + 1)]
+
+
+@pytest.mark.parametrize("millisofday, expected", [(0, "00:00:00"), (36000000, "10:00:00"), (49500000, "13:45:00")])
+def test_millis_to_time(millisofday, expected):
+    assert millis_to_time(millisofday) == expected
+
+
+def test_records_match_the_pages(transformed_dir):
+    courses, meeting_sections = [], []
+    for course_data in raw_courses():
+        course, sections = transform_course(course_data)
+        courses.append(course)
+        meeting_sections.extend(sections)
+
+    assert courses
+    assert list(iter_transformed("courses", transformed_dir)) == courses
+    assert list(iter_transformed("meeting_sections", transformed_dir)) == meeting_sections
+
+    first = next(raw_courses())
+    assert (courses[0]["course_id"], courses[0]["course_code"], courses[0]["campus"]) == \
+        (first["id"], first["code"], first["campus"])
+    first_sections = meeting_sections[:len(first["sections"])]
+    assert [section["section_code"] for section in first_sections] == [section["name"] for section in first["sections"]]
+    assert all(section["course_id"] == first["id"] for section in first_sections)
+
+
+def test_output_files(transformed_dir):
+    counts = {kind: 0 for kind in RECORD_KINDS}
+    for kind in RECORD_KINDS:
+        path = transformed_path(kind, transformed_dir)
+        assert stat.S_IMODE(os.stat(path).st_mode) == NEW_FILE_MODE
+        with open(path, 'r', encoding='utf-8') as infile:
+            counts[kind] = sum(1 for line in infile if line.strip())
+    assert {kind: len(records) for kind, records in load_transformed_data(transformed_dir).items()} == counts
+    assert not [name for name in os.listdir(transformed_dir) if name.endswith(".tmp")]
+
+
+def test_failed_write_keeps_the_previous_output(tmp_path):
+    write_transformed([{"courses": '{"course_id": "c1"}\n', "meeting_sections": ""}], str(tmp_path))
+
+    def pages():
+        yield {"courses": '{"course_id": "c2"}\n', "meeting_sections": ""}
+        raise RuntimeError("transform failed")
+
+    with pytest.raises(RuntimeError):
+        write_transformed(pages(), str(tmp_path))
+    assert list(iter_transformed("courses", str(tmp_path))) == [{"course_id": "c1"}]
+    assert sorted(os.listdir(tmp_path)) == ["courses.ndjson", "meeting_sections.ndjson"]
+
+
+def test_falls_back_to_the_older_json(tmp_path, monkeypatch):
+    legacy_path = tmp_path / "transformed_data.json"
+    with open(legacy_path, 'w', encoding='utf-8') as outfile:
+        json.dump({"courses": [{"course_id": "c1"}], "meeting_sections": [{"course_id": "c1", "section_code": "LEC0101"}]},
+                  outfile)
+    monkeypatch.setattr(data_transform, "LEGACY_TRANSFORMED_PATH", str(legacy_path))
+
+    assert load_transformed_data(str(tmp_path / "transformed")) == {
+        "courses": [{"course_id": "c1"}],
+        "meeting_sections": [{"course_id": "c1", "section_code": "LEC0101"}],
+    }
+
+
+@pytest.mark.parametrize("workers", [2, 3])
+def test_worker_count_does_not_change_the_output(transformed_dir, tmp_path, workers):
+    counts = write_transformed(iter_transformed_pages(RESULT_DIR, workers=workers), str(tmp_path))
+    assert counts["courses"] == len(list(iter_transformed("courses", transformed_dir)))
+    for kind in RECORD_KINDS:
+        with open(transformed_path(kind, str(tmp_path)), 'rb') as parallel, \
+                open(transformed_path(kind, transformed_dir), 'rb') as sequential:
+            assert parallel.read() == sequential.read()
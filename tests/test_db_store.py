@@ -0,0 +1,95 @@
+import os
+import sys
+from unittest import mock
+import pytest
+from pymongo.errors import OperationFailure
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+mongomock = pytest.importorskip("mongomock")
+
+# db_store creates an OpenAI client at import; these tests never call it
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from mongodb.db_store import MEETING_SECTION_KEY, ensure_unique_index, find_duplicate_keys, sync_collection
+
+SECTIONS = [
+    {"course_id": "c1", "section_code": "LEC0101", "type": "Lecture", "size": 300},
+    {"course_id": "c1", "section_code": "TUT0101", "type": "Tutorial", "size": 30},
+    {"course_id": "c2", "section_code": "LEC0101", "type": "Lecture", "size": 200},
+]
+
+
+@pytest.fixture
+def collection():
+    return mongomock.MongoClient()['uoft_courses']['meeting_sections']
+
+
+def stored(collection):
+    return sorted((doc["course_id"], doc["section_code"], doc["size"]) for doc in collection.find())
+
+
+def test_sync_upserts_only_what_changed(collection):
+    assert sync_collection(collection, SECTIONS, MEETING_SECTION_KEY, batch_size=2) == \
+        {"upserted": 3, "unchanged": 0, "deleted": 0}
+    ids = {doc["section_code"] + doc["course_id"]: doc["_id"] for doc in collection.find()}
+
+    assert sync_collection(collection, SECTIONS, MEETING_SECTION_KEY) == {"upserted": 0, "unchanged": 3, "deleted": 0}
+
+    changed = [dict(SECTIONS[0], size=250)] + SECTIONS[1:]
+    assert sync_collection(collection, changed, MEETING_SECTION_KEY) == {"upserted": 1, "unchanged": 2, "deleted": 0}
+    assert stored(collection) == [("c1", "LEC0101", 250), ("c1", "TUT0101", 30), ("c2", "LEC0101", 200)]
+    # Records are replaced in place, not deleted and reinserted
+    assert {doc["section_code"] + doc["course_id"]: doc["_id"] for doc in collection.find()} == ids
+
+
+def test_sync_deletes_records_that_disappeared(collection):
+    sync_collection(collection, SECTIONS, MEETING_SECTION_KEY)
+    assert sync_collection(collection, SECTIONS[1:], MEETING_SECTION_KEY, batch_size=1) == \
+        {"upserted": 0, "unchanged": 2, "deleted": 1}
+    assert stored(collection) == [("c1", "TUT0101", 30), ("c2", "LEC0101", 200)]
+
+
+def test_sync_keeps_the_first_of_duplicate_records(collection):
+    assert sync_collection(collection, SECTIONS + [dict(SECTIONS[0], size=1)], MEETING_SECTION_KEY)["upserted"] == 3
+    assert ("c1", "LEC0101", 300) in stored(collection)
+
+
+def test_empty_transform_leaves_the_collection_alone(collection):
+    sync_collection(collection, SECTIONS, MEETING_SECTION_KEY)
+    assert sync_collection(collection, [], MEETING_SECTION_KEY) == {"upserted": 0, "unchanged": 0, "deleted": 0}
+    assert len(stored(collection)) == 3
+
+
+def test_unique_index_reports_duplicates(collection):
+    collection.insert_many([dict(section) for section in SECTIONS + [SECTIONS[0], SECTIONS[0]]])
+    assert find_duplicate_keys(collection, MEETING_SECTION_KEY) == [({"course_id": "c1", "section_code": "LEC0101"}, 3)]
+
+    with pytest.raises(ValueError, match="LEC0101.*x3"):
+        ensure_unique_index(collection, MEETING_SECTION_KEY)
+    # Nothing was dropped
+    assert collection.count_documents({}) == 5
+
+
+def test_unique_index_is_created(collection):
+    collection.insert_many([dict(section) for section in SECTIONS])
+    ensure_unique_index(collection, MEETING_SECTION_KEY)
+    ensure_unique_index(collection, MEETING_SECTION_KEY)
+    assert any(index.get("unique") for index in collection.index_information().values())
+
+
+def test_non_unique_index_is_replaced():
+    collection = mock.MagicMock()
+    collection.create_index.side_effect = [OperationFailure("Index already exists with different options", code=85), None]
+    ensure_unique_index(collection, MEETING_SECTION_KEY)
+    index_keys = [("course_id", 1), ("section_code", 1)]
+    collection.drop_index.assert_called_once_with(index_keys)
+    assert collection.create_index.call_args_list == [mock.call(index_keys, unique=True)] * 2
+
+
+def test_other_index_errors_are_raised():
+    collection = mock.MagicMock()
+    collection.create_index.side_effect = OperationFailure("not authorized", code=13)
+    with pytest.raises(OperationFailure):
+        ensure_unique_index(collection, MEETING_SECTION_KEY)
+    collection.drop_index.assert_not_called()
@@ -0,0 +1,165 @@
+import os
+import sys
+import time
+import threading
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+httpx = pytest.importorskip("httpx")
+openai = pytest.importorskip("openai")
+
+from RAG.embedding_pipeline import AdaptiveBatchSize, EmbeddingPipeline, TokenBucket, retry_after_seconds
+
+ITEMS = [{"text": f"course {i}"} for i in range(100)]
+
+
+def api_error(cls, status, message, headers=None):
+    response = httpx.Response(status, headers=headers, request=httpx.Request("POST", "http://test/v1/embeddings"))
+    return cls(message, response=response, body=None)
+
+
+def embed(texts):
+    return [[float(text.split()[-1])] for text in texts]
+
+
+class Upserts:
+    """Thread-safe record of the upserted items and their embeddings."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.embeddings = {}
+
+    def __call__(self, batch, embeddings):
+        with self.lock:
+            for item, embedding in zip(batch, embeddings):
+                self.embeddings[item["text"]] = embedding
+
+
+def test_token_bucket_limits_the_rate():
+    bucket = TokenBucket(rate=100, capacity=1)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    # The first token is already in the bucket, the other five refill at 100 per second
+    assert time.monotonic() - start >= 0.04
+
+
+def test_token_bucket_pause_blocks_until_the_deadline():
+    bucket = TokenBucket(rate=1000)
+    bucket.pause(0.05)
+    start = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - start >= 0.04
+
+
+def test_token_bucket_lets_an_oversized_request_through():
+    bucket = TokenBucket(rate=1000, capacity=10)
+    start = time.monotonic()
+    bucket.acquire(50)
+    assert time.monotonic() - start < 0.05
+
+
+def test_adaptive_batch_size():
+    size = AdaptiveBatchSize(initial=100, minimum=8, maximum=120, grow_after=2)
+    size.failure()
+    assert size.size == 50
+    size.success()
+    size.failure()
+    size.success()
+    assert size.size == 25
+    size.success()
+    assert size.size == 37
+    for _ in range(10):
+        size.success()
+    assert size.size == 120
+    for _ in range(10):
+        size.failure()
+    assert size.size == 8
+
+
+def test_retry_after_header():
+    assert retry_after_seconds(api_error(openai.RateLimitError, 429, "slow down", {"retry-after-ms": "250"})) == 0.25
+    assert retry_after_seconds(api_error(openai.RateLimitError, 429, "slow down", {"retry-after": "2"})) == 2
+    assert retry_after_seconds(api_error(openai.RateLimitError, 429, "slow down")) is None
+    assert retry_after_seconds(ValueError("no response")) is None
+
+
+@pytest.mark.parametrize("concurrency", [1, 4])
+def test_every_item_is_embedded_and_upserted(concurrency):
+    upserts = Upserts()
+    report = EmbeddingPipeline(embed, upserts, concurrency=concurrency, initial_batch_size=16).run(ITEMS)
+    assert report["embedded"] == report["upserted"] == len(ITEMS)
+    assert report["failed"] == 0
+    assert upserts.embeddings == {item["text"]: embed([item["text"]])[0] for item in ITEMS}
+
+
+def test_too_large_batches_are_split():
+    def limited_embed(texts):
+        if len(texts) > 10:
+            raise api_error(openai.BadRequestError, 400, "Requested 999 tokens, max 400 tokens per request")
+        return embed(texts)
+
+    upserts = Upserts()
+    report = EmbeddingPipeline(limited_embed, upserts, concurrency=2, initial_batch_size=40).run(ITEMS)
+    assert report["upserted"] == len(ITEMS)
+    assert report["splits"] > 0
+    assert len(upserts.embeddings) == len(ITEMS)
+
+
+def test_a_single_item_over_the_limit_fails_without_retrying():
+    calls = []
+
+    def limited_embed(texts):
+        calls.append(texts)
+        if "course 3" in texts:
+            raise api_error(openai.BadRequestError, 400, "This model's maximum context length is 8192 tokens")
+        return embed(texts)
+
+    report = EmbeddingPipeline(limited_embed, Upserts(), concurrency=1, initial_batch_size=8).run(ITEMS[:8])
+    assert report["upserted"] == 7
+    assert report["failed"] == 1
+    assert report["retries"] == 0
+    assert calls.count(["course 3"]) == 1
+
+
+def test_rate_limits_are_retried_after_the_retry_after():
+    calls = []
+
+    def rate_limited_embed(texts):
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise api_error(openai.RateLimitError, 429, "Rate limit reached", {"retry-after-ms": "50"})
+        return embed(texts)
+
+    report = EmbeddingPipeline(rate_limited_embed, Upserts(), concurrency=1, initial_batch_size=10).run(ITEMS[:10])
+    assert report["upserted"] == 10
+    assert report["retries"] == 1
+    # A rate limit says nothing about the batch size
+    assert report["splits"] == 0
+    assert calls[1] - calls[0] >= 0.04
+
+
+def test_non_retryable_errors_stop_the_run():
+    calls = []
+
+    def bad_key(texts):
+        calls.append(texts)
+        raise api_error(openai.AuthenticationError, 401, "Incorrect API key provided")
+
+    start = time.monotonic()
+    with pytest.raises(openai.AuthenticationError):
+        EmbeddingPipeline(bad_key, Upserts(), concurrency=2, initial_batch_size=10).run(ITEMS)
+    assert len(calls) <= 2
+    assert time.monotonic() - start < 1
+
+
+def test_failed_upserts_are_counted():
+    def failing_upsert(batch, embeddings):
+        if any(item["text"] == "course 0" for item in batch):
+            raise RuntimeError("upsert failed")
+
+    report = EmbeddingPipeline(embed, failing_upsert, concurrency=1, initial_batch_size=10).run(ITEMS[:20])
+    assert report["embedded"] == 20
+    assert report["upserted"] == 10
+    assert report["failed"] == 10
@@ -0,0 +1,154 @@
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from RAG import filter_engine
+from RAG.filter_engine import FilterEngine, relax_filter
+from mongodb.data_transform import iter_transformed
+
+ROWS = [
+    {"campus": "St. George", "department": "Department of Computer Science", "division": "Arts and Science, Faculty of"},
+    {"campus": "St. George", "department": "Department of Mathematics", "division": "Arts and Science, Faculty of"},
+    {"campus": "St. George", "department": "Department of Economics", "division": "Arts and Science, Faculty of"},
+    {"campus": "St. George", "department": "Department of Statistical Sciences", "division": "Arts and Science, Faculty of"},
+    {"campus": "University of Toronto at Mississauga", "department": "Department of Anthropology",
+     "division": "University of Toronto Mississauga"},
+    {"campus": "Scarborough", "department": "Department of Psychology (UTSC)",
+     "division": "University of Toronto Scarborough"},
+]
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return FilterEngine(ROWS)
+
+
+def campuses(engine, query):
+    return engine.resolve(query)[0]["campus"]["$in"]
+
+
+def section_codes(engine, query):
+    return engine.resolve(query)[0].get("section_code", {}).get("$in")
+
+
+def departments(engine, query):
+    return engine.resolve(query)[0].get("department", {}).get("$in")
+
+
+@pytest.mark.parametrize("query", [
+    "Courses at UTM or St. George.",
+    "courses at UTM or St George",
+    "Anthropology at UTM or st. george; nothing online.",
+])
+def test_st_george_with_and_without_period(engine, query):
+    assert campuses(engine, query) == ["St. George", "University of Toronto at Mississauga"]
+
+
+def test_default_campus(engine):
+    filter_dict, found = engine.resolve("Intro programming courses.")
+    assert filter_dict["campus"] == {"$in": ["St. George"]}
+    assert not found["campus"]
+
+
+@pytest.mark.parametrize("query", [
+    "The student does not want anything in the winter term.",
+    "The student doesn't want winter courses.",
+    "No winter courses, please.",
+    "The student would like to avoid the winter semester.",
+])
+def test_negated_session(engine, query):
+    assert section_codes(engine, query) is None
+
+
+def test_negation_applies_to_its_clause_only(engine):
+    assert section_codes(engine, "Fall courses in computer science, but not in the winter.") == ["F", "Y"]
+    assert departments(engine, "Economics courses but not statistics.") == ["Department of Economics"]
+
+
+def test_negation_ends_at_sentence(engine):
+    query = "The student is not interested in economics. They want computer science courses."
+    assert departments(engine, query) == ["Department of Computer Science"]
+
+
+def test_semicolon_ends_negation(engine):
+    query = "The student does not want economics; mathematics courses in the fall."
+    assert departments(engine, query) == ["Department of Mathematics"]
+    assert section_codes(engine, query) == ["F", "Y"]
+
+
+@pytest.mark.parametrize("query", [
+    "The student is worried they will fall behind in math.",
+    "Courses to help with a spring in my step.",
+])
+def test_season_words_need_term_context(engine, query):
+    assert section_codes(engine, query) is None
+
+
+@pytest.mark.parametrize("query, codes", [
+    ("Computer science courses in the fall.", ["F", "Y"]),
+    ("Winter term mathematics courses.", ["S", "Y"]),
+    ("Fall or winter courses.", ["F", "S", "Y"]),
+    ("Courses starting in January.", ["S", "Y"]),
+    ("A full-year economics course.", ["Y"]),
+    ("Fall 2024 statistics courses.", ["F", "Y"]),
+])
+def test_session(engine, query, codes):
+    assert section_codes(engine, query) == codes
+
+
+def test_departments_limited_to_campus(engine):
+    assert departments(engine, "Psychology courses at UTSC.") == ["Department of Psychology (UTSC)"]
+    assert departments(engine, "Psychology courses downtown.") is None
+
+
+def test_delivery_mode(engine):
+    filter_dict, found = engine.resolve("Online statistics courses.")
+    assert found["delivery_mode"]
+    assert "SYNC" in filter_dict["delivery_modes"]["$in"]
+    assert "delivery_modes" not in engine.resolve("Online or in-person courses.")[0]
+    assert "delivery_modes" not in engine.resolve("Statistics, nothing online.")[0]
+
+
+def test_relax_filter(engine):
+    filter_dict, _ = engine.resolve("Online computer science courses in the fall.")
+    assert set(relax_filter(filter_dict)) == {"campus", "department"}
+
+
+def lookup_tables(engine):
+    return engine.campus_departments, engine.department_divisions
+
+
+def test_load_from_mongodb(transformed_dir, monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    client = mongomock.MongoClient()
+    client['uoft_courses']['courses'].insert_many(list(iter_transformed("courses", transformed_dir)))
+    monkeypatch.setattr(filter_engine, "MongoClient", lambda *args, **kwargs: client)
+    try:
+        from mongodb import catalog_snapshot
+        monkeypatch.setattr(catalog_snapshot, "snapshot_exists", lambda: False)
+    except ImportError:
+        # Without pyarrow the engine is always built from MongoDB
+        pass
+
+    expected = FilterEngine(iter_transformed("courses", transformed_dir))
+    assert expected.campus_departments
+    assert lookup_tables(filter_engine.load_filter_engine()) == lookup_tables(expected)
+
+
+def test_load_from_snapshot(transformed_dir, tmp_path, monkeypatch):
+    try:
+        from mongodb import catalog_snapshot
+    except ImportError:
+        pytest.skip("pyarrow is not available")
+    snapshot_dir = str(tmp_path)
+    catalog_snapshot.write_snapshot(snapshot_dir, transformed_dir)
+    load_snapshot = catalog_snapshot.load_snapshot
+    monkeypatch.setattr(catalog_snapshot, "snapshot_exists", lambda: True)
+    monkeypatch.setattr(catalog_snapshot, "load_snapshot",
+                        lambda kind, columns=None: load_snapshot(kind, columns, snapshot_dir))
+    monkeypatch.setattr(filter_engine, "MongoClient", None)
+
+    expected = FilterEngine(iter_transformed("courses", transformed_dir))
+    assert lookup_tables(filter_engine.load_filter_engine()) == lookup_tables(expected)
@@ -0,0 +1,147 @@
+import os
+import sys
+import copy
+import sqlite3
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+mongomock = pytest.importorskip("mongomock")
+
+# The retriever creates an OpenAI embedding client at import; these tests never call it
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from RAG import data_retriever_pinecone as retriever
+from RAG.embedding_cache import EmbeddingCache
+from RAG.vector_store import FaissVectorStore
+
+COURSES = [
+    {"course_id": "c1", "course_code": "CSC108H1", "name": "Introduction to Computer Programming",
+     "section_code": "F", "department": "Department of Computer Science", "campus": "St. George",
+     "division": "Arts and Science, Faculty of", "description": "Programming in Python.",
+     "prerequisites": "", "exclusions": "CSC120H1", "sessions": ["20249"]},
+    {"course_id": "c2", "course_code": "MAT137Y1", "name": "Calculus with Proofs",
+     "section_code": "Y", "department": "Department of Mathematics", "campus": "St. George",
+     "division": "Arts and Science, Faculty of", "description": "Limits, derivatives and integrals.",
+     "prerequisites": "MHF4U", "exclusions": None, "sessions": ["20249", "20251"]},
+    {"course_id": "c3", "course_code": "PSY100H5", "name": "Introductory Psychology",
+     "section_code": "S", "department": "Department of Psychology", "campus": "Mississauga",
+     "division": "University of Toronto Mississauga", "description": "Brain and behaviour.",
+     "prerequisites": None, "exclusions": None, "sessions": ["20251"]},
+]
+MEETING_SECTIONS = [
+    {"course_id": "c1", "section_code": "LEC0101", "type": "Lecture", "instructors": ["A. Smith"],
+     "times": [{"day": 1, "start": "10:00:00", "end": "11:00:00", "location": "BA"}], "size": 300, "notes": "INPER"},
+]
+
+
+class FakeEmbeddingBackend:
+    """Deterministic 4-dimensional embeddings that record every embedded text."""
+    model = "fake-embedding"
+    max_concurrency = 1
+
+    def __init__(self):
+        self.texts = []
+
+    def embed(self, texts, max_retries=None):
+        self.texts.extend(texts)
+        return [[float(len(text)), float(sum(map(ord, text)) % 97), 1.0, float(i)] for i, text in enumerate(texts)]
+
+
+@pytest.fixture
+def env(monkeypatch, tmp_path):
+    """Point the upsert at mongomock, a temporary FAISS index and a temporary embedding cache."""
+    db = mongomock.MongoClient()['uoft_courses']
+    db['courses'].insert_many(copy.deepcopy(COURSES))
+    db['meeting_sections'].insert_many(copy.deepcopy(MEETING_SECTIONS))
+    backend = FakeEmbeddingBackend()
+    cache_path = str(tmp_path / "cache.sqlite")
+    monkeypatch.setattr(retriever, "courses_collection", db['courses'])
+    monkeypatch.setattr(retriever, "meeting_sections_collection", db['meeting_sections'])
+    monkeypatch.setattr(retriever, "embedding_backend", backend)
+    monkeypatch.setattr(retriever, "EMBEDDING_MODEL", backend.model)
+    monkeypatch.setattr(retriever, "EmbeddingCache", lambda: EmbeddingCache(cache_path))
+    monkeypatch.setattr(retriever, "get_vector_store",
+                        lambda: FaissVectorStore(index_dir=str(tmp_path / "faiss"), index_name="test"))
+    return db, backend, tmp_path
+
+
+def upsert():
+    report = retriever.upsert_embeddings_to_pinecone()
+    return {key: report[key] for key in ("hits", "misses", "upserted", "unchanged", "deleted", "failed")}
+
+
+def test_only_changed_courses_are_embedded_and_upserted(env):
+    db, backend, tmp_path = env
+    assert upsert() == {"hits": 0, "misses": 3, "upserted": 3, "unchanged": 0, "deleted": 0, "failed": 0}
+    assert len(backend.texts) == 3
+
+    assert upsert() == {"hits": 0, "misses": 0, "upserted": 0, "unchanged": 3, "deleted": 0, "failed": 0}
+    assert len(backend.texts) == 3
+
+    db['courses'].update_one({"course_id": "c2"}, {"$set": {"description": "Sequences and series."}})
+    db['courses'].delete_one({"course_id": "c3"})
+    assert upsert() == {"hits": 0, "misses": 1, "upserted": 1, "unchanged": 1, "deleted": 1, "failed": 0}
+    assert "Sequences and series." in backend.texts[-1]
+
+    store = FaissVectorStore(index_dir=str(tmp_path / "faiss"), index_name="test")
+    assert store.vector_count() == 2
+
+
+def test_a_course_that_fails_to_prepare_keeps_its_vector(env, monkeypatch):
+    db, backend, tmp_path = env
+    upsert()
+
+    prepare = retriever.prepare_course_document
+
+    def failing_prepare(doc, lecture_sections_by_id):
+        if doc["course_id"] == "c2":
+            raise ValueError("bad document")
+        return prepare(doc, lecture_sections_by_id)
+
+    monkeypatch.setattr(retriever, "prepare_course_document", failing_prepare)
+    assert upsert()["deleted"] == 0
+    store = FaissVectorStore(index_dir=str(tmp_path / "faiss"), index_name="test")
+    assert store.vector_count() == 3
+
+
+def test_emptied_index_is_rebuilt_from_cached_embeddings(env):
+    db, backend, tmp_path = env
+    upsert()
+    for name in os.listdir(tmp_path / "faiss"):
+        os.remove(tmp_path / "faiss" / name)
+
+    assert upsert() == {"hits": 3, "misses": 0, "upserted": 3, "unchanged": 0, "deleted": 0, "failed": 0}
+    assert len(backend.texts) == 3
+
+
+def test_index_records_are_kept_per_backend_and_index(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"))
+    cache.mark_indexed("faiss", "courses", [("c1", "h1"), ("c2", "h2")])
+    cache.mark_indexed("pinecone", "courses", [("c1", "other")])
+    assert cache.indexed_hashes("faiss", "courses") == {"c1": "h1", "c2": "h2"}
+    assert cache.indexed_hashes("pinecone", "courses") == {"c1": "other"}
+    assert cache.indexed_hashes("faiss", "other-index") == {}
+
+    cache.unmark_indexed("faiss", "courses", ["c2"])
+    assert cache.indexed_hashes("faiss", "courses") == {"c1": "h1"}
+    cache.clear_indexed("faiss", "courses")
+    assert cache.indexed_hashes("faiss", "courses") == {}
+    assert cache.indexed_hashes("pinecone", "courses") == {"c1": "other"}
+
+    cache.put_embeddings([("k1", [0.5, 0.25])], "fake-embedding")
+    assert cache.get_embeddings(["k1", "missing"]) == {"k1": [0.5, 0.25]}
+
+
+def test_old_index_records_are_dropped(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("CREATE TABLE indexed (course_id TEXT PRIMARY KEY, content_hash TEXT)")
+        conn.execute("INSERT INTO indexed VALUES ('c1', 'h1')")
+    conn.close()
+
+    cache = EmbeddingCache(path)
+    assert cache.indexed_hashes("faiss", "courses") == {}
+    cache.mark_indexed("faiss", "courses", [("c1", "h1")])
+    assert cache.indexed_hashes("faiss", "courses") == {"c1": "h1"}
@@ -0,0 +1,155 @@
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from RAG import lexical_index
+from RAG.lexical_index import LexicalIndex, current_build_dir, is_exact_code_query, reciprocal_rank_fusion
+
+COURSES = [
+    {"course_id": "c1", "course_code": "CSC108H1", "name": "Introduction to Computer Programming",
+     "description": "Programming in Python for students with no programming experience.",
+     "prerequisites": "", "department": "Computer Science", "campus": "St. George", "section_code": "F"},
+    {"course_id": "c2", "course_code": "CSC148H1", "name": "Introduction to Computer Science",
+     "description": "Abstract data types, recursion and object-oriented programming.",
+     "prerequisites": "CSC108H1", "department": "Computer Science", "campus": "St. George", "section_code": "S"},
+    {"course_id": "c3", "course_code": "CSC148H5", "name": "Introduction to Computer Science",
+     "description": "Recursion, data structures and program design.",
+     "prerequisites": "CSC108H5", "department": "Mathematical and Computational Sciences",
+     "campus": "Mississauga", "section_code": "S"},
+    {"course_id": "c4", "course_code": "PSY100H1", "name": "Introductory Psychology",
+     "description": "Brain, behaviour, memory and perception.",
+     "prerequisites": "", "department": "Psychology", "campus": "St. George", "section_code": "F"},
+    # Duplicates of a course ID are indexed once
+    {"course_id": "c4", "course_code": "PSY100H1", "name": "Introductory Psychology",
+     "description": "Brain, behaviour, memory and perception.",
+     "prerequisites": "", "department": "Psychology", "campus": "St. George", "section_code": "F"},
+]
+MEETING_SECTIONS = [
+    {"course_id": "c1", "section_code": "LEC0101", "type": "Lecture", "notes": "ONLSYNC"},
+]
+
+
+@pytest.fixture
+def index():
+    return LexicalIndex.build(COURSES, MEETING_SECTIONS)
+
+
+def ids(results):
+    return [course_id for course_id, _ in results]
+
+
+def test_bm25_ranking(index):
+    assert len(index.course_ids) == 4
+    assert ids(index.search("psychology memory")) == ["c4"]
+    # Python is only in CSC108's description; programming appears in two courses
+    assert ids(index.search("python programming"))[:2] == ["c1", "c2"]
+    scores = [score for _, score in index.search("introduction computer science")]
+    assert scores == sorted(scores, reverse=True)
+    assert index.search("astrophysics") == []
+
+
+def test_course_codes(index):
+    # The base code matches every campus, the full code ranks its own course first
+    assert set(ids(index.search("CSC148"))) == {"c2", "c3"}
+    assert ids(index.search("CSC148H5"))[0] == "c3"
+    assert index.exact_code_matches("tell me about csc148") == ["c2", "c3"]
+    assert index.exact_code_matches("CSC148 and CSC148H1") == ["c2", "c3"]
+    assert index.exact_code_matches("csc148", filter={"campus": "Mississauga"}) == ["c3"]
+
+
+def test_filters(index):
+    assert ids(index.search("introduction computer", filter={"campus": {"$in": ["Mississauga"]}})) == ["c3"]
+    assert set(ids(index.search("introduction introductory", filter={"section_code": "F"}))) == {"c1", "c4"}
+    assert index.metadata[0]["delivery_modes"] == ["ONLSYNC"]
+
+
+@pytest.mark.parametrize("query,expected", [
+    ("CSC108", True),
+    ("tell me about CSC108H1 and MAT137", True),
+    ("what is csc148?", True),
+    ("courses like CSC108 about machine learning", False),
+    ("introductory programming", False),
+])
+def test_exact_code_query(query, expected):
+    assert is_exact_code_query(query) is expected
+
+
+def test_reciprocal_rank_fusion():
+    assert reciprocal_rank_fusion([["a", "b", "c"], ["b", "c", "d"]]) == ["b", "c", "a", "d"]
+    # A heavier weight lets one ranking decide the order
+    assert reciprocal_rank_fusion([["a", "b"], ["b", "a"]], weights=[2.0, 1.0]) == ["a", "b"]
+    assert reciprocal_rank_fusion([["a", "b"], ["b", "a"]], weights=[1.0, 2.0]) == ["b", "a"]
+    assert reciprocal_rank_fusion([]) == []
+
+
+def test_saved_builds_rotate(index, tmp_path):
+    index_dir = str(tmp_path)
+    assert current_build_dir(index_dir) is None
+
+    index.save(index_dir)
+    first = current_build_dir(index_dir)
+    loaded = LexicalIndex.load(index_dir)
+    assert loaded.course_ids == index.course_ids
+    assert loaded.search("python programming") == index.search("python programming")
+
+    index.save(index_dir)
+    second = current_build_dir(index_dir)
+    index.save(index_dir)
+    third = current_build_dir(index_dir)
+    assert len({first, second, third}) == 3
+    # The new build and the one before it are kept, older builds are removed
+    builds = sorted(name for name in os.listdir(index_dir) if name.startswith("build-"))
+    assert builds == sorted([os.path.basename(second), os.path.basename(third)])
+    assert not os.path.exists(os.path.join(index_dir, "CURRENT.tmp"))
+
+
+def test_unversioned_index_is_still_loaded(index, tmp_path):
+    index.save(str(tmp_path))
+    build_dir = current_build_dir(str(tmp_path))
+    legacy_dir = tmp_path / "legacy"
+    os.rename(build_dir, legacy_dir)
+
+    assert current_build_dir(str(legacy_dir)) == str(legacy_dir)
+    assert LexicalIndex.load(str(legacy_dir)).course_ids == index.course_ids
+
+
+@pytest.fixture
+def saved(index, tmp_path, monkeypatch):
+    """Serve get_lexical_index from tmp_path, checking a fake catalog version on every call."""
+    index_dir = str(tmp_path)
+    index.save(index_dir)
+    version = ["1"]
+    load = LexicalIndex.load.__func__
+    monkeypatch.setattr(lexical_index, "_lexical_index", None)
+    monkeypatch.setattr(lexical_index, "_lexical_index_version", None)
+    monkeypatch.setattr(lexical_index, "_lexical_index_checked_at", 0.0)
+    monkeypatch.setattr(lexical_index, "CATALOG_VERSION_CHECK_INTERVAL", 0)
+    monkeypatch.setattr(lexical_index, "read_catalog_version", lambda: version[0])
+    monkeypatch.setattr(lexical_index, "lexical_index_exists", lambda: current_build_dir(index_dir) is not None)
+    monkeypatch.setattr(LexicalIndex, "load", classmethod(lambda cls: load(cls, index_dir)))
+    return index_dir, version
+
+
+def test_reloads_when_the_catalog_version_changes(index, saved):
+    index_dir, version = saved
+    first = lexical_index.get_lexical_index()
+    assert first.course_ids == index.course_ids
+    # Same version: the loaded index is reused
+    assert lexical_index.get_lexical_index() is first
+
+    LexicalIndex.build(COURSES[:2]).save(index_dir)
+    version[0] = "2"
+    second = lexical_index.get_lexical_index()
+    assert second is not first
+    assert second.course_ids == ["c1", "c2"]
+
+
+def test_keeps_the_current_index_when_the_new_build_cannot_be_loaded(saved):
+    index_dir, version = saved
+    first = lexical_index.get_lexical_index()
+    with open(os.path.join(index_dir, "CURRENT"), 'w', encoding='utf-8') as outfile:
+        outfile.write("build-missing")
+    version[0] = "2"
+    assert lexical_index.get_lexical_index() is first
@@ -0,0 +1,97 @@
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+from result_cache import RecommendationCache
+
+FILTER = {"campus": {"$in": ["St. George"]}, "department": {"$in": ["Department of Statistical Sciences"]}}
+RESULT = ([{"course_code": "STA257H1"}], "STA257H1 covers probability.")
+
+
+class Catalog:
+    """Fake catalog version that counts how often it is read."""
+
+    def __init__(self):
+        self.version = "1"
+        self.reads = 0
+
+    def __call__(self):
+        self.reads += 1
+        return self.version
+
+
+@pytest.fixture
+def catalog():
+    return Catalog()
+
+
+@pytest.fixture
+def cache(catalog):
+    return RecommendationCache(max_size=10, ttl=60, version_fn=catalog, version_interval=0)
+
+
+def test_exact_hits(cache):
+    assert cache.get("split", "Statistics courses in the fall.", FILTER) is None
+    cache.set("split", "Statistics courses in the fall.", FILTER, RESULT)
+    # Case and whitespace differences share an entry
+    assert cache.get("split", "  statistics courses   in the FALL. ", FILTER) == RESULT
+    # Filter keys are compared independently of their order
+    assert cache.get("split", "Statistics courses in the fall.", dict(reversed(list(FILTER.items())))) == RESULT
+
+
+@pytest.mark.parametrize("mode, refined_query, filter_dict", [
+    ("combined", "Statistics courses in the fall.", FILTER),
+    ("split", "Statistics courses in the winter.", FILTER),
+    ("split", "Statistics courses in the fall.", {"campus": {"$in": ["St. George"]}}),
+])
+def test_misses(cache, mode, refined_query, filter_dict):
+    cache.set("split", "Statistics courses in the fall.", FILTER, RESULT)
+    assert cache.get(mode, refined_query, filter_dict) is None
+
+
+def test_new_catalog_version_empties_the_cache(cache, catalog):
+    cache.set("split", "Statistics courses in the fall.", FILTER, RESULT)
+    catalog.version = "2"
+    assert cache.get("split", "Statistics courses in the fall.", FILTER) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_version_is_read_at_most_once_per_interval(catalog):
+    cache = RecommendationCache(max_size=10, ttl=60, version_fn=catalog, version_interval=3600)
+    cache.set("split", "Statistics courses in the fall.", FILTER, RESULT)
+    for _ in range(5):
+        assert cache.get("split", "Statistics courses in the fall.", FILTER) == RESULT
+    assert catalog.reads == 1
+
+
+def test_unreadable_version_keeps_the_cache(cache, catalog):
+    cache.set("split", "Statistics courses in the fall.", FILTER, RESULT)
+
+    def unreachable():
+        raise ConnectionError("MongoDB is unreachable")
+
+    cache.version_fn = unreachable
+    assert cache.get("split", "Statistics courses in the fall.", FILTER) == RESULT
+
+
+def test_semantic_hits(catalog):
+    cache = RecommendationCache(max_size=10, ttl=60, semantic=True, similarity=0.95,
+                                version_fn=catalog, version_interval=0)
+    cache.set("split", "Statistics courses in the fall.", FILTER, RESULT, embedding=[1.0, 0.0, 0.0])
+
+    assert cache.get("split", "Fall statistics courses.", FILTER, lambda: [0.99, 0.05, 0.0]) == RESULT
+    assert cache.get("split", "Economics courses.", FILTER, lambda: [0.0, 1.0, 0.0]) is None
+    # The same query under another filter is a different scope
+    assert cache.get("split", "Fall statistics courses.", {"campus": {"$in": ["Scarborough"]}},
+                     lambda: [0.99, 0.05, 0.0]) is None
+    assert cache.get("split", "Fall statistics courses.", FILTER, lambda: None) is None
+
+    catalog.version = "2"
+    assert cache.get("split", "Fall statistics courses.", FILTER, lambda: [0.99, 0.05, 0.0]) is None
+
+    stats = cache.stats()
+    assert (stats["exact_hits"], stats["semantic_hits"], stats["misses"]) == (0, 1, 4)
+    assert stats["hit_rate"] == pytest.approx(0.2)
@@ -0,0 +1,107 @@
+import os
+import sys
+import json
+import stat
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from mongodb.data_transform import NEW_FILE_MODE, RESULT_DIR
+from mongodb.fake_ttb_server import start_server
+from mongodb.scraper import PageScraper, write_atomic
+
+PAGES = 5
+
+
+@pytest.fixture
+def server():
+    """The fake timetable API on a free port, serving the pages in mongodb/result without latency."""
+    server, state = start_server(port=0, result_dir=RESULT_DIR, pages=PAGES, latency=0, retry_after=0.01)
+    yield f"http://127.0.0.1:{server.server_address[1]}/ttb/getPageableCourses", state
+    server.shutdown()
+    server.server_close()
+
+
+def scraper(output_dir, endpoint, **kwargs):
+    return PageScraper(str(output_dir), endpoint, workers=3, rate=1000, **kwargs)
+
+
+def saved_pages(output_dir):
+    return sorted(int(name[:-len(".json")]) for name in os.listdir(output_dir) if name.endswith(".json"))
+
+
+def test_write_atomic(tmp_path):
+    path = tmp_path / "1.json"
+    write_atomic(str(path), '{"page": 1}')
+    write_atomic(str(path), '{"page": 2}')
+    assert path.read_text(encoding='utf-8') == '{"page": 2}'
+    assert stat.S_IMODE(os.stat(path).st_mode) == NEW_FILE_MODE
+    assert os.listdir(tmp_path) == ["1.json"]
+
+
+def test_scrapes_every_page_and_resumes(server, tmp_path):
+    endpoint, state = server
+    output_dir = tmp_path / "result"
+    report = scraper(output_dir, endpoint).run()
+    assert report["pages"] == PAGES
+    assert report["changed_pages"] == list(range(1, PAGES + 1))
+    assert report["failed"] == 0
+    assert saved_pages(output_dir) == list(range(1, PAGES + 1))
+    with open(output_dir / "2.json", 'r', encoding='utf-8') as f:
+        assert json.load(f)["payload"]["pageableCourse"]["page"] == 2
+    assert 1 < state.max_in_flight <= 3
+
+    # A restarted run only fetches what is missing
+    os.remove(output_dir / "4.json")
+    requests = state.requests
+    report = scraper(output_dir, endpoint).run()
+    assert report["changed_pages"] == [4]
+    assert report["skipped"] == PAGES - 1
+    assert state.requests == requests + 1
+
+
+def test_refresh_rewrites_only_changed_pages(server, tmp_path):
+    endpoint, state = server
+    output_dir = tmp_path / "result"
+    scraper(output_dir, endpoint).run()
+    state.update_page(3)
+
+    report = scraper(output_dir, endpoint).run(refresh=True)
+    assert report["changed_pages"] == [3]
+    assert report["not_modified"] == PAGES - 1
+    with open(output_dir / "3.json", 'r', encoding='utf-8') as f:
+        assert json.load(f)["payload"]["pageableCourse"]["revision"] == 1
+
+
+def test_pages_past_a_shrunk_catalog_are_removed(server, tmp_path):
+    endpoint, state = server
+    output_dir = tmp_path / "result"
+    scraper(output_dir, endpoint).run()
+    state.pages = 3
+
+    report = scraper(output_dir, endpoint).run(refresh=True)
+    assert report["pages"] == 3
+    assert report["removed"] == 2
+    assert saved_pages(output_dir) == [1, 2, 3]
+
+
+def test_rate_limits_are_retried(tmp_path):
+    server, state = start_server(port=0, result_dir=RESULT_DIR, pages=PAGES, latency=0,
+                                 rate_limit_every=3, retry_after=0.01)
+    try:
+        endpoint = f"http://127.0.0.1:{server.server_address[1]}/ttb/getPageableCourses"
+        report = scraper(tmp_path / "result", endpoint).run(pages=PAGES)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert report["failed"] == 0
+    assert report["retries"] > 0
+    assert saved_pages(tmp_path / "result") == list(range(1, PAGES + 1))
+
+
+def test_client_errors_are_not_retried(server, tmp_path):
+    endpoint, state = server
+    report = scraper(tmp_path / "result", endpoint.replace("getPageableCourses", "missing")).run(pages=PAGES)
+    assert report["failed"] == PAGES
+    assert report["retries"] == 0
+    assert saved_pages(tmp_path / "result") == []
@@ -0,0 +1,44 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# db_store creates an OpenAI client at import; these tests never call it
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from mongodb.course_views import build_lecture_section_index, format_meeting_section
+from mongodb.data_transform import iter_transformed
+from mongodb.db_store import extract_lecture_meeting_sections
+
+
+def scan_lecture_sections(course_id, meeting_sections):
+    # What extract_lecture_meeting_sections did before the index: a scan of every section
+    return [format_meeting_section(ms) for ms in meeting_sections
+            if ms['course_id'] == course_id and ms.get('type') == "Lecture"]
+
+
+def test_index_matches_a_scan(transformed_dir):
+    meeting_sections = list(iter_transformed('meeting_sections', transformed_dir))
+    index = build_lecture_section_index(meeting_sections)
+    course_ids = [course['course_id'] for course in iter_transformed('courses', transformed_dir)]
+    assert any(index.get(course_id) for course_id in course_ids)
+    for course_id in course_ids:
+        assert extract_lecture_meeting_sections(course_id, index) == scan_lecture_sections(course_id, meeting_sections)
+
+
+def test_index_keeps_only_lectures_in_order():
+    meeting_sections = [
+        {"course_id": "c1", "section_code": "LEC0201", "type": "Lecture"},
+        {"course_id": "c1", "section_code": "TUT0101", "type": "Tutorial"},
+        {"course_id": "c2", "section_code": "LEC0101", "type": "Lecture"},
+        {"course_id": "c1", "section_code": "LEC0101", "type": "Lecture"},
+    ]
+    index = build_lecture_section_index(meeting_sections)
+    assert [ms["section_code"] for ms in index["c1"]] == ["LEC0201", "LEC0101"]
+    assert set(index) == {"c1", "c2"}
+
+
+def test_extract_accepts_a_list_of_sections():
+    meeting_sections = [{"course_id": "c1", "section_code": "LEC0101", "type": "Lecture", "size": 10}]
+    assert extract_lecture_meeting_sections("c1", meeting_sections) == scan_lecture_sections("c1", meeting_sections)
+    assert extract_lecture_meeting_sections("missing", meeting_sections) == []
@@ -0,0 +1,105 @@
+import os
+import sys
+import types
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+# Nothing here calls the API, but llm_clients needs a key to create its clients
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+try:
+    import session_store
+    from history import ConversationHistory
+except Exception as e:
+    # The tokenizer's encoding is downloaded on first use
+    pytest.skip(f"tokenizer unavailable: {e}", allow_module_level=True)
+
+
+@pytest.fixture(params=["memory", "sqlite", "mongo"])
+def store(request, tmp_path, monkeypatch):
+    if request.param == "memory":
+        return session_store.MemorySessionStore()
+    if request.param == "sqlite":
+        return session_store.SQLiteSessionStore(str(tmp_path / "sessions.sqlite"))
+    mongomock = pytest.importorskip("mongomock")
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(session_store, "MongoClient", lambda *args, **kwargs: client)
+    return session_store.MongoSessionStore()
+
+
+def history(*contents):
+    history = ConversationHistory([{'role': 'system', 'content': "You are a course advisor."}])
+    for content in contents:
+        history.add('user', content)
+    return history
+
+
+def contents(history):
+    return [message['content'] for message in history.messages()]
+
+
+def test_round_trip(store):
+    assert store.load("user-1") is None
+    assert store.save("user-1", history("Statistics courses?"))
+    loaded = store.load("user-1")
+    assert contents(loaded) == ["You are a course advisor.", "Statistics courses?"]
+    assert loaded.version == 1
+    assert store.load("user-2") is None
+
+    store.delete("user-1")
+    assert store.load("user-1") is None
+
+
+def test_every_save_bumps_the_version(store):
+    first = history("Statistics courses?")
+    store.save("user-1", first)
+    second = history("Statistics courses?", "In the fall.")
+    store.save("user-1", second)
+    assert (first.version, second.version) == (1, 2)
+    assert store.load("user-1").version == 2
+
+
+def test_conditional_save_gives_way_to_a_newer_turn(store):
+    store.save("user-1", history("Statistics courses?"))
+    compacted = store.load("user-1")
+    store.save("user-1", history("Statistics courses?", "In the fall."))
+
+    # A compaction of the version-1 history must not overwrite the newer turn
+    assert not store.save("user-1", compacted, if_version=1)
+    assert contents(store.load("user-1"))[-1] == "In the fall."
+
+    latest = store.load("user-1")
+    assert store.save("user-1", latest, if_version=latest.version)
+    assert store.load("user-1").version == 3
+
+
+def test_conditional_save_does_not_recreate_a_deleted_session(store):
+    store.save("user-1", history("Statistics courses?"))
+    store.delete("user-1")
+    assert not store.save("user-1", history("Statistics courses?"), if_version=1)
+    assert store.load("user-1") is None
+
+
+def test_expired_sessions_are_not_loaded(tmp_path):
+    store = session_store.SQLiteSessionStore(str(tmp_path / "sessions.sqlite"), ttl=-1)
+    store.save("user-1", history("Statistics courses?"))
+    assert store.load("user-1") is None
+
+
+def test_user_message_is_kept_when_the_reply_fails(monkeypatch):
+    try:
+        import app
+    except Exception as e:
+        pytest.skip(f"app unavailable: {e}")
+
+    def create(**kwargs):
+        raise ConnectionError("API unreachable")
+
+    monkeypatch.setattr(app, "session_store", session_store.MemorySessionStore())
+    monkeypatch.setattr(app, "client", types.SimpleNamespace(chat=types.SimpleNamespace(
+        completions=types.SimpleNamespace(create=create))))
+    response = app.app.test_client().post('/query', json={'userId': "user-1", 'message': "Statistics courses?"})
+    assert response.status_code >= 500
+    assert contents(app.session_store.load("user-1"))[-1] == "Statistics courses?"
@@ -0,0 +1,76 @@
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from RAG.vector_store import FaissVectorStore, match_filter
+
+VECTORS = [
+    {"id": "csc108", "values": [1.0, 0.0, 0.0], "metadata": {"campus": "St. George", "section_code": "F",
+                                                            "delivery_modes": ["INPER", "SYNC"]}},
+    {"id": "csc148", "values": [0.9, 0.1, 0.0], "metadata": {"campus": "St. George", "section_code": "S",
+                                                            "delivery_modes": ["INPER"]}},
+    {"id": "ant101", "values": [0.8, 0.0, 0.2], "metadata": {"campus": "Mississauga", "section_code": "Y",
+                                                            "delivery_modes": ["INPER"]}},
+    {"id": "psy100", "values": [0.0, 1.0, 0.0], "metadata": {"campus": "Scarborough", "section_code": "F",
+                                                            "delivery_modes": ["ASYNC"]}},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = FaissVectorStore(index_dir=str(tmp_path), index_name="test")
+    store.upsert(VECTORS)
+    store.flush()
+    return store
+
+
+def ids(result):
+    return [match["id"] for match in result["matches"]]
+
+
+def brute_force(filter):
+    return {vector["id"] for vector in VECTORS if match_filter(vector["metadata"], filter)}
+
+
+@pytest.mark.parametrize("filter", [
+    {"campus": "St. George"},
+    {"campus": {"$eq": "St. George"}},
+    {"campus": {"$in": ["St. George", "Mississauga"]}},
+    {"campus": {"$in": ["St. George"]}, "section_code": {"$in": ["F", "Y"]}},
+    {"delivery_modes": {"$in": ["SYNC", "ASYNC"]}},
+    {"campus": {"$in": ["Nowhere"]}},
+    {"campus": {"$ne": "St. George"}},
+    {"$or": [{"section_code": "Y"}, {"campus": "Scarborough"}]},
+])
+def test_filtered_query_matches_brute_force(store, filter):
+    assert set(ids(store.query([1.0, 0.0, 0.0], top_k=10, filter=filter))) == brute_force(filter)
+
+
+def test_scores_are_cosine_similarities(store):
+    result = store.query([2.0, 0.0, 0.0], top_k=2)
+    assert ids(result) == ["csc108", "csc148"]
+    assert result["matches"][0]["score"] == pytest.approx(1.0)
+    assert result["matches"][0]["metadata"]["campus"] == "St. George"
+
+
+def test_persisted_and_reloaded(store, tmp_path):
+    reloaded = FaissVectorStore(index_dir=str(tmp_path), index_name="test")
+    assert reloaded.vector_count() == len(VECTORS)
+    assert ids(reloaded.query([0.0, 1.0, 0.0], top_k=1)) == ["psy100"]
+
+
+def test_writes_apply_on_flush(store):
+    store.delete(["csc108"])
+    store.upsert([{"id": "mat137", "values": [1.0, 0.0, 0.0], "metadata": {"campus": "St. George"}}])
+    assert ids(store.query([1.0, 0.0, 0.0], top_k=1)) == ["csc108"]
+    store.flush()
+    assert store.vector_count() == len(VECTORS)
+    assert ids(store.query([1.0, 0.0, 0.0], top_k=1, filter={"campus": {"$in": ["St. George"]}})) == ["mat137"]
+
+
+def test_empty_store(tmp_path):
+    store = FaissVectorStore(index_dir=str(tmp_path), index_name="empty")
+    assert store.vector_count() == 0
+    assert store.query([1.0, 0.0, 0.0]) == {"matches": []}